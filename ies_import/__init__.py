@@ -0,0 +1,22 @@
+"""Build the IES SQLite databases from the Stats SA CSV releases.
+
+A single engine loads any survey wave described by a Dataset descriptor.
+Use it as a library::
+
+    from ies_import import IES2011, BuildOptions, build
+    build(IES2011, BuildOptions(db_path="ies2011.db", zip_path="IES2011.zip"))
+
+or from the command line: ``python -m ies_import ies2023 ies2011``.
+"""
+from .datasets import DATASETS, IES2011, IES2023
+from .engine import BuildOptions, Dataset, DerivedStep, build
+
+__all__ = [
+    "DATASETS",
+    "IES2011",
+    "IES2023",
+    "BuildOptions",
+    "Dataset",
+    "DerivedStep",
+    "build",
+]
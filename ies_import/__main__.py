@@ -0,0 +1,70 @@
+"""Command-line entry point: ``python -m ies_import [dataset ...]``.
+
+Options default to the environment variables the importers have always
+read (DB_PATH, ZIP_PATH, CSV_DIR, IMPORT_WORKERS, INFER_SCHEMA, BULK_LOAD,
+FULL_REBUILD, PLAN_REPORT, COLUMNAR_EXPORT).
+"""
+import argparse
+import dataclasses
+import os
+
+from .datasets import DATASETS
+from .engine import BuildOptions, build
+
+PATH_VARS = ("DB_PATH", "ZIP_PATH", "CSV_DIR", "SCHEMA_PATH")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m ies_import",
+        description="Build or update the IES SQLite databases.",
+    )
+    parser.add_argument(
+        "datasets", nargs="*", metavar="dataset",
+        help=f"datasets to build (default: all of {', '.join(DATASETS)})",
+    )
+    parser.add_argument("--db", help="database path (single dataset only)")
+    parser.add_argument("--zip", help="source zip path (single dataset only)")
+    parser.add_argument("--csv-dir", help="directory of unzipped CSVs")
+    parser.add_argument("--workers", type=int, help="parallel CSV workers")
+    parser.add_argument("--infer-schema", action="store_true",
+                        help="infer column types instead of the typed schema")
+    parser.add_argument("--full-rebuild", action="store_true",
+                        help="delete the database and rebuild every table")
+    parser.add_argument("--plan-report", action="store_true",
+                        help="print example-query plans before/after indexing")
+    parser.add_argument("--columnar", action="store_true",
+                        help="also export every table as Arrow IPC (pyarrow)")
+    args = parser.parse_args(argv)
+
+    names = args.datasets or list(DATASETS)
+    unknown = [name for name in names if name not in DATASETS]
+    if unknown:
+        parser.error(f"unknown dataset: {', '.join(unknown)}")
+    if len(names) > 1 and (
+        args.db or args.zip or args.csv_dir or any(v in os.environ for v in PATH_VARS)
+    ):
+        parser.error("paths can only be overridden when building one dataset")
+
+    for name in names:
+        dataset = DATASETS[name]
+        opts = BuildOptions.from_env(dataset)
+        overrides = {
+            "db_path": args.db,
+            "zip_path": args.zip,
+            "csv_dir": args.csv_dir,
+            "workers": args.workers,
+            "infer_schema": args.infer_schema or None,
+            "full_rebuild": args.full_rebuild or None,
+            "plan_report": args.plan_report or None,
+            "columnar": args.columnar or None,
+        }
+        overrides = {k: v for k, v in overrides.items() if v is not None}
+        if "db_path" in overrides and "SCHEMA_PATH" not in os.environ:
+            overrides["schema_path"] = ""
+        print(f"=== {dataset.label} ===")
+        build(dataset, dataclasses.replace(opts, **overrides))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Optional columnar (Arrow IPC) copy of every table.
+
+The analytic workload scans a handful of columns out of hundreds, which
+row-oriented SQLite reads in full. Each table is written to
+``<db stem>.arrow/<table>.arrow`` as an uncompressed Arrow IPC file, so
+readers can memory-map it and only touch the pages of the columns they
+use. Needs pyarrow; the export is skipped with a message when it is not
+installed.
+"""
+import os
+import time
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:
+    pa = pc = None
+
+ARROW_TYPES = {"INTEGER": "int64", "INT": "int64", "REAL": "float64"}
+BATCH_ROWS = 65536
+# TEXT columns are dictionary-encoded when at most this share of values is
+# distinct, i.e. survey codes rather than identifiers such as uqno
+DICTIONARY_MAX_RATIO = 0.5
+
+
+def columnar_dir(db_path):
+    return os.path.splitext(db_path)[0] + ".arrow"
+
+
+def table_path(db_path, table_name):
+    return os.path.join(columnar_dir(db_path), f"{table_name}.arrow")
+
+
+def remove_exports(db_path, table_names):
+    """Delete the Arrow copies of tables that were rebuilt."""
+    for table_name in table_names:
+        path = table_path(db_path, table_name)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+class _ColumnTypeError(Exception):
+    def __init__(self, column):
+        super().__init__(f"column {column!r} does not match its declared type")
+        self.column = column
+
+
+def table_to_arrow(conn, table_name):
+    """Read table_name into an Arrow table typed from its declared columns.
+
+    A typed column holding a value that did not convert at load time (kept
+    as text by the importer) is exported as string rather than failing.
+    """
+    columns = conn.execute(f"PRAGMA table_info({table_name})").fetchall()
+    types = {
+        name: ARROW_TYPES.get(decl.upper(), "string")
+        for _, name, decl, *_ in columns
+    }
+    while True:
+        schema = pa.schema(
+            (name, pa.type_for_alias(alias)) for name, alias in types.items()
+        )
+        try:
+            table = _read_table(conn, table_name, schema)
+            break
+        except _ColumnTypeError as exc:
+            if types[exc.column] == "string":
+                raise
+            types[exc.column] = "string"
+
+    for i, field in enumerate(table.schema):
+        column = table.column(i)
+        if field.type != pa.string() or not len(column):
+            continue
+        if pc.count_distinct(column).as_py() <= DICTIONARY_MAX_RATIO * len(column):
+            table = table.set_column(i, field.name, pc.dictionary_encode(column))
+    return table.combine_chunks()
+
+
+def _read_table(conn, table_name, schema):
+    cur = conn.execute(f"SELECT * FROM {table_name}")
+    batches = []
+    while True:
+        rows = cur.fetchmany(BATCH_ROWS)
+        if not rows:
+            break
+        arrays = []
+        for values, field in zip(zip(*rows), schema):
+            try:
+                arrays.append(pa.array(values, type=field.type))
+            except (pa.ArrowInvalid, pa.ArrowTypeError) as exc:
+                raise _ColumnTypeError(field.name) from exc
+        batches.append(pa.RecordBatch.from_arrays(arrays, schema=schema))
+    return pa.Table.from_batches(batches, schema=schema).combine_chunks()
+
+
+def export_tables(conn, db_path, table_names):
+    """Write an Arrow IPC copy of each table whose copy is missing."""
+    if pa is None:
+        print("pyarrow is not installed; skipping the columnar export")
+        return
+    os.makedirs(columnar_dir(db_path), exist_ok=True)
+    for table_name in table_names:
+        path = table_path(db_path, table_name)
+        if os.path.exists(path):
+            continue
+        start = time.perf_counter()
+        table = table_to_arrow(conn, table_name)
+        # Write next to the target and rename, so readers never see a
+        # partially written file
+        tmp_path = path + ".tmp"
+        with pa.OSFile(tmp_path, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, path)
+        print(
+            f"  {table_name}.arrow: {table.num_rows:,} rows, "
+            f"{os.path.getsize(path) / 2**20:.1f} MiB "
+            f"in {time.perf_counter() - start:.2f}s"
+        )
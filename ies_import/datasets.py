@@ -0,0 +1,449 @@
+"""Per-wave dataset descriptors.
+
+Each IES wave is described by a Dataset: its CSV members, typed columns,
+settlement codes, derived tables, indexes and views. Adding a wave means
+adding a descriptor here; the engine does the rest.
+
+The 2010/11 wave mirrors the ies2023.db schema as closely as possible:
+- Same table names: geography, households, persons, person_income, total
+- Same lookup tables: coicop_lookup, province_lookup, settlement_lookup
+- Same views: household_geo, total_labelled
+- Same indexes on key columns
+
+Key differences from the 2023 data handled here:
+- No separate Geography CSV: geography table is extracted from the HOUSE CSV.
+- 8-digit COICOP codes: division and group columns are derived (first 2/3 digits).
+- Column names differ (reflect the 2010/11 survey instrument).
+
+Both waves also materialise harmonised_households and harmonised_total,
+which hold the hot columns under one set of names, so a query written
+against them runs unchanged on either wave.
+"""
+from .engine import Dataset, DerivedStep
+
+# --- Typed column schema ---
+# Columns listed in column_types are converted once at load time; every other
+# column is stored as TEXT so survey codes such as COICOP '06' keep their
+# leading zeros. Sentinel codes mark "unspecified / not applicable" and are
+# loaded as NULL. 88 is a valid age, so ages only treat the three/four-digit
+# codes as missing.
+AGE_SENTINELS = ("888", "8888")
+COUNT_SENTINELS = ("88", "888", "8888")
+
+
+def household_division_totals_sql(value_column, weight_column):
+    """Pre-aggregate line items per household and COICOP division/group.
+
+    Most queries sum the annualised value per household for one division,
+    which otherwise re-aggregates the whole total table every time.
+    """
+    return (
+        "DROP TABLE IF EXISTS household_division_totals",
+        """
+    CREATE TABLE household_division_totals (
+        uqno TEXT,
+        level TEXT,
+        code TEXT,
+        value_annualized REAL,
+        value_weighted REAL,
+        items INTEGER
+    )
+    """,
+        f"""
+    INSERT INTO household_division_totals
+    SELECT agg.uqno, agg.level, agg.code, agg.value_annualized,
+           agg.value_annualized * h.{weight_column}, agg.items
+    FROM (
+        SELECT uqno, 'division' AS level, division AS code,
+               SUM({value_column}) AS value_annualized, COUNT(*) AS items
+        FROM total
+        GROUP BY uqno, division
+        UNION ALL
+        SELECT uqno, 'group', "group", SUM({value_column}), COUNT(*)
+        FROM total
+        GROUP BY uqno, "group"
+    ) agg
+    LEFT JOIN households h ON h.uqno = agg.uqno
+    """,
+        "CREATE INDEX idx_household_division_totals_code"
+        " ON household_division_totals(code, uqno)",
+        "CREATE INDEX idx_household_division_totals_uqno"
+        " ON household_division_totals(uqno)",
+    )
+
+
+# --- Harmonised cross-wave tables ---
+# Canonical (column, type) for each harmonised table. Every wave maps each
+# column to an SQL expression over its own tables; the values are copied
+# once at import, so queries pay no CASE/COALESCE mapping per row.
+HARMONISED_TABLES = {
+    "harmonised_households": (
+        ("uqno", "TEXT"),
+        ("province", "TEXT"),
+        ("settlement_type", "TEXT"),
+        ("hsize", "INTEGER"),
+        ("head_population", "TEXT"),
+        ("income", "REAL"),
+        ("expenditure", "REAL"),
+        ("expenditure_decile", "INTEGER"),
+        ("weight", "REAL"),
+    ),
+    "harmonised_total": (
+        ("uqno", "TEXT"),
+        ("coicop", "TEXT"),
+        ("division", "TEXT"),
+        ("group", "TEXT"),
+        ("value_annualized", "REAL"),
+    ),
+}
+HARMONISED_INDEXES = (
+    "CREATE INDEX idx_harmonised_households_uqno ON harmonised_households(uqno)",
+    "CREATE INDEX idx_harmonised_households_province"
+    " ON harmonised_households(province)",
+    "CREATE INDEX idx_harmonised_total_uqno ON harmonised_total(uqno)",
+    "CREATE INDEX idx_harmonised_total_division_uqno_value"
+    " ON harmonised_total(division, uqno, value_annualized)",
+)
+
+
+# The waves number settlement types differently (2010/11 has 4 for
+# traditional areas and 5 for rural formal, 2022/23 has 3 for rural formal),
+# so harmonised_households.settlement_type uses the 2022/23 codes and every
+# wave recodes its own into them. These label the harmonised codes.
+HARMONISED_SETTLEMENTS = [
+    ("1", "Urban formal"), ("2", "Urban informal"),
+    ("3", "Rural formal"), ("4", "Rural informal (tribal / traditional)"),
+]
+
+# Every table the harmonised step replaces
+HARMONISED_OUTPUTS = (
+    "harmonised_columns", "harmonised_settlement_lookup", *HARMONISED_TABLES,
+)
+
+
+def harmonised_sql(mapping):
+    """Materialise the harmonised tables and record where each column came from.
+
+    mapping is table -> (FROM clause, {canonical column: SQL expression}) and
+    must cover every column of HARMONISED_TABLES. The mapping itself is
+    written to harmonised_columns (table_name, column_name, source) so users
+    can see what a harmonised column means in each wave. The harmonised
+    settlement codes are labelled by harmonised_settlement_lookup.
+    """
+    statements = [
+        "DROP TABLE IF EXISTS harmonised_settlement_lookup",
+        "CREATE TABLE harmonised_settlement_lookup (code TEXT PRIMARY KEY, name TEXT)",
+        "INSERT INTO harmonised_settlement_lookup VALUES "
+        + ", ".join(f"('{code}', '{name}')" for code, name in HARMONISED_SETTLEMENTS),
+        "DROP TABLE IF EXISTS harmonised_columns",
+    ]
+    statements.append("""
+    CREATE TABLE harmonised_columns (
+        table_name TEXT,
+        column_name TEXT,
+        source TEXT,
+        PRIMARY KEY (table_name, column_name)
+    )
+    """)
+    for table, columns in HARMONISED_TABLES.items():
+        source, expressions = mapping[table]
+        names = ", ".join(f'"{name}"' for name, _ in columns)
+        statements += [
+            f"DROP TABLE IF EXISTS {table}",
+            f"CREATE TABLE {table} ("
+            + ", ".join(f'"{name}" {col_type}' for name, col_type in columns)
+            + ")",
+            f"INSERT INTO {table} ({names}) SELECT "
+            + ", ".join(expressions[name] for name, _ in columns)
+            + f" FROM {source}",
+        ]
+        for name, _ in columns:
+            quoted = expressions[name].replace("'", "''")
+            statements.append(
+                f"INSERT INTO harmonised_columns VALUES ('{table}', '{name}', '{quoted}')"
+            )
+    return (*statements, *HARMONISED_INDEXES)
+
+
+# Total expenditure with COICOP labels
+TOTAL_LABELLED_VIEW = ("total_labelled", """
+    CREATE VIEW total_labelled AS
+    SELECT t.*,
+           cd.label AS division_label,
+           cg.label AS group_label
+    FROM total t
+    LEFT JOIN coicop_lookup cd ON t.division = cd.code AND cd.level = 'division'
+    LEFT JOIN coicop_lookup cg ON t."group" = cg.code AND cg.level = 'group'
+    """)
+
+
+IES2023 = Dataset(
+    id="ies2023",
+    label="IES 2022/23",
+    db_path="ies2023.db",
+    zip_path="IES2023.zip",
+    csv_tables={
+        "Fact_IES2023_Geography.csv": "geography",
+        "Fact_IES2023_Households.csv": "households",
+        "Fact_IES2023_PersonIncome.csv": "person_income",
+        "Fact_IES2023_Persons.csv": "persons",
+        "Fact_IES2023_Total.csv": "total",
+    },
+    column_types={
+        # Line-item values and weights
+        "valueannualized_adj": ("REAL", ()),
+        "valueannualized_adj_wgt": ("REAL", ()),
+        "hhold_wgt": ("REAL", ()),
+        "persns_wgt": ("REAL", ()),
+        # Household aggregates
+        "expenditure": ("REAL", ()),
+        "income": ("REAL", ()),
+        "expenditure_inkind": ("REAL", ()),
+        "income_inkind": ("REAL", ()),
+        "expenditure_weighted": ("REAL", ()),
+        "income_weighted": ("REAL", ()),
+        "expenditure_inkind_weighted": ("REAL", ()),
+        "income_inkind_weighted": ("REAL", ()),
+        "expenditure_pcp": ("REAL", ()),
+        "income_pcp": ("REAL", ()),
+        "expenditure_decile": ("INTEGER", COUNT_SENTINELS),
+        # Demographics
+        "age": ("INTEGER", AGE_SENTINELS),
+        "head_age": ("INTEGER", AGE_SENTINELS),
+        "hsize": ("INTEGER", COUNT_SENTINELS),
+        "personno": ("INTEGER", COUNT_SENTINELS),
+    },
+    settlements=[
+        ("1", "Urban formal"), ("2", "Urban informal"),
+        ("3", "Rural formal (farms)"), ("4", "Rural informal (tribal)"),
+    ],
+    derived_steps=(
+        DerivedStep(
+            name="household_division_totals",
+            inputs=("total", "households"),
+            outputs=("household_division_totals",),
+            statements=household_division_totals_sql(
+                "valueannualized_adj", "hhold_wgt"
+            ),
+        ),
+        DerivedStep(
+            name="harmonised",
+            inputs=("households", "geography", "total"),
+            outputs=HARMONISED_OUTPUTS,
+            statements=harmonised_sql({
+                "harmonised_households": (
+                    "households h LEFT JOIN geography g ON g.uqno = h.uqno",
+                    {
+                        "uqno": "h.uqno",
+                        "province": "g.province",
+                        "settlement_type": "g.settlement_type",
+                        "hsize": "h.hsize",
+                        "head_population": "h.head_population",
+                        "income": "h.income",
+                        "expenditure": "h.expenditure",
+                        "expenditure_decile": "h.expenditure_decile",
+                        "weight": "h.hhold_wgt",
+                    },
+                ),
+                "harmonised_total": (
+                    "total",
+                    {
+                        "uqno": "uqno",
+                        "coicop": "coicop",
+                        "division": "division",
+                        "group": '"group"',
+                        "value_annualized": "valueannualized_adj",
+                    },
+                ),
+            }),
+        ),
+    ),
+    indexes=(
+        "CREATE INDEX IF NOT EXISTS idx_geography_uqno ON geography(uqno)",
+        "CREATE INDEX IF NOT EXISTS idx_households_uqno ON households(uqno)",
+        "CREATE INDEX IF NOT EXISTS idx_persons_uqno ON persons(uqno)",
+        "CREATE INDEX IF NOT EXISTS idx_persons_person_id ON persons(person_id)",
+        "CREATE INDEX IF NOT EXISTS idx_total_uqno ON total(uqno)",
+        "CREATE INDEX IF NOT EXISTS idx_total_division ON total(division)",
+        "CREATE INDEX IF NOT EXISTS idx_total_coicop ON total(coicop)",
+        "CREATE INDEX IF NOT EXISTS idx_person_income_person_id ON person_income(person_id)",
+        "CREATE INDEX IF NOT EXISTS idx_geography_province ON geography(province)",
+        "CREATE INDEX IF NOT EXISTS idx_geography_settlement ON geography(settlement_type)",
+    ),
+    views=(
+        # Households joined with geography
+        ("household_geo", """
+    CREATE VIEW household_geo AS
+    SELECT h.*, g.metro_code, g.province, g.settlement_type, g.surveydate,
+           p.name AS province_name, s.name AS settlement_name
+    FROM households h
+    JOIN geography g ON h.uqno = g.uqno
+    LEFT JOIN province_lookup p ON g.province = p.code
+    LEFT JOIN settlement_lookup s ON g.settlement_type = s.code
+    """),
+        TOTAL_LABELLED_VIEW,
+    ),
+    # Composite and covering indexes for the example queries in
+    # webapp/examples.py, so their joins and aggregates are answered from the
+    # index alone instead of scanning total/households.
+    workload_indexes=(
+        # Health spend: WHERE division = '06', then uqno and value per line item
+        "CREATE INDEX IF NOT EXISTS idx_total_division_uqno_value"
+        " ON total(division, uqno, valueannualized_adj)",
+        # Join from total to households, reading medical aid status and decile
+        "CREATE INDEX IF NOT EXISTS idx_households_uqno_meds_decile"
+        " ON households(uqno, eoh_meds, expenditure_decile)",
+        # Per-province aggregates walk geography in province order, then join
+        "CREATE INDEX IF NOT EXISTS idx_geography_province_uqno"
+        " ON geography(province, uqno)",
+        # Household aggregates grouped by population group and decile
+        "CREATE INDEX IF NOT EXISTS idx_households_population_income"
+        " ON households(head_population, income, expenditure)",
+        "CREATE INDEX IF NOT EXISTS idx_households_decile_income"
+        " ON households(expenditure_decile, income, expenditure)",
+    ),
+)
+
+
+IES2011 = Dataset(
+    id="ies2011",
+    label="IES 2010/11",
+    db_path="ies2011.db",
+    zip_path="IES2011.zip",
+    csv_tables={
+        "IES2011HOUSE.csv": "households",
+        "IES2011PERSON.csv": "persons",
+        "IES2011PERSONINCOME.csv": "person_income",
+        "IES2011TOTAL.csv": "total",
+    },
+    column_types={
+        # Line-item values and weights
+        "valueannualized": ("REAL", ()),
+        "valuemainannualized": ("REAL", ()),
+        "valuediaryannualized": ("REAL", ()),
+        "valuemain": ("REAL", ()),
+        "valuediary": ("REAL", ()),
+        "value": ("REAL", ()),
+        "full_calwgt": ("REAL", ()),
+        # Household aggregates
+        "consumptions": ("REAL", ()),
+        "income": ("REAL", ()),
+        "inkindconsumptions": ("REAL", ()),
+        "inkindincome": ("REAL", ()),
+        "consumptiondecile": ("INTEGER", COUNT_SENTINELS),
+        # Demographics
+        "q14age": ("INTEGER", AGE_SENTINELS),
+        "hsize": ("INTEGER", COUNT_SENTINELS),
+        "personno": ("INTEGER", COUNT_SENTINELS),
+    },
+    settlements=[
+        ("1", "Urban formal"), ("2", "Urban informal"),
+        ("4", "Traditional area"), ("5", "Rural formal"),
+    ],
+    # Division and group are the first 2/3 digits of the 8-digit COICOP
+    # code, computed in the row stream so total is written only once
+    derived_columns={
+        "total": (("division", "coicop", 2), ("group", "coicop", 3)),
+    },
+    derived_steps=(
+        # No Geography CSV in this wave: extract it from households
+        DerivedStep(
+            name="geography",
+            inputs=("households",),
+            outputs=("geography",),
+            statements=(
+                "DROP TABLE IF EXISTS geography",
+                """
+    CREATE TABLE geography AS
+    SELECT uqno, province, settlement_type, surveyyear, surveymonth
+    FROM households
+    """,
+                "CREATE INDEX idx_geography_uqno ON geography(uqno)",
+                "CREATE INDEX idx_geography_province ON geography(province)",
+                "CREATE INDEX idx_geography_settlement ON geography(settlement_type)",
+            ),
+        ),
+        DerivedStep(
+            name="household_division_totals",
+            inputs=("total", "households"),
+            outputs=("household_division_totals",),
+            statements=household_division_totals_sql(
+                "valueannualized", "full_calwgt"
+            ),
+        ),
+        DerivedStep(
+            name="harmonised",
+            inputs=("households", "total"),
+            outputs=HARMONISED_OUTPUTS,
+            statements=harmonised_sql({
+                "harmonised_households": (
+                    "households",
+                    {
+                        "uqno": "uqno",
+                        "province": "province",
+                        # Rural formal is 5 here and 3 in 2022/23
+                        "settlement_type": "CASE settlement_type"
+                        " WHEN '5' THEN '3' ELSE settlement_type END",
+                        "hsize": "hsize",
+                        "head_population": "popgrpofhead",
+                        "income": "income",
+                        "expenditure": "consumptions",
+                        "expenditure_decile": "consumptiondecile",
+                        "weight": "full_calwgt",
+                    },
+                ),
+                "harmonised_total": (
+                    "total",
+                    {
+                        "uqno": "uqno",
+                        "coicop": "coicop",
+                        "division": "division",
+                        "group": '"group"',
+                        "value_annualized": "valueannualized",
+                    },
+                ),
+            }),
+        ),
+    ),
+    # geography is indexed by the step that builds it
+    indexes=(
+        "CREATE INDEX IF NOT EXISTS idx_households_uqno ON households(uqno)",
+        "CREATE INDEX IF NOT EXISTS idx_persons_uqno ON persons(uqno)",
+        "CREATE INDEX IF NOT EXISTS idx_persons_personno ON persons(personno)",
+        "CREATE INDEX IF NOT EXISTS idx_total_uqno ON total(uqno)",
+        "CREATE INDEX IF NOT EXISTS idx_total_division ON total(division)",
+        "CREATE INDEX IF NOT EXISTS idx_total_coicop ON total(coicop)",
+        "CREATE INDEX IF NOT EXISTS idx_person_income_uqno ON person_income(uqno)",
+    ),
+    views=(
+        # Households with province/settlement labels (2011 households already
+        # contains province and settlement_type columns, unlike 2023 where
+        # they are only in the geography table)
+        ("household_geo", """
+    CREATE VIEW household_geo AS
+    SELECT h.*,
+           p.name AS province_name, s.name AS settlement_name
+    FROM households h
+    LEFT JOIN province_lookup p ON h.province = p.code
+    LEFT JOIN settlement_lookup s ON h.settlement_type = s.code
+    """),
+        TOTAL_LABELLED_VIEW,
+    ),
+    workload_indexes=(
+        # Spend per division and health spend per household (division = '06')
+        "CREATE INDEX IF NOT EXISTS idx_total_division_uqno_value"
+        " ON total(division, uqno, valueannualized)",
+        # Per-province health spend walks geography in province order
+        "CREATE INDEX IF NOT EXISTS idx_geography_province_uqno"
+        " ON geography(province, uqno)",
+        # Household aggregates grouped by province, population group and decile
+        "CREATE INDEX IF NOT EXISTS idx_households_province_income"
+        " ON households(province, income, consumptions)",
+        "CREATE INDEX IF NOT EXISTS idx_households_population_income"
+        " ON households(popgrpofhead, income, consumptions)",
+        "CREATE INDEX IF NOT EXISTS idx_households_decile_income"
+        " ON households(consumptiondecile, income, consumptions)",
+    ),
+)
+
+DATASETS = {ds.id: ds for ds in (IES2023, IES2011)}
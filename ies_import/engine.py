@@ -0,0 +1,799 @@
+"""Dataset-driven importer engine.
+
+Everything here is wave-agnostic: streaming CSVs out of the release zip,
+typed loading, schema inference, parallel staging, incremental rebuilds
+and the bulk-load PRAGMAs. A Dataset (see datasets.py) supplies the parts
+that differ between IES waves.
+"""
+import contextlib
+import csv
+import hashlib
+import importlib.util
+import io
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+from . import columnar
+from .lookups import (
+    COICOP_LOOKUP, LOOKUP_TABLES, PROVINCE_LOOKUP, create_lookup_tables,
+)
+
+# Larger pages mean fewer page reads for the scan-heavy analytic queries
+PAGE_SIZE = 16384
+CACHE_SIZE_KIB = 256 * 1024
+# Tables are rebuilt only when their source CSV, column types or this version
+# change; bump it when the engine changes what an unchanged CSV loads as.
+IMPORTER_VERSION = "1"
+# Codes the schema inference considers as possible sentinels
+SENTINEL_CANDIDATES = ("88", "888", "8888")
+EXAMPLES_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "webapp", "examples.py",
+)
+
+
+@dataclass(frozen=True)
+class DerivedStep:
+    """Tables built with SQL from already-loaded tables.
+
+    The step is rerun whenever one of its inputs or its statements change,
+    and then replaces every table in outputs.
+    """
+
+    name: str
+    inputs: tuple
+    statements: tuple
+    outputs: tuple
+
+
+@dataclass(frozen=True)
+class Dataset:
+    """Everything that differs between IES waves."""
+
+    id: str
+    label: str
+    db_path: str
+    zip_path: str
+    # Source CSV (matched by base name inside the zip) -> table name
+    csv_tables: dict
+    # Column -> (SQLite type, sentinel codes loaded as NULL)
+    column_types: dict
+    settlements: list
+    # Columns computed while streaming, as a prefix of another column:
+    # table -> ((column, source column, prefix length), ...)
+    derived_columns: dict = field(default_factory=dict)
+    # Key indexes on the CSV tables, created before the derived steps run
+    indexes: tuple = ()
+    # Built in order once the CSV tables are loaded and indexed; each step
+    # creates the indexes on its own output
+    derived_steps: tuple = ()
+    # (name, CREATE VIEW statement)
+    views: tuple = ()
+    # Composite/covering indexes for the webapp example queries
+    workload_indexes: tuple = ()
+
+
+@dataclass(frozen=True)
+class BuildOptions:
+    """Where and how one dataset is built."""
+
+    db_path: str
+    zip_path: str
+    csv_dir: str = "csv_temp"
+    schema_path: str = ""
+    # Number of CSVs parsed concurrently; 1 imports serially in-process
+    workers: int = field(default_factory=lambda: os.cpu_count() or 1)
+    # Ignore Dataset.column_types and infer types from the data
+    infer_schema: bool = False
+    # Bulk-load mode disables journaling and fsync while loading, so an
+    # interrupted build can leave a corrupt file: rebuild with full_rebuild.
+    bulk_load: bool = True
+    # Delete the database and rebuild every table
+    full_rebuild: bool = False
+    # Print example-query plans before/after the workload indexes and ANALYZE
+    plan_report: bool = False
+    # Also write an Arrow IPC copy of every table (needs pyarrow)
+    columnar: bool = False
+
+    def __post_init__(self):
+        if not self.schema_path:
+            object.__setattr__(
+                self, "schema_path",
+                os.path.splitext(self.db_path)[0] + ".schema.json",
+            )
+
+    @classmethod
+    def from_env(cls, dataset, env=os.environ):
+        """Read the DB_PATH, ZIP_PATH, ... environment variables."""
+        return cls(
+            db_path=env.get("DB_PATH", dataset.db_path),
+            zip_path=env.get("ZIP_PATH", dataset.zip_path),
+            csv_dir=env.get("CSV_DIR", "csv_temp"),
+            schema_path=env.get("SCHEMA_PATH", ""),
+            workers=int(env.get("IMPORT_WORKERS", os.cpu_count() or 1)),
+            infer_schema=env.get("INFER_SCHEMA") == "1",
+            bulk_load=env.get("BULK_LOAD", "1") == "1",
+            full_rebuild=env.get("FULL_REBUILD") == "1",
+            plan_report=env.get("PLAN_REPORT") == "1",
+            columnar=env.get("COLUMNAR_EXPORT") == "1",
+        )
+
+
+@contextlib.contextmanager
+def open_csv(opts, csv_file):
+    """Open a source CSV as a text stream.
+
+    Members are streamed straight out of opts.zip_path when the archive
+    exists, so no unzipped copy is needed; otherwise the file is read from
+    opts.csv_dir.
+    """
+    if os.path.exists(opts.zip_path):
+        with zipfile.ZipFile(opts.zip_path) as zf:
+            # Match on the base name so archives with a top-level folder work
+            member = next(
+                (n for n in zf.namelist() if os.path.basename(n) == csv_file),
+                None,
+            )
+            if member is None:
+                raise FileNotFoundError(f"{csv_file} not found in {opts.zip_path}")
+            with zf.open(member) as raw:
+                yield io.TextIOWrapper(raw, encoding="utf-8", newline="")
+    else:
+        with open(os.path.join(opts.csv_dir, csv_file), "r", newline="") as f:
+            yield f
+
+
+class PhaseTimer:
+    """Print the wall-clock time spent in each build phase."""
+
+    def __init__(self):
+        self.start = self.last = time.perf_counter()
+
+    def lap(self, phase):
+        now = time.perf_counter()
+        print(f"  [{phase}: {now - self.last:.2f}s]")
+        self.last = now
+
+    def total(self):
+        return time.perf_counter() - self.start
+
+
+def configure_connection(conn, opts, fresh=True):
+    """Apply load-time PRAGMAs to the database being built.
+
+    Bulk-load mode is only used on a fresh file. An incremental update of an
+    existing database keeps its rollback journal, so an interrupted update
+    cannot corrupt the tables that were already built.
+    """
+    # page_size only takes effect before the first table is created
+    conn.execute(f"PRAGMA page_size={PAGE_SIZE}")
+    conn.execute(f"PRAGMA cache_size=-{CACHE_SIZE_KIB}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    if not fresh:
+        conn.execute("PRAGMA synchronous=NORMAL")
+    elif opts.bulk_load:
+        conn.execute("PRAGMA journal_mode=OFF")
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.execute("PRAGMA locking_mode=EXCLUSIVE")
+    else:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+
+
+def finalize_database(conn, timer, rebuilt=True, new_indexes=(), lookups=True):
+    """Gather planner statistics, compact the file and make it read-friendly.
+
+    The rollback journal (DELETE) is used for the finished database: it is
+    only ever read by the webapp, and unlike WAL needs no -wal/-shm files.
+    When no data table was rebuilt only the lookups (when recreated) and the
+    indexes created in this run (new_indexes) are analyzed, so a run that
+    changed nothing leaves the file untouched.
+    """
+    # ANALYZE fills sqlite_stat1, plus sqlite_stat4 histograms when SQLite
+    # is compiled with SQLITE_ENABLE_STAT4
+    analyze = [*(LOOKUP_TABLES if lookups else ()), *sorted(new_indexes)]
+    if rebuilt:
+        print("Analyzing...")
+        conn.execute("ANALYZE")
+    elif analyze:
+        print("Analyzing...")
+        for name in analyze:
+            conn.execute(f"ANALYZE {name}")
+    conn.commit()
+    timer.lap("analyze")
+    if rebuilt:
+        print("Vacuuming...")
+        conn.execute("VACUUM")
+        timer.lap("vacuum")
+    conn.execute("PRAGMA journal_mode=DELETE")
+    conn.execute("PRAGMA locking_mode=NORMAL")
+
+
+def index_names(conn):
+    return {
+        name for (name,) in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index'"
+            " AND name NOT LIKE 'sqlite_%'"
+        )
+    }
+
+
+def load_example_queries(dataset):
+    """Return the dataset's example queries from the webapp, if present."""
+    if not os.path.exists(EXAMPLES_PATH):
+        return []
+    spec = importlib.util.spec_from_file_location("examples", EXAMPLES_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.EXAMPLES_BY_DATASET.get(dataset.id, [])
+
+
+def query_plans(conn, examples):
+    """Return EXPLAIN QUERY PLAN output for each example as indented lines."""
+    plans = {}
+    for ex in examples:
+        depth = {0: -1}
+        lines = []
+        for node_id, parent, _, detail in conn.execute(
+            f"EXPLAIN QUERY PLAN {ex['sql']}"
+        ):
+            depth[node_id] = depth.get(parent, -1) + 1
+            lines.append("    " + "  " * depth[node_id] + detail)
+        plans[ex["id"]] = lines
+    return plans
+
+
+def print_plan_report(examples, before, after):
+    print("\nQuery plans (before -> after workload indexes + ANALYZE):")
+    for ex in examples:
+        print(f"\n  {ex['id']}: {ex['title']}")
+        print("   before:")
+        print("\n".join(before[ex["id"]]))
+        print("   after:")
+        print("\n".join(after[ex["id"]]))
+
+
+def make_converter(col_type, sentinels):
+    """Return a function converting a raw CSV value to col_type.
+
+    Blank cells and sentinel codes become NULL. Values that do not parse are
+    kept as-is rather than dropped, so a schema mistake never loses data.
+    """
+    cast = int if col_type == "INTEGER" else float
+
+    def convert(val):
+        val = val.strip()
+        if not val or val in sentinels:
+            return None
+        try:
+            return cast(val)
+        except ValueError:
+            return val
+
+    return convert
+
+
+def infer_column_types(opts, csv_file):
+    """Infer a column_types-style schema from a full pass over csv_file.
+
+    A column is INTEGER or REAL only if every non-blank value parses as one;
+    integers written with leading zeros are codes and stay TEXT. A candidate
+    sentinel (88/888/8888) is treated as missing only when no other value in
+    the column has that many digits, so 88 is a sentinel in a 1-9 code
+    column but a real value in an age column.
+    """
+    with open_csv(opts, csv_file) as f:
+        reader = csv.reader(f)
+        headers = [h.strip().lower() for h in next(reader)]
+        n = len(headers)
+        is_text = [False] * n
+        is_float = [False] * n
+        has_value = [False] * n
+        max_abs = [0.0] * n
+        seen_sentinels = [set() for _ in range(n)]
+
+        # Only columns that still look numeric are inspected on each row
+        numeric = list(range(n))
+        for row in reader:
+            dropped = False
+            for i in numeric:
+                val = row[i].strip()
+                if not val:
+                    continue
+                if val in SENTINEL_CANDIDATES:
+                    seen_sentinels[i].add(val)
+                    continue
+                if val[0] == "0" and val[1:2].isdigit():
+                    is_text[i] = dropped = True
+                    continue
+                try:
+                    num = int(val)
+                except ValueError:
+                    try:
+                        num = float(val)
+                        is_float[i] = True
+                    except ValueError:
+                        is_text[i] = dropped = True
+                        continue
+                has_value[i] = True
+                if abs(num) > max_abs[i]:
+                    max_abs[i] = abs(num)
+            if dropped:
+                numeric = [i for i in numeric if not is_text[i]]
+
+    column_types = {}
+    for i, header in enumerate(headers):
+        if is_text[i] or not has_value[i]:
+            continue
+        sentinels = sorted(
+            s for s in seen_sentinels[i] if max_abs[i] < 10 ** (len(s) - 1)
+        )
+        column_types[header] = {
+            "type": "REAL" if is_float[i] else "INTEGER",
+            "sentinels": sentinels,
+        }
+    return column_types
+
+
+def load_schema_cache(opts):
+    """Return previously inferred schemas keyed by table name."""
+    if not os.path.exists(opts.schema_path):
+        return {}
+    with open(opts.schema_path) as f:
+        return json.load(f)
+
+
+def save_schema_cache(opts, schemas):
+    with open(opts.schema_path, "w") as f:
+        json.dump(schemas, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def resolve_column_types(dataset, opts, csv_file, table_name, cache):
+    """Return (column_types, cache_entry) for loading csv_file.
+
+    dataset.column_types is used unless infer_schema is set or it is empty.
+    Inferred schemas are reused from the JSON cache while the CSV header
+    matches; cache_entry is None when the hand-written schema applies.
+    """
+    if dataset.column_types and not opts.infer_schema:
+        return dataset.column_types, None
+
+    with open_csv(opts, csv_file) as f:
+        headers = [h.strip().lower() for h in next(csv.reader(f))]
+    entry = cache.get(table_name)
+    if entry and entry["headers"] == headers:
+        print(f"  Using cached schema for {table_name} from {opts.schema_path}")
+    else:
+        print(f"  Inferring column types for {csv_file}...")
+        start = time.perf_counter()
+        entry = {
+            "source": csv_file,
+            "headers": headers,
+            "columns": infer_column_types(opts, csv_file),
+        }
+        print(f"  {table_name}: inference {time.perf_counter() - start:.2f}s")
+    column_types = {
+        h: (c["type"], tuple(c["sentinels"])) for h, c in entry["columns"].items()
+    }
+    return column_types, entry
+
+
+# --- Incremental rebuild ---
+# _build_meta records, per table, the fingerprint of what it was built from:
+# source CSV tables hash the raw member bytes and their column types; derived
+# tables hash their input tables' fingerprints and the SQL that builds them.
+# Source tables also record a cheap stat of the CSV (the zip member's CRC-32
+# and size, or the file's size and mtime), so an unchanged source is
+# recognised without decompressing and hashing it again. The lookups and
+# the views are fingerprinted by their data and SQL under the names
+# "_lookups" and "_views", so a run that changes nothing writes nothing and
+# leaves the file's mtime (which keys the webapp's caches) alone.
+
+def text_hash(*parts):
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def source_stat(opts, csv_file):
+    """Return a cheap identity for a source CSV that changes with its bytes."""
+    if os.path.exists(opts.zip_path):
+        with zipfile.ZipFile(opts.zip_path) as zf:
+            info = next(
+                (i for i in zf.infolist() if os.path.basename(i.filename) == csv_file),
+                None,
+            )
+        if info is None:
+            raise FileNotFoundError(f"{csv_file} not found in {opts.zip_path}")
+        return f"zip:{info.CRC:08x}:{info.file_size}"
+    st = os.stat(os.path.join(opts.csv_dir, csv_file))
+    return f"file:{st.st_size}:{st.st_mtime_ns}"
+
+
+def source_hash(opts, csv_file):
+    """Return the SHA-256 of a source CSV's raw bytes."""
+    h = hashlib.sha256()
+    with open_csv(opts, csv_file) as f:
+        raw = f.buffer
+        for chunk in iter(lambda: raw.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def schema_hash(dataset, opts, csv_file, table_name, cache):
+    """Fingerprint the header and the column types that apply to csv_file."""
+    with open_csv(opts, csv_file) as f:
+        headers = [h.strip().lower() for h in next(csv.reader(f))]
+    if dataset.column_types and not opts.infer_schema:
+        schema = {
+            h: dataset.column_types[h] for h in headers if h in dataset.column_types
+        }
+    else:
+        schema = (cache.get(table_name) or {}).get("columns")
+    parts = [headers, schema]
+    if table_name in dataset.derived_columns:
+        parts.append(dataset.derived_columns[table_name])
+    return text_hash(json.dumps(parts, sort_keys=True))
+
+
+def read_build_meta(conn):
+    """Return ({name: (content_hash, schema_hash, importer_version)},
+    {name: (source_stat, content_hash)})."""
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS _build_meta (
+        name TEXT PRIMARY KEY,
+        source TEXT,
+        content_hash TEXT,
+        schema_hash TEXT,
+        importer_version TEXT,
+        built_at TEXT,
+        source_stat TEXT
+    )
+    """)
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(_build_meta)")]
+    if "source_stat" not in columns:
+        # Databases built before source stats were recorded
+        conn.execute("ALTER TABLE _build_meta ADD COLUMN source_stat TEXT")
+    meta, stats = {}, {}
+    for name, content, schema, version, stat in conn.execute(
+        "SELECT name, content_hash, schema_hash, importer_version, source_stat"
+        " FROM _build_meta"
+    ):
+        meta[name] = (content, schema, version)
+        if stat:
+            stats[name] = (stat, content)
+    return meta, stats
+
+
+def record_build(conn, meta, name, source, content, schema, stat=None):
+    conn.execute(
+        "INSERT OR REPLACE INTO _build_meta (name, source, content_hash,"
+        " schema_hash, importer_version, built_at, source_stat)"
+        " VALUES (?, ?, ?, ?, ?, datetime('now'), ?)",
+        (name, source, content, schema, IMPORTER_VERSION, stat),
+    )
+    conn.commit()
+    meta[name] = (content, schema, IMPORTER_VERSION)
+
+
+def run_derived_step(conn, meta, step):
+    """Run step's statements unless its inputs and SQL are unchanged.
+
+    Returns True when the step ran.
+    """
+    content = text_hash(*(":".join(meta[i][:2]) for i in step.inputs))
+    schema = text_hash(*step.statements)
+    if meta.get(step.name) == (content, schema, IMPORTER_VERSION):
+        print(f"  {step.name} is up to date")
+        return False
+    print(f"Building {step.name}...")
+    conn.execute("DELETE FROM _build_meta WHERE name = ?", (step.name,))
+    for sql in step.statements:
+        conn.execute(sql)
+    conn.commit()
+    record_build(conn, meta, step.name, ",".join(step.inputs), content, schema)
+    return True
+
+
+def import_csv(conn, dataset, opts, csv_file, table_name, cache):
+    """Create table_name from csv_file and load every row into conn.
+
+    Returns the row count and the inferred schema entry (None when the
+    hand-written column types were used).
+    """
+    cur = conn.cursor()
+    print(f"Importing {csv_file} -> {table_name}...")
+    column_types, schema_entry = resolve_column_types(
+        dataset, opts, csv_file, table_name, cache
+    )
+
+    with open_csv(opts, csv_file) as f:
+        reader = csv.reader(f)
+        headers = [h.strip().lower() for h in next(reader)]
+
+        # Create table - untyped columns are stored as TEXT
+        col_types = [column_types.get(h, ("TEXT", ()))[0] for h in headers]
+        converters = [
+            (i, make_converter(*column_types[h]))
+            for i, h in enumerate(headers)
+            if h in column_types
+        ]
+        # Derived columns are appended as TEXT, cut from the raw source value
+        prefixes = [
+            (headers.index(source), length)
+            for _, source, length in dataset.derived_columns.get(table_name, ())
+        ]
+        for column, _, _ in dataset.derived_columns.get(table_name, ()):
+            headers.append(column)
+            col_types.append("TEXT")
+
+        # One transaction per table, covering the CREATE and every batch
+        cur.execute("BEGIN")
+        cols_def = ", ".join(f'"{h}" {t}' for h, t in zip(headers, col_types))
+        cur.execute(f"CREATE TABLE {table_name} ({cols_def})")
+
+        # Insert rows in batches, converting typed columns on the way in
+        placeholders = ", ".join(["?"] * len(headers))
+        insert_sql = f"INSERT INTO {table_name} VALUES ({placeholders})"
+        batch = []
+        batch_size = 10000
+        insert_time = 0.0
+        start = time.perf_counter()
+        for row in reader:
+            for i, length in prefixes:
+                row.append(row[i][:length])
+            for i, convert in converters:
+                row[i] = convert(row[i])
+            batch.append(row)
+            if len(batch) >= batch_size:
+                t = time.perf_counter()
+                cur.executemany(insert_sql, batch)
+                insert_time += time.perf_counter() - t
+                batch = []
+        if batch:
+            t = time.perf_counter()
+            cur.executemany(insert_sql, batch)
+            insert_time += time.perf_counter() - t
+        elapsed = time.perf_counter() - start
+
+    conn.commit()
+    print(
+        f"  {table_name}: parse {elapsed - insert_time:.2f}s, "
+        f"insert {insert_time:.2f}s"
+    )
+    count = cur.execute(f"SELECT COUNT(*) FROM {table_name}").fetchone()[0]
+    return count, schema_entry
+
+
+def stage_csv(dataset, opts, csv_file, table_name, stage_path, cache):
+    """Worker entry point: load one CSV into its own staging database."""
+    conn = sqlite3.connect(stage_path)
+    configure_connection(conn, opts)
+    try:
+        _, schema_entry = import_csv(
+            conn, dataset, opts, csv_file, table_name, cache
+        )
+    finally:
+        conn.close()
+    return stage_path, schema_entry
+
+
+def merge_stage(conn, stage_path, table_name):
+    """Copy a staged table into the main database via ATTACH."""
+    start = time.perf_counter()
+    conn.execute("ATTACH DATABASE ? AS stage", (stage_path,))
+    ddl = conn.execute(
+        "SELECT sql FROM stage.sqlite_master WHERE type='table' AND name=?",
+        (table_name,),
+    ).fetchone()[0]
+    conn.execute("BEGIN")
+    conn.execute(ddl)
+    conn.execute(f"INSERT INTO main.{table_name} SELECT * FROM stage.{table_name}")
+    conn.commit()
+    print(f"  {table_name}: merge {time.perf_counter() - start:.2f}s")
+    conn.execute("DETACH DATABASE stage")
+    return conn.execute(f"SELECT COUNT(*) FROM {table_name}").fetchone()[0]
+
+
+def import_tables_parallel(conn, dataset, opts, tables, cache):
+    """Parse each CSV in tables in its own process, then merge the stages.
+
+    Merging happens in csv_tables order as each worker finishes, so the
+    main database is written while the remaining files are still parsing.
+    Returns the inferred schema entries keyed by table name.
+    """
+    inferred = {}
+    stage_dir = tempfile.mkdtemp(
+        prefix="ies_stage_", dir=os.path.dirname(os.path.abspath(opts.db_path))
+    )
+    try:
+        with ProcessPoolExecutor(max_workers=min(opts.workers, len(tables))) as pool:
+            futures = [
+                (table_name, pool.submit(
+                    stage_csv, dataset, opts, csv_file, table_name,
+                    os.path.join(stage_dir, f"{table_name}.db"), cache,
+                ))
+                for csv_file, table_name in tables.items()
+            ]
+            for table_name, future in futures:
+                stage_path, schema_entry = future.result()
+                if schema_entry:
+                    inferred[table_name] = schema_entry
+                count = merge_stage(conn, stage_path, table_name)
+                print(f"  -> {table_name}: {count:,} rows imported")
+    finally:
+        shutil.rmtree(stage_dir, ignore_errors=True)
+    return inferred
+
+
+def build(dataset, opts=None):
+    """Build or incrementally update the SQLite database for dataset."""
+    opts = opts or BuildOptions.from_env(dataset)
+    if opts.full_rebuild:
+        if os.path.exists(opts.db_path):
+            os.remove(opts.db_path)
+        shutil.rmtree(columnar.columnar_dir(opts.db_path), ignore_errors=True)
+
+    timer = PhaseTimer()
+    fresh = not os.path.exists(opts.db_path) or os.path.getsize(opts.db_path) == 0
+    conn = sqlite3.connect(opts.db_path)
+    configure_connection(conn, opts, fresh)
+    cur = conn.cursor()
+    meta, source_stats = read_build_meta(conn)
+    existing_indexes = index_names(conn)
+    # Forget tables and steps the dataset no longer defines
+    known = [
+        *dataset.csv_tables.values(), *(s.name for s in dataset.derived_steps),
+        "_lookups", "_views",
+    ]
+    for name in set(meta) - set(known):
+        cur.execute("DELETE FROM _build_meta WHERE name = ?", (name,))
+        del meta[name]
+    conn.commit()
+
+    lookups_hash = text_hash(
+        json.dumps([COICOP_LOOKUP, PROVINCE_LOOKUP, dataset.settlements])
+    )
+    lookups_rebuilt = meta.get("_lookups") != (lookups_hash, "", IMPORTER_VERSION)
+    if lookups_rebuilt:
+        create_lookup_tables(cur, dataset.settlements)
+        conn.commit()
+        record_build(conn, meta, "_lookups", "lookups", lookups_hash, "")
+    else:
+        print("  lookups are up to date")
+    timer.lap("lookups")
+
+    # --- Find source tables whose CSV or column types changed ---
+    cache = load_schema_cache(opts)
+    stats = {csv_file: source_stat(opts, csv_file) for csv_file in dataset.csv_tables}
+    fingerprints = {}
+    for csv_file, table_name in dataset.csv_tables.items():
+        # Only hash the full CSV when its stat differs from the last build
+        known_stat, known_hash = source_stats.get(table_name, (None, None))
+        content = known_hash if known_stat == stats[csv_file] else None
+        fingerprints[csv_file] = (
+            content or source_hash(opts, csv_file),
+            schema_hash(dataset, opts, csv_file, table_name, cache),
+        )
+    stale = {
+        csv_file: table_name
+        for csv_file, table_name in dataset.csv_tables.items()
+        if meta.get(table_name) != (*fingerprints[csv_file], IMPORTER_VERSION)
+    }
+    for csv_file, table_name in dataset.csv_tables.items():
+        if csv_file not in stale:
+            print(f"  {table_name} is up to date")
+    timer.lap("fingerprint")
+
+    # --- Import changed CSV files ---
+    for table_name in stale.values():
+        cur.execute("DELETE FROM _build_meta WHERE name = ?", (table_name,))
+        cur.execute(f"DROP TABLE IF EXISTS {table_name}")
+    conn.commit()
+    workers = min(opts.workers, len(stale))
+    if workers > 1:
+        print(f"Importing {len(stale)} CSV files with {workers} workers...")
+        inferred = import_tables_parallel(conn, dataset, opts, stale, cache)
+    else:
+        inferred = {}
+        for csv_file, table_name in stale.items():
+            count, schema_entry = import_csv(
+                conn, dataset, opts, csv_file, table_name, cache
+            )
+            if schema_entry:
+                inferred[table_name] = schema_entry
+            print(f"  -> {count:,} rows imported")
+    if any(cache.get(table) != entry for table, entry in inferred.items()):
+        cache = {**cache, **inferred}
+        save_schema_cache(opts, cache)
+        print(f"Inferred schema saved to {opts.schema_path}")
+    for csv_file, table_name in stale.items():
+        record_build(
+            conn, meta, table_name, csv_file, fingerprints[csv_file][0],
+            schema_hash(dataset, opts, csv_file, table_name, cache),
+            stats[csv_file],
+        )
+    timer.lap("import")
+
+    # --- Create indexes (dropped along with any rebuilt table) ---
+    print("Creating indexes...")
+    for ddl in dataset.indexes:
+        cur.execute(ddl)
+    conn.commit()
+    timer.lap("indexes")
+
+    # --- Derived tables and columns ---
+    rebuilt = list(stale.values())
+    for step in dataset.derived_steps:
+        if run_derived_step(conn, meta, step):
+            rebuilt.extend(step.outputs)
+        timer.lap(step.name)
+
+    # Views are recreated once every table they read is current
+    views_hash = text_hash(*(ddl for _, ddl in dataset.views))
+    if (rebuilt or lookups_rebuilt
+            or meta.get("_views") != (views_hash, "", IMPORTER_VERSION)):
+        print("Creating views...")
+        for name, ddl in dataset.views:
+            cur.execute(f"DROP VIEW IF EXISTS {name}")
+            cur.execute(ddl)
+        conn.commit()
+        record_build(conn, meta, "_views", "views", views_hash, "")
+    timer.lap("views")
+
+    examples = load_example_queries(dataset) if opts.plan_report else []
+    recreated = set()
+    if examples:
+        # On an incremental build the workload indexes already exist; drop
+        # them (and with them their statistics) so "before" means before
+        recreated = {
+            ddl.split(" IF NOT EXISTS ")[1].split()[0]
+            for ddl in dataset.workload_indexes
+        } & existing_indexes
+        for name in recreated:
+            cur.execute(f"DROP INDEX {name}")
+        conn.commit()
+    plans_before = query_plans(conn, examples)
+
+    print("Creating workload indexes...")
+    for ddl in dataset.workload_indexes:
+        cur.execute(ddl)
+    conn.commit()
+    timer.lap("workload indexes")
+
+    finalize_database(
+        conn, timer, rebuilt=bool(rebuilt),
+        new_indexes=(index_names(conn) - existing_indexes) | recreated,
+        lookups=lookups_rebuilt,
+    )
+
+    # Arrow copies of rebuilt tables (by table name, so every output of a
+    # derived step) are stale whether or not we re-export
+    columnar.remove_exports(
+        opts.db_path, [*rebuilt, *(LOOKUP_TABLES if lookups_rebuilt else ())]
+    )
+    if opts.columnar:
+        print("Exporting columnar copies...")
+        tables = [
+            name for (name,) in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table'"
+                " AND name NOT LIKE 'sqlite_%' AND name != '_build_meta'"
+                " ORDER BY name"
+            )
+        ]
+        columnar.export_tables(conn, opts.db_path, tables)
+        timer.lap("columnar export")
+    if examples:
+        print_plan_report(examples, plans_before, query_plans(conn, examples))
+    conn.close()
+    print(f"Done! Database updated: {opts.db_path} in {timer.total():.2f}s")
@@ -0,0 +1,180 @@
+"""Lookup tables shared by every IES wave.
+
+COICOP divisions/groups and provinces are the same across waves; settlement
+type codes changed between surveys, so each Dataset supplies its own.
+"""
+
+LOOKUP_TABLES = ("coicop_lookup", "province_lookup", "settlement_lookup")
+
+COICOP_LOOKUP = [
+    # Expenditure Divisions (level='division')
+    ("01", "division", "Food and non-alcoholic beverages"),
+    ("02", "division", "Alcoholic beverages, tobacco and narcotics"),
+    ("03", "division", "Clothing and footwear"),
+    ("04", "division", "Housing, water, electricity, gas and other fuels"),
+    ("05", "division", "Furnishings, household equipment and routine maintenance"),
+    ("06", "division", "Health"),
+    ("07", "division", "Transport"),
+    ("08", "division", "Information and communication"),
+    ("09", "division", "Recreation, sport and culture"),
+    ("10", "division", "Education services"),
+    ("11", "division", "Restaurants and accommodation services"),
+    ("12", "division", "Insurance and financial services"),
+    ("13", "division", "Personal care, social protection and miscellaneous"),
+    # Income Divisions
+    ("50", "division", "Income: Salaries and wages"),
+    ("51", "division", "Income: From business or profession"),
+    ("52", "division", "Income: Other income"),
+    ("53", "division", "Income: Grants and transfers"),
+    ("66", "division", "Income: In-kind"),
+    ("70", "division", "Income: Expenditure in kind (own production)"),
+    ("71", "division", "Income: Expenditure in kind (received)"),
+    ("80", "division", "Income: Imputed rent"),
+    ("99", "division", "Income: Other/unclassified"),
+
+    # Expenditure Groups (level='group')
+    ("011", "group", "Food"),
+    ("012", "group", "Non-alcoholic beverages"),
+    ("013", "group", "Food not elsewhere classified"),
+    ("021", "group", "Alcoholic beverages"),
+    ("022", "group", "Tobacco"),
+    ("023", "group", "Narcotics"),
+    ("024", "group", "Alcoholic bev/tobacco NEC"),
+    ("031", "group", "Clothing"),
+    ("032", "group", "Footwear"),
+    ("040", "group", "Actual and imputed rentals for housing"),
+    ("041", "group", "Actual rentals for housing"),
+    ("042", "group", "Imputed rentals for housing"),
+    ("043", "group", "Maintenance and repair of dwelling"),
+    ("044", "group", "Water supply and sanitation services"),
+    ("045", "group", "Electricity, gas and other fuels"),
+    ("051", "group", "Furniture, furnishings and carpets"),
+    ("052", "group", "Household textiles"),
+    ("053", "group", "Household appliances"),
+    ("054", "group", "Glassware, tableware and household utensils"),
+    ("055", "group", "Tools and equipment for house and garden"),
+    ("056", "group", "Goods and services for routine household maintenance"),
+    ("061", "group", "Medicines and health products"),
+    ("062", "group", "Outpatient care services"),
+    ("063", "group", "Inpatient care services"),
+    ("064", "group", "Other health services"),
+    ("071", "group", "Purchase of vehicles"),
+    ("072", "group", "Operation of personal transport equipment"),
+    ("073", "group", "Passenger transport services"),
+    ("074", "group", "Transport services NEC"),
+    ("081", "group", "Information and communication equipment"),
+    ("082", "group", "Software, media and recordings"),
+    ("083", "group", "Information and communication services"),
+    ("091", "group", "Recreational durables"),
+    ("092", "group", "Other recreational goods"),
+    ("093", "group", "Garden products and pets"),
+    ("094", "group", "Recreational services"),
+    ("095", "group", "Cultural services"),
+    ("096", "group", "Newspapers, books and stationery"),
+    ("097", "group", "Package holidays"),
+    ("098", "group", "Recreation NEC"),
+    ("101", "group", "Pre-primary and primary education"),
+    ("102", "group", "Secondary education"),
+    ("103", "group", "Post-secondary non-tertiary education"),
+    ("104", "group", "Tertiary education"),
+    ("105", "group", "Education not definable by level"),
+    ("111", "group", "Food and beverage serving services"),
+    ("112", "group", "Accommodation services"),
+    ("121", "group", "Insurance"),
+    ("122", "group", "Financial services"),
+    ("131", "group", "Personal care"),
+    ("132", "group", "Personal effects NEC"),
+    ("133", "group", "Social protection"),
+    ("139", "group", "Other services NEC"),
+
+    # Income Groups
+    ("501", "group", "Income: Salaries/wages - regular"),
+    ("502", "group", "Income: Salaries/wages - overtime"),
+    ("503", "group", "Income: Salaries/wages - bonus"),
+    ("504", "group", "Income: Salaries/wages - commission"),
+    ("505", "group", "Income: Salaries/wages - allowances"),
+    ("506", "group", "Income: Salaries/wages - other"),
+    ("512", "group", "Income: Net profit - professional practice"),
+    ("514", "group", "Income: Net profit - farming"),
+    ("515", "group", "Income: Net profit - transport"),
+    ("516", "group", "Income: Net profit - retail/trading"),
+    ("517", "group", "Income: Net profit - manufacturing"),
+    ("518", "group", "Income: Net profit - services"),
+    ("519", "group", "Income: Net profit - other"),
+    ("521", "group", "Income: Rental income"),
+    ("522", "group", "Income: Royalties"),
+    ("523", "group", "Income: Interest received"),
+    ("524", "group", "Income: Dividends"),
+    ("525", "group", "Income: Shareholders"),
+    ("526", "group", "Income: Private pensions"),
+    ("527", "group", "Income: Annuities"),
+    ("531", "group", "Income: Social grants - old age"),
+    ("532", "group", "Income: Social grants - disability"),
+    ("533", "group", "Income: Social grants - child support"),
+    ("534", "group", "Income: Social grants - other"),
+    ("663", "group", "Income: In-kind benefits"),
+    ("701", "group", "Income in kind: Own production - cereals"),
+    ("702", "group", "Income in kind: Own production - vegetables"),
+    ("703", "group", "Income in kind: Own production - fruit"),
+    ("704", "group", "Income in kind: Own production - meat"),
+    ("705", "group", "Income in kind: Own production - dairy"),
+    ("706", "group", "Income in kind: Own production - other food"),
+    ("707", "group", "Income in kind: Own production - beverages"),
+    ("708", "group", "Income in kind: Own production - tobacco"),
+    ("709", "group", "Income in kind: Own production - other"),
+    ("711", "group", "Income in kind: Received - cereals"),
+    ("712", "group", "Income in kind: Received - vegetables"),
+    ("713", "group", "Income in kind: Received - fruit"),
+    ("714", "group", "Income in kind: Received - meat"),
+    ("715", "group", "Income in kind: Received - dairy"),
+    ("716", "group", "Income in kind: Received - other food"),
+    ("717", "group", "Income in kind: Received - beverages"),
+    ("718", "group", "Income in kind: Received - tobacco"),
+    ("719", "group", "Income in kind: Received - other"),
+    ("801", "group", "Income: Imputed rent - owner occupied"),
+    ("804", "group", "Income: Imputed rent - free/subsidised"),
+    ("991", "group", "Income: Other unclassified"),
+]
+
+PROVINCE_LOOKUP = [
+    ("1", "Western Cape"), ("2", "Eastern Cape"), ("3", "Northern Cape"),
+    ("4", "Free State"), ("5", "KwaZulu-Natal"), ("6", "North West"),
+    ("7", "Gauteng"), ("8", "Mpumalanga"), ("9", "Limpopo"),
+]
+
+
+def create_lookup_tables(cur, settlements):
+    """Create and populate the COICOP, province and settlement lookups."""
+    # --- COICOP Lookup Table ---
+    print("Creating COICOP lookup table...")
+    cur.execute("DROP TABLE IF EXISTS coicop_lookup")
+    cur.execute("""
+    CREATE TABLE coicop_lookup (
+        code TEXT PRIMARY KEY,
+        level TEXT,
+        label TEXT
+    )
+    """)
+    cur.executemany("INSERT INTO coicop_lookup VALUES (?, ?, ?)", COICOP_LOOKUP)
+
+    # --- Province Lookup ---
+    print("Creating province lookup table...")
+    cur.execute("DROP TABLE IF EXISTS province_lookup")
+    cur.execute("""
+    CREATE TABLE province_lookup (
+        code TEXT PRIMARY KEY,
+        name TEXT
+    )
+    """)
+    cur.executemany("INSERT INTO province_lookup VALUES (?, ?)", PROVINCE_LOOKUP)
+
+    # --- Settlement Type Lookup ---
+    print("Creating settlement type lookup table...")
+    cur.execute("DROP TABLE IF EXISTS settlement_lookup")
+    cur.execute("""
+    CREATE TABLE settlement_lookup (
+        code TEXT PRIMARY KEY,
+        name TEXT
+    )
+    """)
+    cur.executemany("INSERT INTO settlement_lookup VALUES (?, ?)", settlements)
@@ -0,0 +1,157 @@
+"""Shared fixtures: small synthetic IES releases and the databases built from them.
+
+The zips mirror the real Stats SA releases in member names, headers and
+value formats (sentinel codes, blank cells, 8-digit 2011 COICOP codes), but
+hold a few hundred households, so a full build takes well under a second.
+"""
+import csv
+import io
+import os
+import random
+import sys
+import zipfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# The webapp modules import each other as top-level modules
+sys.path.insert(0, os.path.join(ROOT, "webapp"))
+
+from ies_import import DATASETS, BuildOptions, build  # noqa: E402
+
+HOUSEHOLDS = 200
+DIVISIONS = ("01", "02", "04", "06", "07", "11", "50", "53")
+
+
+def _write(zf, name, header, rows, quote_all=False):
+    buf = io.StringIO()
+    quoting = csv.QUOTE_NONNUMERIC if quote_all else csv.QUOTE_MINIMAL
+    writer = csv.writer(buf, quoting=quoting)
+    writer.writerow(header)
+    writer.writerows(rows)
+    zf.writestr(name, buf.getvalue())
+
+
+def make_ies2023_zip(path, households=HOUSEHOLDS, seed=1):
+    rng = random.Random(seed)
+    n = households
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        _write(zf, "Fact_IES2023_Geography.csv",
+               ["UQNO", "Metro_Code", "Province", "Settlement_Type", "SurveyDate"],
+               [[f"{i:08d}", rng.choice(["1", "2", "88"]), str(rng.randint(1, 9)),
+                 str(rng.randint(1, 4)), "2023-01-01"] for i in range(n)])
+        _write(zf, "Fact_IES2023_Households.csv",
+               ["UQNO", "hsize", "income", "expenditure", "expenditure_decile",
+                "head_population", "head_age", "head_sex", "head_education",
+                "eoh_meds", "hhold_wgt", "has_cell", "has_tv", "lcf_anomoney",
+                "has_stove", "has_fridge", "has_satellite", "has_washin",
+                "has_vehicle", "has_desktop", "lcf_askip", "lcf_alack"],
+               [[f"{i:08d}", rng.randint(1, 9),
+                 "" if i % 20 == 0 else round(rng.uniform(1000, 500000), 2),
+                 round(rng.uniform(1000, 400000), 2), rng.randint(1, 10),
+                 rng.choice("1234"), rng.choice([rng.randint(18, 95), 888]),
+                 rng.choice("12"), rng.choice(["01", "12", "98"]), rng.choice("12"),
+                 round(rng.uniform(100, 2000), 3)]
+                + [rng.choice("12") for _ in range(11)] for i in range(n)])
+        _write(zf, "Fact_IES2023_PersonIncome.csv",
+               ["PERSON_ID", "UQNO", "COICOP", "valueannualized_adj", "persns_wgt"],
+               [[f"{i % n:08d}01", f"{i % n:08d}", "50110",
+                 round(rng.uniform(0, 10000), 2), 1.5] for i in range(n * 2)])
+        _write(zf, "Fact_IES2023_Persons.csv",
+               ["UQNO", "PERSON_ID", "PERSONNO", "age", "sex"],
+               [[f"{i % n:08d}", f"{i % n:08d}{i // n + 1:02d}", i // n + 1,
+                 rng.randint(0, 99), rng.choice("12")] for i in range(n * 3)])
+        rows = []
+        for i in range(n * 10):
+            d = rng.choice(DIVISIONS)
+            rows.append([f"{i % n:08d}", d + "111", d, d + "1",
+                         round(rng.uniform(1, 5000), 2), round(rng.uniform(1, 5e6), 2)])
+        _write(zf, "Fact_IES2023_Total.csv",
+               ["UQNO", "COICOP", "Division", "Group", "valueannualized_adj",
+                "valueannualized_adj_wgt"], rows, quote_all=True)
+
+
+def make_ies2011_zip(path, households=HOUSEHOLDS, seed=2):
+    rng = random.Random(seed)
+    n = households
+    # Members sit in a top-level folder, as in the real 2010/11 release
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        _write(zf, "IES2011/IES2011HOUSE.csv",
+               ["UqNo", "Province", "Settlement_type", "SurveyYear", "SurveyMonth",
+                "hsize", "Income", "Consumptions", "ConsumptionDecile",
+                "PopGrpOfHead", "Full_calwgt", "q5101a14cellularphone",
+                "q5101a06stove", "q5101a05refrigerator", "q5101a03television",
+                "q5101a16dstv", "q5101a08washingmachine", "q5101a09motorvehicle",
+                "q5101a11computer"],
+               [[f"{i:010d}", rng.randint(1, 9), rng.choice([1, 2, 4, 5]), 2010,
+                 rng.randint(1, 12), rng.randint(1, 9),
+                 round(rng.uniform(1000, 500000), 2), round(rng.uniform(1000, 400000), 2),
+                 rng.randint(1, 10), rng.randint(1, 4), round(rng.uniform(100, 2000), 3)]
+                + [rng.choice("12") for _ in range(8)] for i in range(n)])
+        _write(zf, "IES2011/IES2011PERSON.csv", ["UqNo", "PersonNo", "Q14Age"],
+               [[f"{i % n:010d}", i // n + 1, rng.randint(0, 99)] for i in range(n * 3)])
+        _write(zf, "IES2011/IES2011PERSONINCOME.csv",
+               ["UqNo", "PersonNo", "Coicop", "Value"],
+               [[f"{i % n:010d}", 1, "50110000", round(rng.uniform(0, 10000), 2)]
+                for i in range(n * 2)])
+        rows = []
+        for i in range(n * 10):
+            d = rng.choice(DIVISIONS)
+            rows.append([f"{i % n:010d}", d + "111100", round(rng.uniform(1, 5000), 2),
+                         round(rng.uniform(1, 5000), 2)])
+        _write(zf, "IES2011/IES2011TOTAL.csv",
+               ["UqNo", "Coicop", "Valueannualized", "Value"], rows)
+
+
+MAKE_ZIP = {"ies2023": make_ies2023_zip, "ies2011": make_ies2011_zip}
+
+
+def build_dataset(directory, dataset_id, **options):
+    """Build dataset_id from a fresh synthetic zip in directory; return opts."""
+    dataset = DATASETS[dataset_id]
+    zip_path = os.path.join(directory, dataset.zip_path)
+    if not os.path.exists(zip_path):
+        MAKE_ZIP[dataset_id](zip_path)
+    options.setdefault("workers", 1)
+    opts = BuildOptions(
+        db_path=os.path.join(directory, dataset.db_path),
+        zip_path=zip_path,
+        csv_dir=os.path.join(directory, "csv_temp"),
+        **options,
+    )
+    build(dataset, opts)
+    return opts
+
+
+@pytest.fixture(scope="session")
+def db_dir(tmp_path_factory):
+    """A directory holding both synthetic databases, built once per session."""
+    directory = str(tmp_path_factory.mktemp("dbs"))
+    for dataset_id in DATASETS:
+        build_dataset(directory, dataset_id)
+    return directory
+
+
+@pytest.fixture(scope="session")
+def webapp(db_dir, tmp_path_factory):
+    """The Flask app module, serving the synthetic databases.
+
+    The app reads its settings once at import, so it is imported once per
+    session with its caches and job store in a temporary directory.
+    """
+    state = tmp_path_factory.mktemp("webapp")
+    env = pytest.MonkeyPatch()
+    env.setenv("IES_DB_DIR", db_dir)
+    env.setenv("QUERY_CACHE_PATH", str(state / "query_cache.db"))
+    env.setenv("JOB_STORE_PATH", str(state / "jobs.db"))
+    env.delenv("COLUMN_STORE_PRELOAD", raising=False)
+    import app
+
+    yield app
+    env.undo()
+
+
+@pytest.fixture
+def client(webapp):
+    return webapp.app.test_client()
@@ -0,0 +1,84 @@
+"""Weighted statistics from /api/aggregate match a brute-force computation,
+and malformed requests are rejected."""
+import sqlite3
+
+import numpy as np
+import pytest
+
+
+def _households(db_dir, dataset_id):
+    conn = sqlite3.connect(f"file:{db_dir}/{dataset_id}.db?mode=ro", uri=True)
+    rows = conn.execute(
+        "SELECT province, income, weight FROM harmonised_households"
+        " WHERE province IS NOT NULL AND income IS NOT NULL AND weight IS NOT NULL"
+    ).fetchall()
+    conn.close()
+    return rows
+
+
+@pytest.mark.parametrize("dataset_id", ["ies2023", "ies2011"])
+def test_matches_brute_force(client, db_dir, dataset_id):
+    body = client.post("/api/aggregate", json={
+        "dataset": dataset_id, "measure": "income", "by": "province",
+        "quantiles": [0.25],
+    }).get_json()
+    assert body["columns"][:2] == ["province", "province_name"]
+    rows = _households(db_dir, dataset_id)
+    for group in body["rows"]:
+        x = np.array([r[1] for r in rows if str(r[0]) == str(group["province"])])
+        w = np.array([r[2] for r in rows if str(r[0]) == str(group["province"])])
+        assert group["n"] == len(x)
+        assert group["mean"] == pytest.approx(np.average(x, weights=w))
+        assert group["total"] == pytest.approx((x * w).sum())
+        order = np.argsort(x, kind="stable")
+        running = np.cumsum(w[order])
+        median = x[order][np.searchsorted(running, 0.5 * w.sum())]
+        assert group["median"] == pytest.approx(median)
+        assert 0 <= group["gini"] < 1
+        assert "p25" in group
+    assert sum(group["n"] for group in body["rows"]) == len(rows)
+
+
+def test_unweighted_ungrouped(client, db_dir):
+    body = client.post("/api/aggregate", json={
+        "measure": "income", "weight": None, "stats": ["mean"], "format": "arrays",
+    }).get_json()
+    assert body["columns"] == ["n", "weight_total", "mean"]
+    conn = sqlite3.connect(f"file:{db_dir}/ies2023.db?mode=ro", uri=True)
+    count, mean = conn.execute(
+        "SELECT COUNT(income), AVG(income) FROM harmonised_households"
+    ).fetchone()
+    conn.close()
+    assert body["rows"] == [[count, count, pytest.approx(mean)]]
+
+
+@pytest.mark.parametrize("body", [
+    ["income"],
+    {"measure": "income", "dataset": ["ies2023"]},
+    {"measure": "wealth"},
+    {"measure": ["income"]},
+    {"measure": "income", "by": [["province"]]},
+    {"measure": "income", "by": [1]},
+    {"measure": "income", "by": 1},
+    {"measure": "income", "by": {"province": 1}},
+    {"measure": "income", "by": ["province", "province"]},
+    {"measure": "income", "stats": [["mean"]]},
+    {"measure": "income", "stats": 3},
+    {"measure": "income", "stats": ["mode"]},
+    {"measure": "income", "quantiles": ["0.5"]},
+    {"measure": "income", "quantiles": [True]},
+    {"measure": "income", "quantiles": [1.5]},
+    {"measure": "income", "quantiles": [-0.1]},
+    {"measure": "income", "quantiles": 0.5},
+    {"measure": "income", "quantiles": [None]},
+    {"measure": "income", "weight": "hhold_wgt"},
+    {"measure": "income", "format": "csv"},
+])
+def test_bad_requests_are_400_before_loading(webapp, client, monkeypatch, body):
+    def untouched(ds):
+        raise AssertionError("the column store was read")
+
+    monkeypatch.setattr(webapp, "_column_store", untouched)
+    response = client.post("/api/aggregate", json=body)
+    assert response.status_code == 400
+    assert "error" in response.get_json()
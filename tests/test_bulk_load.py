@@ -0,0 +1,22 @@
+"""A bulk-load build ends with a journal, its deferred indexes and a clean
+integrity check."""
+import os
+import sqlite3
+
+from conftest import build_dataset
+from ies_import import engine
+
+
+def test_bulk_build_leaves_a_finished_database(tmp_path):
+    opts = build_dataset(str(tmp_path), "ies2023", bulk_load=True)
+    conn = sqlite3.connect(opts.db_path)
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
+    assert conn.execute("PRAGMA page_size").fetchone()[0] == engine.PAGE_SIZE
+    assert conn.execute("PRAGMA integrity_check").fetchone()[0] == "ok"
+    indexes = {name for (name,) in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'index'"
+    )}
+    assert "idx_households_uqno" in indexes
+    conn.close()
+    assert not os.path.exists(opts.db_path + "-journal")
+
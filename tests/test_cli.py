@@ -0,0 +1,46 @@
+"""python -m ies_import selects datasets and overrides paths from its flags."""
+import os
+import sqlite3
+
+import pytest
+
+from conftest import make_ies2011_zip
+from ies_import.__main__ import PATH_VARS, main
+
+
+@pytest.fixture(autouse=True)
+def clean_env(monkeypatch):
+    for var in PATH_VARS:
+        monkeypatch.delenv(var, raising=False)
+
+
+def test_builds_one_dataset_with_path_overrides(tmp_path):
+    zip_path = tmp_path / "release.zip"
+    make_ies2011_zip(zip_path)
+    db_path = tmp_path / "out.db"
+    main(["ies2011", "--db", str(db_path), "--zip", str(zip_path), "--workers", "1",
+          "--infer-schema"])
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT COUNT(*) FROM households").fetchone()[0] > 0
+    conn.close()
+    # The inferred-schema cache follows the database, not the default path
+    assert os.path.exists(tmp_path / "out.schema.json")
+
+
+def test_unknown_dataset_is_rejected(capsys):
+    with pytest.raises(SystemExit) as exc:
+        main(["ies1999"])
+    assert exc.value.code == 2
+    assert "unknown dataset: ies1999" in capsys.readouterr().err
+
+
+@pytest.mark.parametrize("argv,env", [
+    (["ies2023", "ies2011", "--db", "x.db"], {}),
+    ([], {"ZIP_PATH": "x.zip"}),
+])
+def test_path_overrides_need_a_single_dataset(monkeypatch, capsys, argv, env):
+    for var, value in env.items():
+        monkeypatch.setenv(var, value)
+    with pytest.raises(SystemExit):
+        main(argv)
+    assert "only be overridden when building one dataset" in capsys.readouterr().err
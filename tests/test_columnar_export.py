@@ -0,0 +1,82 @@
+"""Arrow copies of every table, their cleanup and the analysis readers."""
+import sqlite3
+
+import numpy as np
+import pytest
+
+pytest.importorskip("pyarrow")
+
+import analysis  # noqa: E402
+import columnar  # noqa: E402
+from column_store import ColumnStore  # noqa: E402
+from conftest import build_dataset  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def exported(tmp_path_factory):
+    return build_dataset(str(tmp_path_factory.mktemp("arrow")), "ies2023", columnar=True)
+
+
+def test_every_table_is_exported(exported):
+    conn = sqlite3.connect(exported.db_path)
+    tables = [name for (name,) in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table'"
+        " AND name NOT LIKE 'sqlite_%' AND name != '_build_meta'"
+    )]
+    for table in tables:
+        assert columnar.available(exported.db_path, table)
+        count = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        assert columnar.read_table(exported.db_path, table).num_rows == count
+    conn.close()
+
+
+def test_rebuilt_table_copies_are_removed(tmp_path):
+    opts = build_dataset(str(tmp_path), "ies2023", columnar=True)
+    conn = sqlite3.connect(opts.db_path)
+    conn.execute("UPDATE _build_meta SET content_hash = 'x', source_stat = NULL"
+                 " WHERE name = 'persons'")
+    conn.commit()
+    conn.close()
+    build_dataset(str(tmp_path), "ies2023")
+    assert not columnar.available(opts.db_path, "persons")
+    assert columnar.available(opts.db_path, "households")
+
+
+def test_every_source_gives_the_same_sample(exported, monkeypatch):
+    monkeypatch.setattr(analysis, "DB_PATH", exported.db_path)
+    samples = [
+        analysis.select_sample(analysis.read_sqlite()),
+        analysis.select_sample(analysis.read_columnar()),
+        analysis.select_sample(analysis.read_store(ColumnStore(exported.db_path))),
+    ]
+    assert len(samples[0]["uqno"]) > 0
+    for sample in samples[1:]:
+        for column in analysis.COLUMNS:
+            np.testing.assert_array_equal(
+                np.asarray(sample[column]), np.asarray(samples[0][column])
+            )
+
+
+def test_sample_matches_the_sql_filter(exported, monkeypatch):
+    monkeypatch.setattr(analysis, "DB_PATH", exported.db_path)
+    conn = sqlite3.connect(exported.db_path)
+    expected = conn.execute("""
+    SELECT h.uqno, COALESCE(th.value_annualized, 0)
+    FROM households h
+    JOIN geography g ON h.uqno = g.uqno
+    LEFT JOIN household_division_totals th
+        ON th.uqno = h.uqno AND th.level = 'division' AND th.code = '06'
+    WHERE h.eoh_meds IN ('1', '2')
+      AND h.expenditure > 0
+      AND h.head_age > 0
+      AND h.head_population IN ('1','2','3','4')
+      AND h.head_education != '98'
+    ORDER BY h.uqno
+    """).fetchall()
+    conn.close()
+    sample = analysis.select_sample(analysis.read_sqlite())
+    got = sorted(zip(sample["uqno"], sample["health_exp"]))
+    assert [u for u, _ in got] == [u for u, _ in expected]
+    assert [v for _, v in got] == pytest.approx([v for _, v in expected])
+    data = analysis.load_data()
+    assert len(data["treated"]) == len(expected)
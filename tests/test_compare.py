@@ -0,0 +1,60 @@
+"""/api/compare runs one query per dataset and merges the pages by column."""
+import pytest
+
+SQL = "SELECT division, COUNT(*) AS items FROM total GROUP BY division ORDER BY division"
+
+
+def test_one_query_on_every_dataset(client):
+    body = client.post("/api/compare", json={"sql": SQL, "format": "arrays"}).get_json()
+    assert body["columns"] == ["dataset", "division", "items"]
+    assert set(body["datasets"]) == {"ies2023", "ies2011"}
+    for ds in ("ies2023", "ies2011"):
+        alone = client.post("/api/query", json={
+            "sql": SQL, "dataset": ds, "format": "arrays",
+        }).get_json()
+        assert [row[1:] for row in body["rows"] if row[0] == ds] == alone["rows"]
+
+
+def test_per_dataset_queries_merge_columns(client):
+    body = client.post("/api/compare", json={"sql": {
+        "ies2023": "SELECT COUNT(*) AS n, 'a' AS only_2023 FROM households",
+        "ies2011": "SELECT COUNT(*) AS n FROM households",
+    }}).get_json()
+    assert body["columns"] == ["dataset", "n", "only_2023"]
+    assert sorted(body["rows"], key=lambda row: row["dataset"]) == [
+        {"dataset": "ies2011", "n": 200, "only_2023": None},
+        {"dataset": "ies2023", "n": 200, "only_2023": "a"},
+    ]
+
+
+def test_failing_dataset_is_reported(client):
+    body = client.post("/api/compare", json={
+        "sql": "SELECT metro_code FROM geography LIMIT 1",
+    }).get_json()
+    assert "error" in body["datasets"]["ies2011"]
+    assert [row["dataset"] for row in body["rows"]] == ["ies2023"]
+
+
+@pytest.mark.parametrize("body", [
+    {"sql": 42},
+    {"sql": ["SELECT 1"]},
+    {"sql": {"ies2023": 1}},
+    {"sql": {"ies2023": None}},
+    {"sql": SQL, "datasets": "ies2023"},
+    {"sql": SQL, "datasets": [1]},
+    {"sql": SQL, "datasets": [["ies2023"]]},
+    {"sql": {"nope": SQL}},
+    {"sql": {}},
+    {"sql": SQL, "datasets": []},
+    {"sql": {"ies2023": SQL}, "datasets": ["ies2011"]},
+    ["SELECT 1"],
+])
+def test_malformed_requests_are_400(client, body):
+    response = client.post("/api/compare", json=body)
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+
+
+def test_non_string_sql_is_400_on_query(client):
+    assert client.post("/api/query", json={"sql": 1}).status_code == 400
+    assert client.post("/api/query", json={"sql": SQL, "dataset": []}).status_code == 400
@@ -0,0 +1,33 @@
+"""2011 division/group columns are cut from COICOP while total streams in."""
+import dataclasses
+import sqlite3
+
+from ies_import import IES2011, BuildOptions
+from ies_import.engine import schema_hash
+
+
+def test_division_and_group_are_coicop_prefixes(db_dir):
+    conn = sqlite3.connect(f"file:{db_dir}/ies2011.db?mode=ro", uri=True)
+    rows = conn.execute('SELECT coicop, division, "group" FROM total').fetchall()
+    assert rows
+    for coicop, division, group in rows:
+        assert len(coicop) == 8
+        assert division == coicop[:2]
+        assert group == coicop[:3]
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(total)")]
+    assert columns[-2:] == ["division", "group"]
+    conn.close()
+
+
+def test_derivation_is_part_of_the_total_fingerprint(db_dir):
+    conn = sqlite3.connect(f"file:{db_dir}/ies2011.db?mode=ro", uri=True)
+    meta = dict(conn.execute("SELECT name, schema_hash FROM _build_meta"))
+    conn.close()
+    opts = BuildOptions(db_path=f"{db_dir}/ies2011.db", zip_path=f"{db_dir}/IES2011.zip")
+    assert schema_hash(IES2011, opts, "IES2011TOTAL.csv", "total", {}) == meta["total"]
+    changed = dataclasses.replace(
+        IES2011, derived_columns={"total": (("division", "coicop", 2),)}
+    )
+    assert schema_hash(changed, opts, "IES2011TOTAL.csv", "total", {}) != meta["total"]
+    # Other tables are unaffected by the total derivation
+    assert schema_hash(changed, opts, "IES2011HOUSE.csv", "households", {}) == meta["households"]
@@ -0,0 +1,40 @@
+"""household_division_totals sums the line items per household and code."""
+import sqlite3
+
+import pytest
+
+from conftest import build_dataset
+
+
+@pytest.mark.parametrize("dataset_id,value_column,weight_column", [
+    ("ies2023", "valueannualized_adj", "hhold_wgt"),
+    ("ies2011", "valueannualized", "full_calwgt"),
+])
+def test_totals_match_line_items(db_dir, dataset_id, value_column, weight_column):
+    conn = sqlite3.connect(f"file:{db_dir}/{dataset_id}.db?mode=ro", uri=True)
+    for level, column in (("division", "division"), ("group", '"group"')):
+        expected = conn.execute(
+            f"SELECT t.uqno, t.{column}, SUM(t.{value_column}), COUNT(*),"
+            f" SUM(t.{value_column}) * h.{weight_column}"
+            " FROM total t LEFT JOIN households h ON h.uqno = t.uqno"
+            f" GROUP BY t.uqno, t.{column}"
+        ).fetchall()
+        actual = conn.execute(
+            "SELECT uqno, code, value_annualized, items, value_weighted"
+            " FROM household_division_totals WHERE level = ?", (level,)
+        ).fetchall()
+        assert len(actual) == len(expected)
+        got = {(u, c): (v, n, w) for u, c, v, n, w in actual}
+        for uqno, code, value, items, weighted in expected:
+            v, n, w = got[uqno, code]
+            assert n == items
+            assert v == pytest.approx(value)
+            assert w == pytest.approx(weighted)
+    conn.close()
+
+
+def test_summary_is_rebuilt_only_when_total_changes(tmp_path, capsys):
+    build_dataset(str(tmp_path), "ies2023")
+    capsys.readouterr()
+    build_dataset(str(tmp_path), "ies2023")
+    assert "household_division_totals is up to date" in capsys.readouterr().out
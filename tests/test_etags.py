@@ -0,0 +1,42 @@
+"""Schema and example listings are served with per-encoding ETags and 304s."""
+import gzip
+import json
+
+
+def test_tables_describe_the_schema(client):
+    body = client.get("/api/tables?dataset=ies2023").get_json()
+    assert body["tables"]["households"]["rows"] == 200
+    assert "household_geo" in body["views"]
+    assert "_build_meta" not in body["tables"]
+    indexes = {i["name"] for i in body["tables"]["total"]["indexes"]}
+    assert "idx_total_division_uqno_value" in indexes
+
+
+def test_revalidation_returns_304(client):
+    first = client.get("/api/tables?dataset=ies2011")
+    etag = first.headers["ETag"]
+    assert first.headers["Cache-Control"] == "no-cache"
+    again = client.get("/api/tables?dataset=ies2011", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.get_data() == b""
+    other = client.get("/api/tables?dataset=ies2023", headers={"If-None-Match": etag})
+    assert other.status_code == 200
+
+
+def test_each_encoding_has_its_own_tag(client):
+    plain = client.get("/api/tables")
+    zipped = client.get("/api/tables", headers={"Accept-Encoding": "gzip"})
+    assert zipped.headers["Content-Encoding"] == "gzip"
+    assert zipped.headers["ETag"] != plain.headers["ETag"]
+    assert json.loads(gzip.decompress(zipped.get_data())) == plain.get_json()
+    revalidated = client.get("/api/tables", headers={
+        "Accept-Encoding": "gzip", "If-None-Match": zipped.headers["ETag"],
+    })
+    assert revalidated.status_code == 304
+
+
+def test_examples_and_unknown_dataset(client):
+    examples = client.get("/api/examples?dataset=ies2011")
+    assert examples.headers["ETag"]
+    assert all("sql" in ex for ex in examples.get_json())
+    assert client.get("/api/tables?dataset=nope").status_code == 400
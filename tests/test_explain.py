@@ -0,0 +1,62 @@
+"""/api/explain flags slow access paths and estimates rows visited."""
+import pytest
+
+import explain
+
+
+@pytest.fixture(autouse=True)
+def small_tables_count_as_large(monkeypatch):
+    monkeypatch.setattr(explain, "LARGE_TABLE_ROWS", 100)
+
+
+def _explain(client, sql, dataset="ies2023"):
+    response = client.post("/api/explain", json={"sql": sql, "dataset": dataset})
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+
+def _messages(result):
+    return " ".join(w["message"] for w in result["warnings"])
+
+
+def test_full_scan_is_flagged(client):
+    result = _explain(client, "SELECT * FROM total WHERE valueannualized_adj > 1")
+    assert "Full scan of total (2,000 rows)" in _messages(result)
+    assert result["estimated_rows"] >= 2000
+    assert result["plan"][0]["detail"].startswith("SCAN")
+
+
+def test_cast_on_indexed_column_is_flagged(client):
+    result = _explain(client, "SELECT COUNT(*) FROM total t WHERE CAST(t.division AS INTEGER) = 6")
+    assert "CAST(division ...) stops SQLite using" in _messages(result)
+
+
+def test_indexed_lookup_is_cheap(client):
+    result = _explain(client, "SELECT * FROM households WHERE uqno = '00000001'")
+    assert result["warnings"] == []
+    assert result["cost"] == "low"
+    assert "USING INDEX" in result["plan"][0]["detail"]
+
+
+def test_view_aliases_resolve_to_tables(client):
+    # The view reads households as h
+    result = _explain(client, "SELECT * FROM household_geo", "ies2011")
+    assert "Full scan of households (200 rows)" in _messages(result)
+
+
+def test_errors_are_400(client):
+    for sql in ("SELECT nope FROM total", "DELETE FROM total"):
+        response = client.post("/api/explain", json={"sql": sql})
+        assert response.status_code == 400
+
+
+@pytest.mark.parametrize("body", [
+    [1],
+    {"sql": 1},
+    {"sql": "SELECT 1", "dataset": ["ies2023"]},
+    {"sql": "SELECT 1", "dataset": "ies1999"},
+])
+def test_malformed_bodies_are_400(client, body):
+    response = client.post("/api/explain", json=body)
+    assert response.status_code == 400
+    assert "error" in response.get_json()
@@ -0,0 +1,95 @@
+"""/api/export streams CSV, Arrow and Parquet and reports bad input as 400."""
+import csv
+import io
+
+import pytest
+
+import export
+from limits import QueryLimitError
+
+SQL = "SELECT uqno, coicop, valueannualized_adj FROM total ORDER BY rowid"
+
+
+def _checked_out(webapp):
+    return webapp.DATASETS["ies2023"]["engine"].pool.checkedout()
+
+
+def test_csv_download(client):
+    response = client.post("/api/export", json={"sql": SQL})
+    assert response.status_code == 200
+    assert 'filename="ies2023-query.csv"' in response.headers["Content-Disposition"]
+    rows = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+    assert rows[0] == ["uqno", "coicop", "valueannualized_adj"]
+    assert len(rows) == 2001
+
+
+@pytest.mark.parametrize("fmt", ["arrow", "parquet"])
+def test_binary_downloads(client, fmt):
+    pa = pytest.importorskip("pyarrow")
+    response = client.get("/api/export", query_string={"sql": SQL, "format": fmt})
+    body = response.get_data()
+    if fmt == "arrow":
+        table = pa.ipc.open_stream(body).read_all()
+    else:
+        import pyarrow.parquet as pq
+
+        table = pq.read_table(pa.BufferReader(body))
+    assert table.num_rows == 2000
+    assert table.schema.field("valueannualized_adj").type == pa.float64()
+
+
+def test_formats_hidden_without_pyarrow(webapp, client, monkeypatch):
+    if export.pa is not None:
+        assert b'data-format="parquet"' in client.get("/").get_data()
+    monkeypatch.setattr(export, "pa", None)
+    page = client.get("/").get_data()
+    assert b'data-format="csv"' in page
+    assert b'data-format="arrow"' not in page and b'data-format="parquet"' not in page
+    response = client.post("/api/export", json={"sql": SQL, "format": "arrow"})
+    assert response.status_code == 400
+
+
+def test_error_in_first_batch_is_a_400(webapp, client, monkeypatch):
+    monkeypatch.setattr(webapp, "QUERY_MAX_ROWS", 50)
+    monkeypatch.setattr(export, "EXPORT_BATCH_ROWS", 100)
+    response = client.post("/api/export", json={"sql": SQL})
+    assert response.status_code == 400
+    assert "QUERY_MAX_ROWS" in response.get_json()["error"]
+    assert _checked_out(webapp) == 0
+
+
+@pytest.mark.parametrize("fmt,sql,max_rows,error", [
+    # The row cap is passed in the second batch
+    ("csv", SQL, 150, QueryLimitError),
+    # A column that changes type after the first batch
+    ("arrow", "SELECT CASE WHEN rowid > 100 THEN 'x' ELSE 1 END AS v"
+     " FROM total ORDER BY rowid",
+     0, ValueError),
+])
+def test_error_mid_stream_aborts_the_transfer(
+    webapp, client, monkeypatch, fmt, sql, max_rows, error
+):
+    if fmt == "arrow":
+        pytest.importorskip("pyarrow")
+    monkeypatch.setattr(webapp, "QUERY_MAX_ROWS", max_rows)
+    monkeypatch.setattr(export, "EXPORT_BATCH_ROWS", 100)
+    response = client.post("/api/export", json={"sql": sql, "format": fmt})
+    # The headers (and the first batch) are already out
+    assert response.status_code == 200
+    with pytest.raises(error):
+        response.get_data()
+    assert _checked_out(webapp) == 0
+
+
+@pytest.mark.parametrize("url,body", [
+    ("/api/export", [1]),
+    ("/api/export", {"sql": ["x"]}),
+    ("/api/export", {"sql": SQL, "dataset": {"id": "ies2023"}}),
+    ("/api/query", [1]),
+    ("/api/jobs", [1]),
+    ("/api/jobs", {"sql": 1}),
+])
+def test_malformed_bodies_are_400(client, url, body):
+    response = client.post(url, json=body)
+    assert response.status_code == 400
+    assert "error" in response.get_json()
@@ -0,0 +1,55 @@
+"""/api/query returns objects, arrays or columns, compressed on request."""
+import gzip
+
+import pytest
+
+SQL = "SELECT uqno, division, valueannualized FROM total ORDER BY rowid LIMIT 20"
+
+
+def _rows(client, fmt):
+    body = client.post("/api/query", json={
+        "sql": SQL, "dataset": "ies2011", "format": fmt,
+    }).get_json()
+    return body["columns"], body
+
+
+def test_layouts_hold_the_same_values(client):
+    columns, objects = _rows(client, "objects")
+    _, arrays = _rows(client, "arrays")
+    _, by_column = _rows(client, "columns")
+    assert arrays["rows"] == [[row[c] for c in columns] for row in objects["rows"]]
+    assert by_column["data"] == [list(values) for values in zip(*arrays["rows"])]
+    assert "rows" not in by_column
+
+
+def test_empty_result_in_columns_layout(client):
+    body = client.post("/api/query", json={
+        "sql": "SELECT uqno, coicop FROM total WHERE 0", "format": "columns",
+    }).get_json()
+    assert body["data"] == [[], []]
+
+
+def test_unknown_format_is_rejected(client):
+    response = client.post("/api/query", json={"sql": SQL, "format": "xml"})
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("encoding", ["gzip", None])
+def test_large_bodies_are_compressed(client, encoding):
+    headers = {"Accept-Encoding": encoding} if encoding else {}
+    response = client.post("/api/query", json={
+        "sql": "SELECT * FROM total", "dataset": "ies2011",
+    }, headers=headers)
+    assert response.headers.get("Content-Encoding") == encoding
+    assert "Accept-Encoding" in response.headers["Vary"]
+    body = response.get_data()
+    if encoding:
+        body = gzip.decompress(body)
+    assert body.startswith(b"{")
+
+
+def test_small_bodies_are_not_compressed(client):
+    response = client.post("/api/query", json={
+        "sql": "SELECT 1 AS one",
+    }, headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in response.headers
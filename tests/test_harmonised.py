@@ -0,0 +1,108 @@
+"""Harmonised tables share one schema and one set of codes across waves."""
+import os
+import sqlite3
+
+import pytest
+
+from conftest import build_dataset
+from ies_import import DATASETS
+from ies_import.columnar import table_path
+from ies_import.datasets import HARMONISED_OUTPUTS, HARMONISED_TABLES
+
+
+@pytest.mark.parametrize("dataset_id", ["ies2023", "ies2011"])
+def test_harmonised_tables_share_one_schema(db_dir, dataset_id):
+    conn = sqlite3.connect(f"file:{db_dir}/{dataset_id}.db?mode=ro", uri=True)
+    for table, columns in HARMONISED_TABLES.items():
+        info = conn.execute(f"PRAGMA table_info({table})").fetchall()
+        assert [(row[1], row[2]) for row in info] == list(columns)
+    households = conn.execute(
+        "SELECT COUNT(*), COUNT(DISTINCT uqno) FROM harmonised_households"
+    ).fetchone()
+    assert households == (200, 200)
+    total = conn.execute(
+        "SELECT COUNT(*) FROM harmonised_total"
+    ).fetchone()[0]
+    assert total == conn.execute("SELECT COUNT(*) FROM total").fetchone()[0]
+    mapped = conn.execute(
+        "SELECT COUNT(*) FROM harmonised_columns"
+    ).fetchone()[0]
+    assert mapped == sum(len(columns) for columns in HARMONISED_TABLES.values())
+    conn.close()
+
+
+def test_every_derived_step_declares_its_tables(db_dir):
+    for dataset_id, dataset in DATASETS.items():
+        conn = sqlite3.connect(f"file:{db_dir}/{dataset_id}.db?mode=ro", uri=True)
+        tables = {name for (name,) in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table'"
+        )}
+        conn.close()
+        for step in dataset.derived_steps:
+            assert set(step.outputs) <= tables
+    harmonised = next(s for s in DATASETS["ies2023"].derived_steps if s.name == "harmonised")
+    assert harmonised.outputs == HARMONISED_OUTPUTS
+
+
+def test_rerun_step_replaces_every_arrow_copy(tmp_path):
+    pytest.importorskip("pyarrow")
+    opts = build_dataset(str(tmp_path), "ies2023", columnar=True)
+    paths = [table_path(opts.db_path, table) for table in HARMONISED_OUTPUTS]
+    conn = sqlite3.connect(opts.db_path)
+    conn.execute("UPDATE _build_meta SET schema_hash = 'x' WHERE name = 'harmonised'")
+    conn.commit()
+    conn.close()
+    # Without --columnar the stale copies are deleted...
+    build_dataset(str(tmp_path), "ies2023")
+    assert not any(os.path.exists(path) for path in paths)
+    assert os.path.exists(table_path(opts.db_path, "households"))
+    # ...and with it they are written again
+    build_dataset(str(tmp_path), "ies2023", columnar=True)
+    assert all(os.path.exists(path) for path in paths)
+
+
+def test_2011_settlement_codes_are_recoded(db_dir):
+    conn = sqlite3.connect(f"file:{db_dir}/ies2011.db?mode=ro", uri=True)
+    raw = dict(conn.execute("SELECT uqno, settlement_type FROM households"))
+    recoded = dict(conn.execute("SELECT uqno, settlement_type FROM harmonised_households"))
+    source = conn.execute(
+        "SELECT source FROM harmonised_columns WHERE table_name = 'harmonised_households'"
+        " AND column_name = 'settlement_type'"
+    ).fetchone()[0]
+    conn.close()
+    assert "5" in raw.values()
+    assert recoded == {uqno: {"5": "3"}.get(code, code) for uqno, code in raw.items()}
+    assert "WHEN '5' THEN '3'" in source
+
+
+def test_settlement_groups_agree_across_waves(client):
+    labels = {}
+    for dataset_id in DATASETS:
+        body = client.post("/api/aggregate", json={
+            "dataset": dataset_id, "measure": "income", "by": "settlement",
+            "stats": ["mean"],
+        }).get_json()
+        assert {row["settlement"] for row in body["rows"]} <= {"1", "2", "3", "4"}
+        for row in body["rows"]:
+            labels.setdefault(row["settlement"], set()).add(row["settlement_name"])
+    # Every code carries the same label in both waves
+    assert "3" in labels
+    assert all(len(names) == 1 and None not in names for names in labels.values())
+
+
+@pytest.mark.parametrize("dataset_id", ["ies2023", "ies2011"])
+def test_decile_example_agrees_with_aggregate(db_dir, client, dataset_id):
+    from examples import HARMONISED_EXAMPLES
+
+    example = next(e for e in HARMONISED_EXAMPLES if e["id"] == "weighted_deciles_harmonised")
+    conn = sqlite3.connect(f"file:{db_dir}/{dataset_id}.db?mode=ro", uri=True)
+    rows = conn.execute(example["sql"]).fetchall()
+    conn.close()
+    for measure, column in (("income", 1), ("expenditure", 2)):
+        body = client.post("/api/aggregate", json={
+            "dataset": dataset_id, "measure": measure, "by": "decile", "stats": ["mean"],
+        }).get_json()
+        means = {row["decile"]: row["mean"] for row in body["rows"]}
+        assert {row[0]: row[column] for row in rows} == {
+            decile: round(mean) for decile, mean in means.items() if 1 <= decile <= 10
+        }
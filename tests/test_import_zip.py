@@ -0,0 +1,50 @@
+"""The importer reads CSV members straight out of the release zip."""
+import os
+import sqlite3
+import zipfile
+
+import pytest
+
+from conftest import HOUSEHOLDS, build_dataset, make_ies2011_zip
+from ies_import import BuildOptions
+from ies_import.engine import open_csv
+
+
+def test_members_are_matched_by_base_name(tmp_path):
+    zip_path = tmp_path / "IES2011.zip"
+    make_ies2011_zip(zip_path)
+    opts = BuildOptions(db_path=str(tmp_path / "x.db"), zip_path=str(zip_path))
+    with open_csv(opts, "IES2011HOUSE.csv") as f:
+        assert f.readline().startswith("UqNo,Province")
+
+
+def test_missing_member_raises(tmp_path):
+    zip_path = tmp_path / "IES2011.zip"
+    make_ies2011_zip(zip_path)
+    opts = BuildOptions(db_path=str(tmp_path / "x.db"), zip_path=str(zip_path))
+    with pytest.raises(FileNotFoundError):
+        with open_csv(opts, "NOPE.csv"):
+            pass
+
+
+def test_falls_back_to_csv_dir_without_zip(tmp_path):
+    zip_path = tmp_path / "IES2011.zip"
+    make_ies2011_zip(zip_path)
+    csv_dir = tmp_path / "csv"
+    with zipfile.ZipFile(zip_path) as zf:
+        for name in zf.namelist():
+            (csv_dir).mkdir(exist_ok=True)
+            (csv_dir / os.path.basename(name)).write_bytes(zf.read(name))
+    os.remove(zip_path)
+    opts = BuildOptions(
+        db_path=str(tmp_path / "x.db"), zip_path=str(zip_path), csv_dir=str(csv_dir)
+    )
+    with open_csv(opts, "IES2011PERSON.csv") as f:
+        assert f.readline().strip() == "UqNo,PersonNo,Q14Age"
+
+
+def test_build_from_zip_leaves_no_extracted_files(tmp_path):
+    build_dataset(str(tmp_path), "ies2011")
+    assert not (tmp_path / "csv_temp").exists()
+    conn = sqlite3.connect(tmp_path / "ies2011.db")
+    assert conn.execute("SELECT COUNT(*) FROM households").fetchone()[0] == HOUSEHOLDS
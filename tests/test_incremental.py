@@ -0,0 +1,83 @@
+"""Reruns rebuild only what changed and rehash only CSVs whose stat changed."""
+import os
+import sqlite3
+
+from conftest import build_dataset
+from ies_import import engine
+
+
+def test_noop_rebuild_leaves_the_file_untouched(tmp_path, capsys):
+    opts = build_dataset(str(tmp_path), "ies2023")
+    os.utime(opts.db_path, ns=(1_000_000_000, 1_000_000_000))
+    with open(opts.db_path, "rb") as f:
+        before = f.read()
+    capsys.readouterr()
+    build_dataset(str(tmp_path), "ies2023")
+    out = capsys.readouterr().out
+    assert "lookups are up to date" in out
+    assert "Creating views" not in out
+    assert os.stat(opts.db_path).st_mtime_ns == 1_000_000_000
+    with open(opts.db_path, "rb") as f:
+        assert f.read() == before
+
+
+def test_only_changed_tables_are_rebuilt(tmp_path, capsys):
+    opts = build_dataset(str(tmp_path), "ies2023")
+    conn = sqlite3.connect(opts.db_path)
+    conn.execute("UPDATE _build_meta SET content_hash = 'x', source_stat = NULL"
+                 " WHERE name = 'persons'")
+    conn.commit()
+    conn.close()
+    capsys.readouterr()
+    build_dataset(str(tmp_path), "ies2023")
+    out = capsys.readouterr().out
+    assert "households is up to date" in out
+    assert "persons is up to date" not in out
+    # Nothing derived reads persons
+    assert "household_division_totals is up to date" in out
+
+
+def test_bulk_mode_only_for_a_fresh_file(tmp_path, monkeypatch):
+    modes = []
+    configure = engine.configure_connection
+
+    def spy(conn, opts, fresh=True):
+        configure(conn, opts, fresh)
+        modes.append(conn.execute("PRAGMA journal_mode").fetchone()[0])
+
+    monkeypatch.setattr(engine, "configure_connection", spy)
+    opts = build_dataset(str(tmp_path), "ies2023")
+    build_dataset(str(tmp_path), "ies2023")
+    assert modes == ["off", "delete"]
+    conn = sqlite3.connect(opts.db_path)
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
+    conn.close()
+
+
+def _count_hashes(monkeypatch):
+    hashed = []
+    real_hash = engine.source_hash
+    monkeypatch.setattr(
+        engine, "source_hash",
+        lambda opts, csv_file: hashed.append(csv_file) or real_hash(opts, csv_file),
+    )
+    return hashed
+
+
+def test_unchanged_sources_are_not_rehashed(tmp_path, monkeypatch):
+    build_dataset(str(tmp_path), "ies2023")
+    hashed = _count_hashes(monkeypatch)
+    build_dataset(str(tmp_path), "ies2023")
+    assert hashed == []
+
+
+def test_changed_source_stat_falls_back_to_the_hash(tmp_path, monkeypatch):
+    opts = build_dataset(str(tmp_path), "ies2023")
+    conn = sqlite3.connect(opts.db_path)
+    conn.execute("UPDATE _build_meta SET source_stat = 'zip:0:0' WHERE name = 'persons'")
+    conn.commit()
+    conn.close()
+    hashed = _count_hashes(monkeypatch)
+    build_dataset(str(tmp_path), "ies2023")
+    # The bytes still match, so the table is recognised as up to date
+    assert hashed == ["Fact_IES2023_Persons.csv"]
@@ -0,0 +1,32 @@
+"""Column types are inferred from a full pass and cached with the database."""
+import json
+import os
+
+from conftest import build_dataset, make_ies2011_zip
+from ies_import import BuildOptions, IES2011
+from ies_import.engine import infer_column_types, resolve_column_types
+
+
+def test_infers_types_and_sentinels(tmp_path):
+    zip_path = tmp_path / "IES2011.zip"
+    make_ies2011_zip(zip_path)
+    opts = BuildOptions(db_path=str(tmp_path / "x.db"), zip_path=str(zip_path))
+    house = infer_column_types(opts, "IES2011HOUSE.csv")
+    assert house["income"]["type"] == "REAL"
+    assert house["hsize"]["type"] == "INTEGER"
+    # 10-digit ids with leading zeros are codes, not numbers
+    assert "uqno" not in house
+    total = infer_column_types(opts, "IES2011TOTAL.csv")
+    assert "coicop" not in total
+
+
+def test_inferred_schema_is_cached_and_reused(tmp_path, capsys):
+    opts = build_dataset(str(tmp_path), "ies2011", infer_schema=True)
+    assert os.path.exists(opts.schema_path)
+    cache = json.load(open(opts.schema_path))
+    assert cache["households"]["columns"]["income"]["type"] == "REAL"
+    capsys.readouterr()
+    types, entry = resolve_column_types(IES2011, opts, "IES2011HOUSE.csv", "households", cache)
+    assert "Using cached schema" in capsys.readouterr().out
+    assert types["income"] == ("REAL", ())
+    assert entry == cache["households"]
@@ -0,0 +1,95 @@
+"""Background jobs return query pages, can be cancelled and respect the cap."""
+import os
+import subprocess
+import time
+
+import pytest
+
+import jobs
+
+RUNAWAY = "SELECT COUNT(*) FROM total a, total b, total c"
+
+
+def _wait(client, job_id, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(f"/api/jobs/{job_id}").get_json()
+        if job["status"] not in jobs.ACTIVE:
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"job {job_id} still {job['status']}")
+
+
+def _dead_pid():
+    proc = subprocess.Popen(["true"])
+    proc.wait()
+    return proc.pid
+
+
+def test_job_returns_the_query_page(client):
+    body = {"sql": "SELECT uqno FROM households ORDER BY uqno", "limit": 50}
+    response = client.post("/api/jobs", json=body)
+    assert response.status_code == 202
+    assert response.headers["Location"] == f"/api/jobs/{response.get_json()['id']}"
+    job = _wait(client, response.get_json()["id"])
+    assert job["status"] == "done"
+    page = job["result"]
+    assert page == client.post("/api/query", json=body).get_json()
+    assert page["count"] == 50 and page["has_more"]
+
+
+def test_cancel_interrupts_a_running_job(client):
+    job_id = client.post("/api/jobs", json={"sql": RUNAWAY}).get_json()["id"]
+    assert client.delete(f"/api/jobs/{job_id}").status_code == 202
+    job = _wait(client, job_id)
+    assert job["status"] == "cancelled"
+    assert client.delete(f"/api/jobs/{job_id}").status_code == 409
+
+
+def test_unknown_job_and_no_event_stream(client):
+    assert client.get("/api/jobs/nope").status_code == 404
+    assert client.delete("/api/jobs/nope").status_code == 404
+    assert client.get("/api/jobs/nope/events").status_code == 404
+
+
+def test_max_active_returns_429(webapp, client, monkeypatch):
+    monkeypatch.setattr(webapp.JOBS, "max_active", 1)
+    first = client.post("/api/jobs", json={"sql": RUNAWAY}).get_json()["id"]
+    try:
+        assert client.post("/api/jobs", json={"sql": RUNAWAY}).status_code == 429
+    finally:
+        client.delete(f"/api/jobs/{first}")
+        _wait(client, first)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = jobs.JobStore(str(tmp_path / "jobs.db"), workers=1, max_active=1, ttl=60)
+    yield store
+    store.pool.shutdown()
+
+
+def test_jobs_of_dead_workers_free_their_slot(store):
+    with store._conn() as conn:
+        conn.execute(
+            "INSERT INTO jobs (id, dataset, sql, status, pid, created)"
+            " VALUES ('orphan', 'ies2023', 'SELECT 1', 'running', ?, ?)",
+            (_dead_pid(), time.time()),
+        )
+    job_id = store.submit("ies2023", "SELECT 1", lambda job: {"ok": True})
+    assert job_id is not None
+    orphan = store.get("orphan")
+    assert orphan["status"] == "error"
+    assert orphan["error"] == jobs.WORKER_EXITED
+    store.pool.shutdown()
+    assert store.get(job_id)["result"] == {"ok": True}
+
+
+def test_live_jobs_still_count(store):
+    with store._conn() as conn:
+        conn.execute(
+            "INSERT INTO jobs (id, dataset, sql, status, pid, created)"
+            " VALUES ('busy', 'ies2023', 'SELECT 1', 'running', ?, ?)",
+            (os.getpid(), time.time()),
+        )
+    assert store.submit("ies2023", "SELECT 1", lambda job: {}) is None
@@ -0,0 +1,57 @@
+"""Queries stop at the time budget, the row cap or a cancellation request."""
+import pytest
+from sqlalchemy import create_engine
+
+from limits import QueryBudget, QueryLimitError
+
+# Never finishes within any test timeout
+RUNAWAY = (
+    "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n)"
+    " SELECT COUNT(*) FROM n"
+)
+
+
+@pytest.fixture
+def conn():
+    engine = create_engine("sqlite://")
+    with engine.connect() as conn:
+        yield conn
+
+
+def test_timeout_cancels_the_statement(conn):
+    budget = QueryBudget(conn, timeout=0.05, max_rows=0)
+    with pytest.raises(QueryLimitError, match="QUERY_TIMEOUT_S"):
+        budget.execute(RUNAWAY).fetchmany(1)
+    budget.close()
+
+
+def test_row_cap(conn):
+    budget = QueryBudget(conn, timeout=0, max_rows=5)
+    budget.execute("WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1"
+                   " FROM n WHERE i < 10) SELECT i FROM n")
+    assert len(budget.fetchmany(5)) == 5
+    with pytest.raises(QueryLimitError, match="more than 5 rows"):
+        budget.fetchmany(5)
+
+
+def test_should_stop_cancels(conn):
+    budget = QueryBudget(conn, timeout=0, max_rows=0, should_stop=lambda: True)
+    with pytest.raises(QueryLimitError, match="on request"):
+        budget.execute(RUNAWAY).fetchmany(1)
+
+
+def test_limits_over_http(webapp, client, monkeypatch):
+    monkeypatch.setattr(webapp, "QUERY_TIMEOUT_S", 0.05)
+    response = client.post("/api/query", json={
+        "sql": "SELECT COUNT(*) FROM total a, total b, total c",
+    })
+    assert response.status_code == 400
+    assert "QUERY_TIMEOUT_S" in response.get_json()["error"]
+    monkeypatch.setattr(webapp, "QUERY_MAX_ROWS", 10)
+    response = client.post("/api/query", json={
+        "sql": "SELECT uqno, 'rows' AS cap FROM total", "limit": 5, "offset": 20,
+    })
+    assert response.status_code == 400
+    assert "QUERY_MAX_ROWS" in response.get_json()["error"]
+    # The connection is released with its progress handler removed
+    assert webapp.DATASETS["ies2023"]["engine"].pool.checkedout() == 0
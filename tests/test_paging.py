@@ -0,0 +1,68 @@
+"""/api/query pages its results and streams NDJSON on request."""
+import gzip
+import json
+
+SQL = "SELECT uqno, coicop FROM total ORDER BY rowid"
+
+
+def _post(client, **body):
+    return client.post("/api/query", json={"sql": SQL, **body})
+
+
+def test_pages_cover_the_result(webapp, client):
+    everything = _post(client, limit=webapp.QUERY_MAX_PAGE_SIZE).get_json()
+    assert everything["count"] == 2000 and not everything["has_more"]
+    rows, offset = [], 0
+    while True:
+        page = _post(client, offset=offset, limit=700).get_json()
+        rows += page["rows"]
+        offset += page["count"]
+        if not page["has_more"]:
+            break
+    assert rows == everything["rows"]
+    assert page["count"] == 600
+
+
+def test_page_size_is_capped(webapp, client):
+    page = _post(client, limit=10**9).get_json()
+    assert page["limit"] == webapp.QUERY_MAX_PAGE_SIZE
+    assert _post(client).get_json()["limit"] == webapp.QUERY_PAGE_SIZE
+    response = _post(client, limit="many")
+    assert response.status_code == 400
+    assert "integers" in response.get_json()["error"]
+
+
+def test_ndjson_stream(client):
+    response = client.post(
+        "/api/query", json={"sql": SQL, "offset": 10, "limit": 1500},
+        headers={"Accept": "application/x-ndjson"},
+    )
+    assert response.mimetype == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert lines[0] == {"columns": ["uqno", "coicop"]}
+    assert lines[-1] == {"count": 1500}
+    assert len(lines) == 1502
+    page = _post(client, offset=10, limit=3).get_json()
+    assert lines[1:4] == page["rows"]
+
+
+def test_stream_is_gzipped_on_the_fly(client):
+    response = client.post(
+        "/api/query", json={"sql": SQL, "stream": True, "format": "arrays"},
+        headers={"Accept-Encoding": "gzip"},
+    )
+    assert response.headers["Content-Encoding"] == "gzip"
+    lines = gzip.decompress(response.get_data()).decode().splitlines()
+    assert json.loads(lines[-1]) == {"count": 2000}
+    assert isinstance(json.loads(lines[1]), list)
+
+
+def test_stream_errors_before_the_first_row_are_400(client):
+    response = client.post("/api/query", json={
+        "sql": "SELECT nope FROM total", "stream": True,
+    })
+    assert response.status_code == 400
+    response = client.post("/api/query", json={
+        "sql": SQL, "stream": True, "format": "columns",
+    })
+    assert response.status_code == 400
@@ -0,0 +1,42 @@
+"""Example queries are answered from the precomputed sidecar."""
+import json
+import os
+
+import pytest
+
+from examples import EXAMPLES_BY_DATASET
+
+
+@pytest.fixture
+def sidecars(webapp, tmp_path, monkeypatch):
+    """Write the sidecars to tmp_path and start with none loaded."""
+    monkeypatch.setattr(webapp, "_examples_path", lambda db_path: str(
+        tmp_path / (os.path.splitext(os.path.basename(db_path))[0] + ".examples.json")
+    ))
+    monkeypatch.setattr(webapp, "PRECOMPUTED", {ds: {} for ds in webapp.DATASETS})
+    result = webapp.app.test_cli_runner().invoke(args=["precompute-examples"])
+    assert result.exit_code == 0, result.output
+    return tmp_path
+
+
+def test_examples_are_served_from_the_sidecar(webapp, client, sidecars):
+    example = next(
+        ex for ex in EXAMPLES_BY_DATASET["ies2023"]
+        if ex["id"] in webapp.PRECOMPUTED["ies2023"]["results"]
+    )
+    response = client.post("/api/query", json={"sql": example["sql"], "limit": 5})
+    assert response.headers["X-Cache"] == "PRECOMPUTED"
+    live = webapp._execute(webapp.DATASETS["ies2023"]["engine"], example["sql"], 0, 5)
+    assert response.get_json() == json.loads(json.dumps(webapp._page(live, 0, 5, "objects")))
+
+
+def test_stale_sidecar_is_ignored(webapp, sidecars):
+    path = webapp.DATASETS["ies2023"]["path"]
+    assert webapp._load_precomputed(path)
+    sidecar_path = webapp._examples_path(path)
+    with open(sidecar_path) as f:
+        sidecar = json.load(f)
+    sidecar["fingerprint"] = "0:0"
+    with open(sidecar_path, "w") as f:
+        json.dump(sidecar, f)
+    assert webapp._load_precomputed(path) == {}
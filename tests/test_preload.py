@@ -0,0 +1,75 @@
+"""Preloaded columns survive a fork with no pooled connection carried over."""
+import json
+import os
+import subprocess
+import sys
+import textwrap
+
+import numpy as np
+import pytest
+
+from column_store import ColumnStore
+from conftest import ROOT, build_dataset
+
+# Imports the app with preloading on, forks like gunicorn --preload, and
+# queries from the child
+FORK_AFTER_PRELOAD = textwrap.dedent("""
+    import json, os, sys
+    sys.path.insert(0, sys.argv[1])
+    import app
+
+    pooled = sum(e["engine"].pool.checkedin() for e in app.DATASETS.values())
+    preloaded = app.COLUMN_STORES["ies2023"].stats()["columns"]
+    read, write = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        client = app.app.test_client()
+        query = client.post("/api/query", json={
+            "sql": "SELECT COUNT(*) AS n FROM households",
+        }).get_json()
+        aggregate = client.post("/api/aggregate", json={"measure": "income"}).get_json()
+        os.write(write, json.dumps([query["rows"], aggregate["count"]]).encode())
+        os._exit(0)
+    os.close(write)
+    child = json.loads(os.read(read, 65536))
+    _, status = os.waitpid(pid, 0)
+    print(json.dumps({
+        "pooled": pooled, "preloaded": preloaded, "child": child, "status": status,
+    }))
+""")
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork")
+def test_child_queries_after_preload(db_dir, tmp_path):
+    env = {
+        **os.environ,
+        "IES_DB_DIR": db_dir,
+        "COLUMN_STORE_PRELOAD": "1",
+        "QUERY_CACHE_PATH": str(tmp_path / "query_cache.db"),
+        "JOB_STORE_PATH": str(tmp_path / "jobs.db"),
+    }
+    out = subprocess.run(
+        [sys.executable, "-c", FORK_AFTER_PRELOAD, os.path.join(ROOT, "webapp")],
+        env=env, capture_output=True, text=True, timeout=60,
+    )
+    assert out.returncode == 0, out.stderr
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+    # No pooled connection is inherited by the child
+    assert result["pooled"] == 0
+    assert "harmonised_households.income" in result["preloaded"]
+    assert result["status"] == 0
+    assert result["child"] == [[{"n": 200}], 1]
+
+
+def test_store_reads_the_same_from_sqlite_and_arrow(db_dir, tmp_path):
+    # Each column is loaded on its own, so rows must come back in table order
+    # even where SQLite could answer from a covering index
+    pytest.importorskip("pyarrow")
+    arrow = build_dataset(str(tmp_path), "ies2023", columnar=True)
+    sqlite_store = ColumnStore(os.path.join(db_dir, "ies2023.db"))
+    arrow_store = ColumnStore(arrow.db_path)
+    for name in ("income", "province", "expenditure_decile"):
+        a = sqlite_store.column("harmonised_households", name)
+        b = arrow_store.column("harmonised_households", name)
+        assert a.numeric == b.numeric
+        np.testing.assert_array_equal(a.decode(), b.decode())
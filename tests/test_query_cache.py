@@ -0,0 +1,68 @@
+"""/api/query results are cached on disk with LRU eviction."""
+import os
+import threading
+import uuid
+
+from query_cache import QueryCache, normalise_sql
+from shared_sqlite import LocalConnection
+
+
+def test_normalise_keeps_literals():
+    assert normalise_sql("SELECT  a\n FROM t WHERE b = 'x  y';") == (
+        "SELECT a FROM t WHERE b = 'x  y'"
+    )
+    assert QueryCache.key("d", "f", "SELECT 1") == QueryCache.key("d", "f", " SELECT\t1 ;")
+    assert QueryCache.key("d", "f", "SELECT 1") != QueryCache.key("d", "g", "SELECT 1")
+
+
+def test_lru_eviction(tmp_path):
+    cache = QueryCache(str(tmp_path / "cache.db"), max_bytes=25)
+    cache.put("a", "d", b"x" * 10)
+    cache.put("b", "d", b"x" * 10)
+    assert cache.get("a") is not None  # a is now the most recently used
+    cache.put("c", "d", b"x" * 10)
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    # Payloads larger than the whole budget are never stored
+    cache.put("big", "d", b"x" * 26)
+    assert cache.get("big") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (3, 2, 2)
+
+
+def test_unreadable_cache_is_a_miss(tmp_path):
+    cache = QueryCache(str(tmp_path / "cache.db"), max_bytes=100)
+    cache._conn().execute("DROP TABLE entries")
+    assert cache.get("a") is None
+    cache.put("a", "d", b"x")  # errors are swallowed
+
+
+def test_second_request_is_a_hit(client):
+    # A unique literal keeps the key clear of other tests' entries
+    sql = f"SELECT COUNT(*) AS n, '{uuid.uuid4()}' AS tag FROM total"
+    first = client.post("/api/query", json={"sql": sql})
+    second = client.post("/api/query", json={"sql": "  " + sql.replace(" FROM", "\nFROM")})
+    assert first.headers["X-Cache"] == "MISS"
+    assert second.headers["X-Cache"] == "HIT"
+    assert first.get_json() == second.get_json()
+    assert client.get("/api/cache").get_json()["hits"] >= 1
+
+
+def test_one_wal_connection_per_thread_and_process(tmp_path):
+    connect = LocalConnection(str(tmp_path / "shared.db"))
+    conn = connect()
+    assert connect() is conn
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    other = []
+    thread = threading.Thread(target=lambda: other.append(connect()))
+    thread.start()
+    thread.join()
+    assert other[0] is not conn
+    # A forked child opens its own connection rather than reusing the parent's
+    read, write = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.write(write, b"1" if connect() is not conn else b"0")
+        os._exit(0)
+    os.waitpid(pid, 0)
+    assert os.read(read, 1) == b"1"
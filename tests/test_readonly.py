@@ -0,0 +1,25 @@
+"""The webapp serves IES_DB_DIR databases over read-only mmap connections."""
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+
+def test_databases_found_in_ies_db_dir(webapp, db_dir):
+    assert set(webapp.DATASETS) == {"ies2023", "ies2011"}
+    assert webapp.DATASETS["ies2023"]["path"].startswith(db_dir)
+
+
+def test_connections_are_read_only_and_mapped(webapp):
+    with webapp.DATASETS["ies2023"]["engine"].connect() as conn:
+        assert conn.execute(text("PRAGMA query_only")).scalar() == 1
+        assert conn.execute(text("PRAGMA mmap_size")).scalar() > 0
+        with pytest.raises(OperationalError):
+            conn.execute(text("CREATE TABLE scratch (x)"))
+
+
+def test_query_runs_against_the_dataset(client):
+    response = client.post("/api/query", json={
+        "sql": "SELECT COUNT(*) AS n FROM households", "dataset": "ies2011",
+    })
+    assert response.status_code == 200
+    assert response.get_json()["rows"] == [{"n": 200}]
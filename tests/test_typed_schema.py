@@ -0,0 +1,40 @@
+"""Numeric columns are typed from the dataset schema; codes stay text."""
+import os
+import sqlite3
+
+from ies_import.engine import make_converter
+
+
+def _types(conn, table):
+    return {name: decl for _, name, decl, *_ in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def test_declared_types(db_dir):
+    conn = sqlite3.connect(os.path.join(db_dir, "ies2023.db"))
+    households = _types(conn, "households")
+    assert households["income"] == "REAL"
+    assert households["head_age"] == "INTEGER"
+    # Survey codes stay text
+    assert households["head_education"] == "TEXT"
+    assert _types(conn, "total")["valueannualized_adj"] == "REAL"
+
+
+def test_codes_keep_leading_zeros_and_sentinels_are_null(db_dir):
+    conn = sqlite3.connect(os.path.join(db_dir, "ies2023.db"))
+    codes = {c for (c,) in conn.execute("SELECT DISTINCT head_education FROM households")}
+    assert "01" in codes
+    # 888 is the missing-age code and blank income is missing
+    assert conn.execute("SELECT COUNT(*) FROM households WHERE head_age = 888").fetchone()[0] == 0
+    assert conn.execute("SELECT COUNT(*) FROM households WHERE head_age IS NULL").fetchone()[0] > 0
+    assert conn.execute("SELECT COUNT(*) FROM households WHERE income IS NULL").fetchone()[0] > 0
+    # Aggregates work without CAST
+    assert conn.execute("SELECT typeof(SUM(income)) FROM households").fetchone()[0] == "real"
+
+
+def test_converter():
+    age = make_converter("INTEGER", ("888", "8888"))
+    assert age(" 88 ") == 88
+    assert age("888") is None
+    assert age("") is None
+    # Unparseable values are kept rather than dropped
+    assert make_converter("REAL", ())("n/a") == "n/a"
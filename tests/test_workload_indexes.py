@@ -0,0 +1,47 @@
+"""Workload indexes get ANALYZE statistics and show up in the plan report."""
+import sqlite3
+
+from conftest import build_dataset
+from ies_import import IES2023, engine
+
+
+def _capture_report(monkeypatch):
+    report = {}
+    monkeypatch.setattr(
+        engine, "print_plan_report",
+        lambda examples, before, after: report.update(before=before, after=after),
+    )
+    return report
+
+
+def _stat_indexes(db_path):
+    conn = sqlite3.connect(db_path)
+    names = {idx for (idx,) in conn.execute("SELECT idx FROM sqlite_stat1")}
+    conn.close()
+    return names
+
+
+def test_plan_report_on_incremental_build(tmp_path, monkeypatch):
+    build_dataset(str(tmp_path), "ies2023")
+    report = _capture_report(monkeypatch)
+    opts = build_dataset(str(tmp_path), "ies2023", plan_report=True)
+    before = "\n".join(line for lines in report["before"].values() for line in lines)
+    after = "\n".join(line for lines in report["after"].values() for line in lines)
+    workload = {
+        ddl.split(" IF NOT EXISTS ")[1].split()[0] for ddl in IES2023.workload_indexes
+    }
+    # The workload indexes exist already, but are dropped for the "before" plans
+    assert not any(name in before for name in workload)
+    assert any(name in after for name in workload)
+    assert workload <= _stat_indexes(opts.db_path)
+
+
+def test_indexes_created_without_a_rebuild_are_analyzed(tmp_path):
+    opts = build_dataset(str(tmp_path), "ies2023")
+    conn = sqlite3.connect(opts.db_path)
+    conn.execute("DROP INDEX idx_households_decile_income")
+    conn.commit()
+    conn.close()
+    assert "idx_households_decile_income" not in _stat_indexes(opts.db_path)
+    build_dataset(str(tmp_path), "ies2023")
+    assert "idx_households_decile_income" in _stat_indexes(opts.db_path)
@@ -0,0 +1,149 @@
+"""Survey-weighted statistics for /api/aggregate.
+
+The measure, weight and grouping columns of harmonised_households come
+from the dataset's ColumnStore, so after the first request they are
+already in memory as NumPy arrays. Every statistic is then computed for
+all groups in one pass over the rows, sorted by group and then by value.
+The sort gives the weighted quantiles (one searchsorted on the running
+weight) and the Gini coefficient (from the running weighted sum). Because
+the table is the harmonised one, the same request works on every wave.
+
+Rows where the measure, the weight or a grouping column is NULL are left
+out.
+"""
+import numpy as np
+
+TABLE = "harmonised_households"
+MEASURES = ("income", "expenditure", "hsize")
+WEIGHTS = ("weight",)
+# Grouping dimension -> column, and the lookup that labels its codes
+DIMENSIONS = {
+    "province": ("province", "province_lookup"),
+    "settlement": ("settlement_type", "harmonised_settlement_lookup"),
+    "decile": ("expenditure_decile", None),
+    "population": ("head_population", None),
+}
+STATS = ("mean", "total", "median", "gini")
+# Every column a request can touch, e.g. for preloading
+COLUMNS = tuple(dict.fromkeys(
+    [*MEASURES, *WEIGHTS, *(column for column, _ in DIMENSIONS.values())]
+))
+
+
+def load(store) -> dict:
+    """Fetch the aggregatable columns and the dimension labels from store.
+
+    The labels map each code of a dimension that has a lookup table to its
+    name.
+    """
+    labels = {}
+    for name, (_, lookup) in DIMENSIONS.items():
+        if lookup:
+            table = store.columns(lookup, ["code", "name"])
+            labels[name] = dict(zip(table["code"].decode(), table["name"].decode()))
+    return {"columns": store.columns(TABLE, COLUMNS), "labels": labels}
+
+
+def _key(value):
+    # Decile codes are loaded as floats; report them as integers
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def aggregate(
+    data: dict,
+    measure: str,
+    by: list,
+    weight: str | None = "weight",
+    stats: tuple = STATS,
+    quantiles: tuple = (),
+) -> tuple[list, list]:
+    """Weighted statistics of measure for every combination of the by
+    dimensions; returns (column names, rows) sorted by group.
+
+    weight None gives every row a weight of 1. Quantiles are the smallest
+    value whose cumulative weight reaches q of the group's weight, so the
+    median is the weighted lower median.
+    """
+    table = data["columns"]
+    x = table[measure].values
+    w = table[weight].values if weight else np.ones_like(x)
+    keep = ~(np.isnan(x) | np.isnan(w))
+    for name in by:
+        keep &= ~table[DIMENSIONS[name][0]].missing()
+    x, w = x[keep], w[keep]
+    # Coded columns are grouped by their integer codes
+    dims = []
+    for name in by:
+        column = table[DIMENSIONS[name][0]]
+        dims.append(column.values[keep] if column.numeric else column.codes[keep])
+
+    # One integer code per group, in sorted key order
+    uniques, inverses = [], []
+    for values in dims:
+        unique, inverse = np.unique(values, return_inverse=True)
+        uniques.append(unique)
+        inverses.append(inverse)
+    if dims:
+        shape = [len(u) for u in uniques]
+        combined = np.ravel_multi_index(inverses, shape)
+        present, codes = np.unique(combined, return_inverse=True)
+        key_index = np.unravel_index(present, shape)
+        keys = list(zip(*(
+            u[i] if table[DIMENSIONS[name][0]].numeric
+            else table[DIMENSIONS[name][0]].categories[u[i]]
+            for name, u, i in zip(by, uniques, key_index)
+        )))
+    else:
+        codes = np.zeros(len(x), dtype=np.intp)
+        keys = [()] if len(x) else []
+    groups = len(keys)
+
+    order = np.lexsort((x, codes))
+    x, w, codes = x[order], w[order], codes[order]
+    wx = w * x
+    n = np.bincount(codes, minlength=groups)
+    weight_total = np.bincount(codes, weights=w, minlength=groups)
+    total = np.bincount(codes, weights=wx, minlength=groups)
+    start = np.searchsorted(codes, np.arange(groups))
+    end = start + n - 1
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = total / weight_total
+
+    results = {"n": n, "weight_total": weight_total}
+    if "mean" in stats:
+        results["mean"] = mean
+    if "total" in stats:
+        results["total"] = total
+
+    running_w = np.cumsum(w)
+    before_w = running_w[start] - w[start] if groups else running_w[:0]
+    levels = [("median", 0.5)] if "median" in stats else []
+    levels += [(f"p{q * 100:g}", q) for q in quantiles]
+    for name, q in levels:
+        index = np.searchsorted(running_w, before_w + q * weight_total, side="left")
+        results[name] = x[np.clip(index, start, end)]
+
+    if "gini" in stats:
+        # 1 - area under the Lorenz curve, summed trapezium by trapezium
+        running_wx = np.cumsum(wx)
+        before_wx = running_wx - wx - (running_wx[start] - wx[start])[codes]
+        area = np.bincount(codes, weights=w * (2 * before_wx + wx), minlength=groups)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            results["gini"] = 1 - area / (weight_total * total)
+
+    names = list(by)
+    labelled = [name for name in by if name in data["labels"]]
+    columns = [*names, *(f"{name}_name" for name in labelled), *results]
+    rows = []
+    for g, key in enumerate(keys):
+        key = [_key(v) for v in key]
+        labels = [data["labels"][name].get(key[by.index(name)]) for name in labelled]
+        values = [
+            None if np.isnan(v) else round(float(v), 6) if isinstance(v, np.floating)
+            else int(v)
+            for v in (results[c][g] for c in results)
+        ]
+        rows.append([*key, *labels, *values])
+    return columns, rows
@@ -5,62 +5,146 @@ and non-members using Mahalanobis distance nearest-neighbour matching.
 """
 import json
 import sqlite3
-import sys
 
 import numpy as np
 from scipy import stats
 from scipy.spatial import KDTree
 
+import columnar
+
 DB_PATH = "../ies2023.db"
 
 
-def load_data():
-    """Load and prepare household-level data for matching."""
+COLUMNS = [
+    "uqno", "eoh_meds", "expenditure", "income", "hsize",
+    "head_age", "head_sex", "head_population", "head_education",
+    "province", "settlement_type", "health_exp", "hhold_wgt",
+]
+
+# Columns every source reads, per table; select_sample filters and joins them
+TABLES = {
+    "households": [
+        "uqno", "eoh_meds", "expenditure", "income", "hsize", "head_age",
+        "head_sex", "head_population", "head_education", "hhold_wgt",
+    ],
+    "geography": ["uqno", "province", "settlement_type"],
+    "household_division_totals": ["uqno", "level", "code", "value_annualized"],
+}
+
+
+def read_sqlite():
+    """Return {table: {column: list}} for TABLES via SQLite."""
     conn = sqlite3.connect(DB_PATH)
+    tables = {}
+    for table, names in TABLES.items():
+        rows = conn.execute(f"SELECT {', '.join(names)} FROM {table}").fetchall()
+        tables[table] = {name: [row[i] for row in rows] for i, name in enumerate(names)}
+    conn.close()
+    return tables
+
+
+def read_columnar():
+    """Return the same columns as read_sqlite from the Arrow copies.
 
-    # Get household data with covariates and health expenditure
-    query = """
-    SELECT
-        h.uqno,
-        h.eoh_meds,
-        CAST(h.expenditure AS REAL) AS expenditure,
-        CAST(h.income AS REAL) AS income,
-        CAST(h.hsize AS INTEGER) AS hsize,
-        CAST(h.head_age AS INTEGER) AS head_age,
-        h.head_sex,
-        h.head_population,
-        h.head_education,
-        g.province,
-        g.settlement_type,
-        COALESCE(th.health_exp, 0) AS health_exp,
-        CAST(h.hhold_wgt AS REAL) AS hhold_wgt
-    FROM households h
-    JOIN geography g ON h.uqno = g.uqno
-    LEFT JOIN (
-        SELECT uqno, SUM(valueannualized_adj) AS health_exp
-        FROM total
-        WHERE division = '06'
-        GROUP BY uqno
-    ) th ON h.uqno = th.uqno
-    WHERE h.eoh_meds IN ('1', '2')
-      AND CAST(h.expenditure AS REAL) > 0
-      AND CAST(h.head_age AS INTEGER) > 0
-      AND h.head_population IN ('1','2','3','4')
-      AND h.head_education != '98'
+    Only the columns used here are paged in from the memory-mapped files,
+    instead of every column of every households row.
     """
+    tables = {}
+    for table, names in TABLES.items():
+        data = columnar.read_table(DB_PATH, table, names)
+        tables[table] = {name: data[name].to_pylist() for name in names}
+    return tables
+
+
+def read_store(store):
+    """Return the same columns as read_sqlite from a ColumnStore, so the
+    webapp can rerun the analysis without touching SQLite."""
+    return {
+        table: {name: column.decode() for name, column in store.columns(table, names).items()}
+        for table, names in TABLES.items()
+    }
 
-    rows = conn.execute(query).fetchall()
-    cols = [
-        "uqno", "eoh_meds", "expenditure", "income", "hsize",
-        "head_age", "head_sex", "head_population", "head_education",
-        "province", "settlement_type", "health_exp", "hhold_wgt",
-    ]
-    conn.close()
 
-    data = {c: [] for c in cols}
-    for row in rows:
-        for c, v in zip(cols, row):
-            data[c].append(v)
+def _text(values):
+    # Codes compare as text whichever type the source kept them as
+    return np.array([None if v is None else str(v) for v in values], dtype=object)
+
+
+def _number(values):
+    return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+
+
+def _isin(values, wanted):
+    return np.array([v in wanted for v in values], dtype=bool)
+
+
+def select_sample(tables):
+    """Return the matching sample as {column: list} from any source's tables.
+
+    Keeps households with a medical scheme answer, positive expenditure and
+    head age, a known population group and education, joined to their
+    geography and their division 06 (health) spend.
+    """
+    h, g, th = (tables[name] for name in TABLES)
+    eoh_meds = _text(h["eoh_meds"])
+    head_population = _text(h["head_population"])
+    head_education = _text(h["head_education"])
+    mask = (
+        _isin(eoh_meds, ("1", "2"))
+        & (_number(h["expenditure"]) > 0)
+        & (_number(h["head_age"]) > 0)
+        & _isin(head_population, ("1", "2", "3", "4"))
+        & ~_isin(head_education, (None, "98"))
+    )
+    health_rows = (_text(th["level"]) == "division") & (_text(th["code"]) == "06")
+    health = dict(zip(
+        _text(th["uqno"])[health_rows], _number(th["value_annualized"])[health_rows]
+    ))
+    geo = dict(zip(
+        _text(g["uqno"]), zip(_text(g["province"]), _text(g["settlement_type"]))
+    ))
+
+    uqno = _text(h["uqno"])
+    income = np.nan_to_num(_number(h["income"]))
+    hsize = np.nan_to_num(_number(h["hsize"]))
+    columns = {
+        "uqno": uqno,
+        "eoh_meds": eoh_meds,
+        "expenditure": _number(h["expenditure"]),
+        "income": income,
+        "hsize": hsize,
+        "head_age": _number(h["head_age"]),
+        "head_sex": _text(h["head_sex"]),
+        "head_population": head_population,
+        "head_education": head_education,
+        "hhold_wgt": _number(h["hhold_wgt"]),
+    }
+    data = {c: [] for c in COLUMNS}
+    for i in np.flatnonzero(mask):
+        if uqno[i] not in geo:
+            continue
+        for name, values in columns.items():
+            data[name].append(values[i])
+        data["province"].append(geo[uqno[i]][0])
+        data["settlement_type"].append(geo[uqno[i]][1])
+        data["health_exp"].append(np.nan_to_num(health.get(uqno[i], 0)))
+    return data
+
+
+def load_data(store=None):
+    """Load and prepare household-level data for matching.
+
+    With a ColumnStore (as the webapp keeps per dataset) the rows come from
+    its cached columns; otherwise from the Arrow copies or SQLite.
+    """
+    if store is not None:
+        tables = read_store(store)
+    elif columnar.available(DB_PATH, *TABLES):
+        print("Reading columnar copies of the tables")
+        tables = read_columnar()
+    else:
+        tables = read_sqlite()
+    data = select_sample(tables)
 
     # Convert to numpy arrays
     n = len(data["uqno"])
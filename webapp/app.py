@@ -3,11 +3,32 @@
 Supports multiple survey datasets (IES 2022/23, IES 2010/11) with
 a toggle to switch between them.
 """
+import gzip
+import hashlib
+import json
 import os
 import re
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
 
+import click
 from flask import Flask, jsonify, render_template, request
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, event, text
+
+import aggregate
+import column_store
+import explain
+import export
+import jobs
+import query_cache
+from examples import EXAMPLES_BY_DATASET
+from limits import QueryBudget
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
 
 app = Flask(__name__)
 
@@ -16,33 +37,84 @@ _app_dir = os.path.dirname(os.path.abspath(__file__))
 
 
 def _find_db(name: str) -> str | None:
-    """Locate a database file, checking the webapp dir first, then parent."""
-    for d in (_app_dir, os.path.join(_app_dir, "..")):
+    """Locate a database file, checking IES_DB_DIR (when set), then the
+    webapp dir, then its parent."""
+    dirs = [_app_dir, os.path.join(_app_dir, "..")]
+    if os.environ.get("IES_DB_DIR"):
+        dirs.insert(0, os.environ["IES_DB_DIR"])
+    for d in dirs:
         p = os.path.join(d, name)
         if os.path.exists(p):
             return p
     return None
 
 
+# --- Read-only serving ---
+# The databases are built once and never written at runtime, so they are
+# opened read-only. immutable=1 additionally tells SQLite the file cannot
+# change, which skips file locking and change detection; set
+# SQLITE_IMMUTABLE=0 when rebuilding a database under a running dev server.
+SQLITE_IMMUTABLE = os.environ.get("SQLITE_IMMUTABLE", "1") == "1"
+# Each database is memory-mapped up to this size, so gunicorn workers share
+# the OS page cache instead of copying pages into per-connection caches.
+SQLITE_MMAP_MAX = int(os.environ.get("SQLITE_MMAP_MAX", 2 * 1024**3))
+SQLITE_CACHE_SIZE_KIB = int(os.environ.get("SQLITE_CACHE_SIZE_KIB", 64 * 1024))
+
+
+def _make_engine(path: str):
+    """Create a read-only engine tuned for serving an immutable database."""
+    params = "mode=ro&immutable=1" if SQLITE_IMMUTABLE else "mode=ro"
+    engine = create_engine(
+        f"sqlite:///file:{quote(os.path.abspath(path))}?{params}&uri=true",
+        echo=False,
+    )
+    mmap_size = min(os.path.getsize(path), SQLITE_MMAP_MAX)
+
+    @event.listens_for(engine, "connect")
+    def _configure(dbapi_conn, _record):
+        cur = dbapi_conn.cursor()
+        cur.execute(f"PRAGMA mmap_size={mmap_size}")
+        cur.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KIB}")
+        cur.execute("PRAGMA query_only=1")
+        cur.close()
+
+    return engine
+
+
 DATASETS: dict[str, dict] = {}
 
 _db2023 = _find_db("ies2023.db")
 if _db2023:
     DATASETS["ies2023"] = {
         "label": "IES 2022/23",
-        "engine": create_engine(f"sqlite:///{_db2023}", echo=False),
+        "path": _db2023,
+        "engine": _make_engine(_db2023),
     }
 
 _db2011 = _find_db("ies2011.db")
 if _db2011:
     DATASETS["ies2011"] = {
         "label": "IES 2010/11",
-        "engine": create_engine(f"sqlite:///{_db2011}", echo=False),
+        "path": _db2011,
+        "engine": _make_engine(_db2011),
     }
 
 DEFAULT_DATASET = "ies2023" if "ies2023" in DATASETS else next(iter(DATASETS), None)
 
 
+def _reset_after_fork():
+    # gunicorn --preload imports the app in the master and then forks the
+    # workers; a pooled SQLite connection must never be shared between them
+    for entry in DATASETS.values():
+        entry["engine"].dispose(close=False)
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+# Shared across gunicorn workers; None when QUERY_CACHE=0
+QUERY_CACHE = query_cache.from_env()
+
+
 def _get_engine(dataset: str | None = None):
     ds = dataset or DEFAULT_DATASET
     entry = DATASETS.get(ds)
@@ -51,424 +123,210 @@ def _get_engine(dataset: str | None = None):
     return entry["engine"], ds
 
 
-# --- Example queries per dataset ---
-EXAMPLE_QUERIES_2023 = [
-    {
-        "id": "income_by_province",
-        "title": "Average Income & Expenditure by Province",
-        "description": "Compare average household income and expenditure across South Africa's 9 provinces.",
-        "sql": """SELECT p.name AS province,
-       ROUND(AVG(CAST(h.income AS REAL)), 0) AS avg_income,
-       ROUND(AVG(CAST(h.expenditure AS REAL)), 0) AS avg_expenditure
-FROM households h
-JOIN geography g ON h.uqno = g.uqno
-JOIN province_lookup p ON g.province = p.code
-GROUP BY g.province
-ORDER BY avg_income DESC""",
-        "chart": {
-            "mark": "bar",
-            "encoding": {
-                "y": {"field": "province", "type": "nominal", "sort": "-x", "title": "Province"},
-                "x": {"field": "avg_income", "type": "quantitative", "title": "Average Annual Income (R)"},
-                "color": {"value": "#4e79a7"},
-                "tooltip": [
-                    {"field": "province", "type": "nominal"},
-                    {"field": "avg_income", "type": "quantitative", "title": "Avg Income", "format": ",.0f"},
-                    {"field": "avg_expenditure", "type": "quantitative", "title": "Avg Expenditure", "format": ",.0f"},
-                ],
-            },
-        },
-    },
-    {
-        "id": "spending_categories",
-        "title": "What Households Spend On (COICOP Divisions)",
-        "description": "Total household expenditure broken down by major spending category.",
-        "sql": """SELECT cd.label AS category,
-       ROUND(SUM(t.valueannualized_adj), 0) AS total_spend,
-       COUNT(*) AS items
-FROM total t
-JOIN coicop_lookup cd ON t.division = cd.code AND cd.level = 'division'
-WHERE CAST(t.division AS INTEGER) <= 13
-GROUP BY t.division
-ORDER BY total_spend DESC""",
-        "chart": {
-            "mark": "bar",
-            "encoding": {
-                "y": {"field": "category", "type": "nominal", "sort": "-x", "title": "Category"},
-                "x": {"field": "total_spend", "type": "quantitative", "title": "Total Spend (R)"},
-                "color": {"value": "#e15759"},
-                "tooltip": [
-                    {"field": "category", "type": "nominal"},
-                    {"field": "total_spend", "type": "quantitative", "title": "Total Spend", "format": ",.0f"},
-                    {"field": "items", "type": "quantitative", "title": "# Items"},
-                ],
-            },
-        },
-    },
-    {
-        "id": "income_by_population",
-        "title": "Income by Population Group",
-        "description": "Average household income by population group of the head of household.",
-        "sql": """SELECT
-  CASE head_population
-    WHEN '1' THEN 'Black African'
-    WHEN '2' THEN 'Coloured'
-    WHEN '3' THEN 'Indian/Asian'
-    WHEN '4' THEN 'White'
-  END AS population_group,
-  COUNT(*) AS households,
-  ROUND(AVG(CAST(income AS REAL)), 0) AS avg_income,
-  ROUND(AVG(CAST(expenditure AS REAL)), 0) AS avg_expenditure
-FROM households
-WHERE head_population IN ('1','2','3','4')
-GROUP BY head_population
-ORDER BY avg_income DESC""",
-        "chart": {
-            "mark": "bar",
-            "encoding": {
-                "y": {
-                    "field": "population_group",
-                    "type": "nominal",
-                    "sort": "-x",
-                    "title": "Population Group",
-                },
-                "x": {"field": "avg_income", "type": "quantitative", "title": "Average Income (R)"},
-                "color": {"field": "population_group", "type": "nominal", "legend": None},
-                "tooltip": [
-                    {"field": "population_group", "type": "nominal"},
-                    {"field": "avg_income", "type": "quantitative", "title": "Avg Income", "format": ",.0f"},
-                    {"field": "avg_expenditure", "type": "quantitative", "title": "Avg Expenditure", "format": ",.0f"},
-                    {"field": "households", "type": "quantitative", "title": "Households"},
-                ],
-            },
-        },
-    },
-    {
-        "id": "expenditure_deciles",
-        "title": "Expenditure by Decile (Inequality)",
-        "description": "Average household expenditure across 10 income groups — decile 1 is the poorest 10%, decile 10 is the wealthiest 10%.",
-        "sql": """SELECT
-  CAST(expenditure_decile AS INTEGER) AS decile,
-  COUNT(*) AS households,
-  ROUND(AVG(CAST(expenditure AS REAL)), 0) AS avg_expenditure,
-  ROUND(AVG(CAST(income AS REAL)), 0) AS avg_income
-FROM households
-GROUP BY expenditure_decile
-ORDER BY CAST(expenditure_decile AS INTEGER)""",
-        "chart": {
-            "mark": "bar",
-            "encoding": {
-                "x": {"field": "decile", "type": "ordinal", "title": "Expenditure Decile (1=Poorest, 10=Wealthiest)"},
-                "y": {"field": "avg_expenditure", "type": "quantitative", "title": "Average Expenditure (R)"},
-                "color": {
-                    "field": "decile",
-                    "type": "ordinal",
-                    "scale": {"scheme": "redyellowgreen"},
-                    "legend": None,
-                },
-                "tooltip": [
-                    {"field": "decile", "type": "ordinal", "title": "Decile"},
-                    {"field": "avg_expenditure", "type": "quantitative", "title": "Avg Expenditure", "format": ",.0f"},
-                    {"field": "avg_income", "type": "quantitative", "title": "Avg Income", "format": ",.0f"},
-                    {"field": "households", "type": "quantitative", "title": "Households"},
-                ],
-            },
-        },
-    },
-    {
-        "id": "medical_aid_health",
-        "title": "Health Spending: Medical Aid vs Uninsured",
-        "description": "Average out-of-pocket health expenditure per household, comparing those with and without medical aid.",
-        "sql": """SELECT
-  CASE h.eoh_meds WHEN '1' THEN 'On Medical Aid' WHEN '2' THEN 'Not on Medical Aid' END AS status,
-  COUNT(DISTINCT h.uqno) AS households,
-  ROUND(SUM(t.valueannualized_adj) / COUNT(DISTINCT h.uqno), 0) AS avg_health_per_hh,
-  ROUND(SUM(t.valueannualized_adj), 0) AS total_health_spend
-FROM total t
-JOIN households h ON t.uqno = h.uqno
-WHERE t.division = '06' AND h.eoh_meds IN ('1', '2')
-GROUP BY h.eoh_meds""",
-        "chart": {
-            "mark": "bar",
-            "encoding": {
-                "x": {"field": "status", "type": "nominal", "title": "Medical Aid Status"},
-                "y": {"field": "avg_health_per_hh", "type": "quantitative", "title": "Avg Health Spend per HH (R)"},
-                "color": {"field": "status", "type": "nominal", "legend": None},
-                "tooltip": [
-                    {"field": "status", "type": "nominal"},
-                    {"field": "avg_health_per_hh", "type": "quantitative", "title": "Avg Health/HH", "format": ",.0f"},
-                    {"field": "households", "type": "quantitative", "title": "Households"},
-                    {"field": "total_health_spend", "type": "quantitative", "title": "Total Health Spend", "format": ",.0f"},
-                ],
-            },
-        },
-    },
-    {
-        "id": "health_by_decile",
-        "title": "Health Spending by Income Level & Medical Aid Status",
-        "description": "How out-of-pocket health spending changes across income deciles for medical aid vs uninsured households.",
-        "sql": """SELECT
-  CAST(h.expenditure_decile AS INTEGER) AS decile,
-  CASE h.eoh_meds WHEN '1' THEN 'Medical Aid' WHEN '2' THEN 'No Medical Aid' END AS status,
-  COUNT(DISTINCT h.uqno) AS households,
-  ROUND(SUM(t.valueannualized_adj) / COUNT(DISTINCT h.uqno), 0) AS avg_health_per_hh
-FROM total t
-JOIN households h ON t.uqno = h.uqno
-WHERE t.division = '06' AND h.eoh_meds IN ('1', '2')
-GROUP BY h.expenditure_decile, h.eoh_meds
-ORDER BY CAST(h.expenditure_decile AS INTEGER), status""",
-        "chart": {
-            "mark": {"type": "line", "point": True},
-            "encoding": {
-                "x": {"field": "decile", "type": "ordinal", "title": "Expenditure Decile"},
-                "y": {"field": "avg_health_per_hh", "type": "quantitative", "title": "Avg Health Spend per HH (R)"},
-                "color": {"field": "status", "type": "nominal", "title": "Status"},
-                "tooltip": [
-                    {"field": "decile", "type": "ordinal"},
-                    {"field": "status", "type": "nominal"},
-                    {"field": "avg_health_per_hh", "type": "quantitative", "title": "Avg Health/HH", "format": ",.0f"},
-                    {"field": "households", "type": "quantitative"},
-                ],
-            },
-        },
-    },
-    {
-        "id": "asset_ownership",
-        "title": "Household Asset Ownership",
-        "description": "Percentage of households that own various assets.",
-        "sql": """SELECT
-  'Cell phone' AS asset, ROUND(SUM(CASE WHEN has_cell='1' THEN 1 ELSE 0 END)*100.0/COUNT(*), 1) AS ownership_pct FROM households
-UNION ALL SELECT 'Electric stove', ROUND(SUM(CASE WHEN has_stove='1' THEN 1 ELSE 0 END)*100.0/COUNT(*), 1) FROM households
-UNION ALL SELECT 'Fridge', ROUND(SUM(CASE WHEN has_fridge='1' THEN 1 ELSE 0 END)*100.0/COUNT(*), 1) FROM households
-UNION ALL SELECT 'TV', ROUND(SUM(CASE WHEN has_tv='1' THEN 1 ELSE 0 END)*100.0/COUNT(*), 1) FROM households
-UNION ALL SELECT 'Satellite TV', ROUND(SUM(CASE WHEN has_satellite='1' THEN 1 ELSE 0 END)*100.0/COUNT(*), 1) FROM households
-UNION ALL SELECT 'Washing machine', ROUND(SUM(CASE WHEN has_washin='1' THEN 1 ELSE 0 END)*100.0/COUNT(*), 1) FROM households
-UNION ALL SELECT 'Motor vehicle', ROUND(SUM(CASE WHEN has_vehicle='1' THEN 1 ELSE 0 END)*100.0/COUNT(*), 1) FROM households
-UNION ALL SELECT 'Computer', ROUND(SUM(CASE WHEN has_desktop='1' THEN 1 ELSE 0 END)*100.0/COUNT(*), 1) FROM households""",
-        "chart": {
-            "mark": "bar",
-            "encoding": {
-                "y": {"field": "asset", "type": "nominal", "sort": "-x", "title": "Asset"},
-                "x": {"field": "ownership_pct", "type": "quantitative", "title": "% of Households"},
-                "color": {"value": "#59a14f"},
-                "tooltip": [
-                    {"field": "asset", "type": "nominal"},
-                    {"field": "ownership_pct", "type": "quantitative", "title": "Ownership %", "format": ".1f"},
-                ],
-            },
-        },
-    },
-    {
-        "id": "food_security",
-        "title": "Food Security by Province",
-        "description": "Percentage of households that report running out of money for food, by province.",
-        "sql": """SELECT p.name AS province,
-  ROUND(SUM(CASE WHEN h.lcf_anomoney = '1' THEN 1 ELSE 0 END)*100.0/COUNT(*), 1) AS ran_out_of_money_pct,
-  ROUND(SUM(CASE WHEN h.lcf_askip = '1' THEN 1 ELSE 0 END)*100.0/COUNT(*), 1) AS skipped_meals_pct,
-  ROUND(SUM(CASE WHEN h.lcf_alack = '1' THEN 1 ELSE 0 END)*100.0/COUNT(*), 1) AS went_hungry_pct
-FROM households h
-JOIN geography g ON h.uqno = g.uqno
-JOIN province_lookup p ON g.province = p.code
-GROUP BY g.province
-ORDER BY ran_out_of_money_pct DESC""",
-        "chart": {
-            "mark": "bar",
-            "encoding": {
-                "y": {"field": "province", "type": "nominal", "sort": "-x", "title": "Province"},
-                "x": {"field": "ran_out_of_money_pct", "type": "quantitative", "title": "% Ran Out of Money for Food"},
-                "color": {"value": "#e15759"},
-                "tooltip": [
-                    {"field": "province", "type": "nominal"},
-                    {"field": "ran_out_of_money_pct", "type": "quantitative", "title": "Ran out of money %"},
-                    {"field": "skipped_meals_pct", "type": "quantitative", "title": "Skipped meals %"},
-                    {"field": "went_hungry_pct", "type": "quantitative", "title": "Went hungry %"},
-                ],
-            },
-        },
-    },
-]
-
-EXAMPLE_QUERIES_2011 = [
-    {
-        "id": "income_by_province",
-        "title": "Average Income & Consumption by Province",
-        "description": "Compare average household income and consumption expenditure across South Africa's 9 provinces.",
-        "sql": """SELECT p.name AS province,
-       ROUND(AVG(CAST(h.income AS REAL)), 0) AS avg_income,
-       ROUND(AVG(CAST(h.consumptions AS REAL)), 0) AS avg_consumption
-FROM households h
-JOIN province_lookup p ON h.province = p.code
-GROUP BY h.province
-ORDER BY avg_income DESC""",
-        "chart": {
-            "mark": "bar",
-            "encoding": {
-                "y": {"field": "province", "type": "nominal", "sort": "-x", "title": "Province"},
-                "x": {"field": "avg_income", "type": "quantitative", "title": "Average Annual Income (R)"},
-                "color": {"value": "#4e79a7"},
-                "tooltip": [
-                    {"field": "province", "type": "nominal"},
-                    {"field": "avg_income", "type": "quantitative", "title": "Avg Income", "format": ",.0f"},
-                    {"field": "avg_consumption", "type": "quantitative", "title": "Avg Consumption", "format": ",.0f"},
-                ],
-            },
-        },
-    },
-    {
-        "id": "spending_categories",
-        "title": "What Households Spend On (COICOP Divisions)",
-        "description": "Total household expenditure broken down by major spending category.",
-        "sql": """SELECT cd.label AS category,
-       ROUND(SUM(t.valueannualized), 0) AS total_spend,
-       COUNT(*) AS items
-FROM total t
-JOIN coicop_lookup cd ON t.division = cd.code AND cd.level = 'division'
-WHERE CAST(t.division AS INTEGER) <= 13
-GROUP BY t.division
-ORDER BY total_spend DESC""",
-        "chart": {
-            "mark": "bar",
-            "encoding": {
-                "y": {"field": "category", "type": "nominal", "sort": "-x", "title": "Category"},
-                "x": {"field": "total_spend", "type": "quantitative", "title": "Total Spend (R)"},
-                "color": {"value": "#e15759"},
-                "tooltip": [
-                    {"field": "category", "type": "nominal"},
-                    {"field": "total_spend", "type": "quantitative", "title": "Total Spend", "format": ",.0f"},
-                    {"field": "items", "type": "quantitative", "title": "# Items"},
-                ],
-            },
-        },
-    },
-    {
-        "id": "income_by_population",
-        "title": "Income by Population Group",
-        "description": "Average household income by population group of the head of household.",
-        "sql": """SELECT
-  CASE popgrpofhead
-    WHEN '1' THEN 'Black African'
-    WHEN '2' THEN 'Coloured'
-    WHEN '3' THEN 'Indian/Asian'
-    WHEN '4' THEN 'White'
-  END AS population_group,
-  COUNT(*) AS households,
-  ROUND(AVG(CAST(income AS REAL)), 0) AS avg_income,
-  ROUND(AVG(CAST(consumptions AS REAL)), 0) AS avg_consumption
-FROM households
-WHERE popgrpofhead IN ('1','2','3','4')
-GROUP BY popgrpofhead
-ORDER BY avg_income DESC""",
-        "chart": {
-            "mark": "bar",
-            "encoding": {
-                "y": {
-                    "field": "population_group",
-                    "type": "nominal",
-                    "sort": "-x",
-                    "title": "Population Group",
-                },
-                "x": {"field": "avg_income", "type": "quantitative", "title": "Average Income (R)"},
-                "color": {"field": "population_group", "type": "nominal", "legend": None},
-                "tooltip": [
-                    {"field": "population_group", "type": "nominal"},
-                    {"field": "avg_income", "type": "quantitative", "title": "Avg Income", "format": ",.0f"},
-                    {"field": "avg_consumption", "type": "quantitative", "title": "Avg Consumption", "format": ",.0f"},
-                    {"field": "households", "type": "quantitative", "title": "Households"},
-                ],
-            },
-        },
-    },
-    {
-        "id": "expenditure_deciles",
-        "title": "Consumption by Decile (Inequality)",
-        "description": "Average household consumption across 10 income groups — decile 1 is the poorest 10%, decile 10 is the wealthiest 10%.",
-        "sql": """SELECT
-  CAST(consumptiondecile AS INTEGER) AS decile,
-  COUNT(*) AS households,
-  ROUND(AVG(CAST(consumptions AS REAL)), 0) AS avg_consumption,
-  ROUND(AVG(CAST(income AS REAL)), 0) AS avg_income
-FROM households
-GROUP BY consumptiondecile
-ORDER BY CAST(consumptiondecile AS INTEGER)""",
-        "chart": {
-            "mark": "bar",
-            "encoding": {
-                "x": {"field": "decile", "type": "ordinal", "title": "Consumption Decile (1=Poorest, 10=Wealthiest)"},
-                "y": {"field": "avg_consumption", "type": "quantitative", "title": "Average Consumption (R)"},
-                "color": {
-                    "field": "decile",
-                    "type": "ordinal",
-                    "scale": {"scheme": "redyellowgreen"},
-                    "legend": None,
-                },
-                "tooltip": [
-                    {"field": "decile", "type": "ordinal", "title": "Decile"},
-                    {"field": "avg_consumption", "type": "quantitative", "title": "Avg Consumption", "format": ",.0f"},
-                    {"field": "avg_income", "type": "quantitative", "title": "Avg Income", "format": ",.0f"},
-                    {"field": "households", "type": "quantitative", "title": "Households"},
-                ],
-            },
-        },
-    },
-    {
-        "id": "health_spending",
-        "title": "Health Spending (COICOP Division 06)",
-        "description": "Average out-of-pocket health expenditure per household, by province.",
-        "sql": """SELECT p.name AS province,
-  COUNT(DISTINCT t.uqno) AS households,
-  ROUND(SUM(t.valueannualized) / COUNT(DISTINCT t.uqno), 0) AS avg_health_per_hh
-FROM total t
-JOIN geography g ON t.uqno = g.uqno
-JOIN province_lookup p ON g.province = p.code
-WHERE t.division = '06'
-GROUP BY g.province
-ORDER BY avg_health_per_hh DESC""",
-        "chart": {
-            "mark": "bar",
-            "encoding": {
-                "y": {"field": "province", "type": "nominal", "sort": "-x", "title": "Province"},
-                "x": {"field": "avg_health_per_hh", "type": "quantitative", "title": "Avg Health Spend per HH (R)"},
-                "color": {"value": "#76b7b2"},
-                "tooltip": [
-                    {"field": "province", "type": "nominal"},
-                    {"field": "avg_health_per_hh", "type": "quantitative", "title": "Avg Health/HH", "format": ",.0f"},
-                    {"field": "households", "type": "quantitative", "title": "Households"},
-                ],
-            },
-        },
-    },
-    {
-        "id": "asset_ownership",
-        "title": "Household Asset Ownership",
-        "description": "Percentage of households that own various assets (Q5.10.1 items, code 1=Yes).",
-        "sql": """SELECT
-  'Cell phone' AS asset, ROUND(SUM(CASE WHEN q5101a14cellularphone='1' THEN 1 ELSE 0 END)*100.0/COUNT(*), 1) AS ownership_pct FROM households
-UNION ALL SELECT 'Electric stove', ROUND(SUM(CASE WHEN q5101a06stove='1' THEN 1 ELSE 0 END)*100.0/COUNT(*), 1) FROM households
-UNION ALL SELECT 'Fridge', ROUND(SUM(CASE WHEN q5101a05refrigerator='1' THEN 1 ELSE 0 END)*100.0/COUNT(*), 1) FROM households
-UNION ALL SELECT 'TV', ROUND(SUM(CASE WHEN q5101a03television='1' THEN 1 ELSE 0 END)*100.0/COUNT(*), 1) FROM households
-UNION ALL SELECT 'Satellite TV (DSTV)', ROUND(SUM(CASE WHEN q5101a16dstv='1' THEN 1 ELSE 0 END)*100.0/COUNT(*), 1) FROM households
-UNION ALL SELECT 'Washing machine', ROUND(SUM(CASE WHEN q5101a08washingmachine='1' THEN 1 ELSE 0 END)*100.0/COUNT(*), 1) FROM households
-UNION ALL SELECT 'Motor vehicle', ROUND(SUM(CASE WHEN q5101a09motorvehicle='1' THEN 1 ELSE 0 END)*100.0/COUNT(*), 1) FROM households
-UNION ALL SELECT 'Computer', ROUND(SUM(CASE WHEN q5101a11computer='1' THEN 1 ELSE 0 END)*100.0/COUNT(*), 1) FROM households""",
-        "chart": {
-            "mark": "bar",
-            "encoding": {
-                "y": {"field": "asset", "type": "nominal", "sort": "-x", "title": "Asset"},
-                "x": {"field": "ownership_pct", "type": "quantitative", "title": "% of Households"},
-                "color": {"value": "#59a14f"},
-                "tooltip": [
-                    {"field": "asset", "type": "nominal"},
-                    {"field": "ownership_pct", "type": "quantitative", "title": "Ownership %", "format": ".1f"},
-                ],
-            },
-        },
-    },
-]
-
-EXAMPLES_BY_DATASET = {
-    "ies2023": EXAMPLE_QUERIES_2023,
-    "ies2011": EXAMPLE_QUERIES_2011,
-}
+# --- Result paging ---
+# /api/query returns one page of rows at a time, read lazily off the SQLite
+# cursor, so a query such as SELECT * FROM total never materialises in a
+# worker. Clients that want every row ask for an NDJSON stream instead.
+QUERY_PAGE_SIZE = int(os.environ.get("QUERY_PAGE_SIZE", 1000))
+QUERY_MAX_PAGE_SIZE = int(os.environ.get("QUERY_MAX_PAGE_SIZE", 10000))
+STREAM_BATCH_ROWS = 1000
+
+# Row layouts a client can ask for with "format":
+#   objects - "rows": [{column: value, ...}, ...] (the default)
+#   arrays  - "rows": [[value, ...], ...] in column order
+#   columns - "data": [[every value of column 0], [column 1], ...]
+# arrays and columns do not repeat the column names on every row, which
+# matters for wide tables such as households.
+QUERY_FORMATS = ("objects", "arrays", "columns")
+
+
+# --- Query limits ---
+# Every user query runs under a time budget enforced by SQLite's progress
+# handler, and may fetch at most QUERY_MAX_ROWS rows (offset rows included).
+# Streams and exports get a fresh budget for every batch they fetch, so they
+# are bounded by the row cap rather than by how fast the client reads.
+# Set either limit to 0 to disable it.
+QUERY_TIMEOUT_S = float(os.environ.get("QUERY_TIMEOUT_S", 30))
+QUERY_MAX_ROWS = int(os.environ.get("QUERY_MAX_ROWS", 2_000_000))
+
+
+def _open_query(engine, sql: str, per_fetch: bool = False, **options):
+    """Execute sql under the query limits and return (query, close).
+
+    The caller fetches through the returned QueryBudget and must call
+    close() once it is done with the rows. options override or extend the
+    QueryBudget settings (timeout, should_stop, timeout_name).
+    """
+    conn = engine.connect()
+    options.setdefault("timeout", QUERY_TIMEOUT_S)
+    query = QueryBudget(conn, max_rows=QUERY_MAX_ROWS, per_fetch=per_fetch, **options)
+
+    def close():
+        query.close()
+        conn.close()
+
+    try:
+        query.execute(sql)
+    except Exception:
+        close()
+        raise
+    return query, close
+
+
+def _rows(query, offset: int, stop: int | None):
+    """Yield rows[offset:stop] of an executed query, fetched in batches."""
+    index = 0
+    while stop is None or index < stop:
+        size = STREAM_BATCH_ROWS if stop is None else min(STREAM_BATCH_ROWS, stop - index)
+        rows = query.fetchmany(size)
+        if not rows:
+            return
+        yield from rows[max(offset - index, 0):]
+        index += len(rows)
+
+
+def _execute(
+    engine, sql: str, offset: int = 0, limit: int | None = None,
+    progress=None, **options,
+) -> dict:
+    """Run sql and return rows[offset:offset + limit] as value lists, plus one
+    row more if there is one so the caller can tell whether another page
+    follows. progress, if given, is called with the row count so far after
+    every STREAM_BATCH_ROWS rows."""
+    stop = None if limit is None else offset + limit + 1
+    query, close = _open_query(engine, sql, **options)
+    try:
+        columns = query.keys()
+        rows = []
+        for row in _rows(query, offset, stop):
+            rows.append(list(row))
+            if progress and len(rows) % STREAM_BATCH_ROWS == 0:
+                progress(len(rows))
+    finally:
+        close()
+    return {"columns": columns, "rows": rows, "count": len(rows)}
+
+
+def _shape(columns: list, rows: list, fmt: str) -> dict:
+    if fmt == "columns":
+        data = [list(values) for values in zip(*rows)] if rows else [[] for _ in columns]
+        return {"data": data}
+    if fmt == "arrays":
+        return {"rows": rows}
+    return {"rows": [dict(zip(columns, row)) for row in rows]}
+
+
+def _page(result: dict, offset: int, limit: int, fmt: str) -> dict:
+    rows = result["rows"]
+    return {
+        "columns": result["columns"],
+        **_shape(result["columns"], rows[:limit], fmt),
+        "count": min(len(rows), limit),
+        "offset": offset,
+        "limit": limit,
+        "has_more": len(rows) > limit,
+    }
+
+
+def _stream(engine, sql: str, offset: int, limit: int | None, fmt: str):
+    """Execute sql and return a generator of NDJSON lines.
+
+    The first line holds the column names, then one line per row (an object,
+    or a value array for the arrays format), then {"count": n}. Execution
+    errors are raised before streaming starts; an error part-way through is
+    reported as a final {"error": ...} line.
+    """
+    query, close = _open_query(engine, sql, per_fetch=True)
+    columns = query.keys()
+    stop = None if limit is None else offset + limit
+
+    def generate():
+        try:
+            yield app.json.dumps({"columns": columns}) + "\n"
+            count = 0
+            lines = []
+            for row in _rows(query, offset, stop):
+                lines.append(app.json.dumps(
+                    list(row) if fmt == "arrays" else dict(zip(columns, row))
+                ))
+                count += 1
+                if len(lines) == STREAM_BATCH_ROWS:
+                    yield "\n".join(lines) + "\n"
+                    lines = []
+            if lines:
+                yield "\n".join(lines) + "\n"
+            yield app.json.dumps({"count": count}) + "\n"
+        except Exception as e:
+            yield app.json.dumps({"error": str(e)}) + "\n"
+        finally:
+            close()
+
+    return generate()
+
+
+# --- Precomputed example results ---
+# The example queries never change, so `flask --app app precompute-examples`
+# (run during the Docker build) executes them once and stores the results
+# next to each database as <db stem>.examples.json. Requests whose SQL
+# matches an example are answered from memory without touching SQLite. A
+# sidecar written for a different version of the database, or in an older
+# layout, is ignored.
+EXAMPLES_SIDECAR_VERSION = 2
+
+
+def _examples_path(db_path: str) -> str:
+    return os.path.splitext(db_path)[0] + ".examples.json"
+
+
+def _load_precomputed(db_path: str) -> dict:
+    """Return {"results": {id: result}, "by_sql": {sql: result}} or {}."""
+    path = _examples_path(db_path)
+    try:
+        with open(path, encoding="utf-8") as f:
+            sidecar = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    current = (EXAMPLES_SIDECAR_VERSION, query_cache.db_fingerprint(db_path))
+    if (sidecar.get("version"), sidecar.get("fingerprint")) != current:
+        app.logger.warning("Ignoring stale precomputed examples: %s", path)
+        return {}
+    results, by_sql = {}, {}
+    for example in sidecar.get("examples", []):
+        results[example["id"]] = example["result"]
+        by_sql[query_cache.normalise_sql(example["sql"])] = example["result"]
+    return {"results": results, "by_sql": by_sql}
+
+
+PRECOMPUTED = {ds: _load_precomputed(entry["path"]) for ds, entry in DATASETS.items()}
+
+
+@app.cli.command("precompute-examples")
+def precompute_examples():
+    """Run every example query and write the results next to its database."""
+    for ds, entry in DATASETS.items():
+        examples = []
+        for example in EXAMPLES_BY_DATASET.get(ds, []):
+            try:
+                result = _execute(entry["engine"], example["sql"])
+            except Exception as e:
+                click.echo(f"  {ds}/{example['id']}: skipped ({e})")
+                continue
+            examples.append(
+                {"id": example["id"], "sql": example["sql"], "result": result}
+            )
+        path = _examples_path(entry["path"])
+        sidecar = {
+            "version": EXAMPLES_SIDECAR_VERSION,
+            "fingerprint": query_cache.db_fingerprint(entry["path"]),
+            "examples": examples,
+        }
+        # Write next to the target and rename, so workers never read a
+        # partially written file
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(sidecar, f, separators=(",", ":"))
+        os.replace(path + ".tmp", path)
+        PRECOMPUTED[ds] = _load_precomputed(entry["path"])
+        click.echo(f"{ds}: {len(examples)} example results -> {path}")
 
 
 SAFE_SQL_PATTERN = re.compile(
@@ -494,62 +352,639 @@ def validate_sql(sql: str) -> str | None:
 def index():
     dataset = request.args.get("dataset", DEFAULT_DATASET)
     examples = EXAMPLES_BY_DATASET.get(dataset, [])
-    return render_template(
+    response = app.make_response(render_template(
         "index.html",
         examples=examples,
         datasets=DATASETS,
         current_dataset=dataset,
+        # Arrow and Parquet are only offered when pyarrow is installed
+        export_formats=[fmt for fmt in export.FORMATS if export.available(fmt)],
+    ))
+    # Revalidated on every load; unchanged pages come back as a bodiless 304
+    response.add_etag()
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
+def _parse_sql(data) -> tuple[tuple | None, str | None]:
+    """Validate the sql and dataset of a request body.
+
+    Returns ((sql, engine, ds), None) or (None, error message).
+    """
+    if not isinstance(data, dict):
+        return None, "Expected a JSON object."
+    sql = data.get("sql", "")
+    dataset = data.get("dataset", DEFAULT_DATASET)
+    if not isinstance(sql, str):
+        return None, "sql must be a string."
+    if not isinstance(dataset, str):
+        return None, "dataset must be a string."
+    sql = sql.strip()
+    if not sql:
+        return None, "No SQL query provided."
+
+    error = validate_sql(sql)
+    if error:
+        return None, error
+
+    engine, ds = _get_engine(dataset)
+    if not engine:
+        return None, f"Unknown dataset: {dataset}"
+    return (sql, engine, ds), None
+
+
+def _parse_query(data: dict, stream: bool = False) -> tuple[dict | None, str | None]:
+    """Validate a query request body.
+
+    Returns (params, None) with sql, engine, ds, fmt, offset and limit, or
+    (None, error message).
+    """
+    source, error = _parse_sql(data)
+    if error:
+        return None, error
+    sql, engine, ds = source
+
+    fmt = data.get("format", "objects")
+    if fmt not in QUERY_FORMATS or (stream and fmt == "columns"):
+        allowed = ", ".join(f for f in QUERY_FORMATS if not (stream and f == "columns"))
+        return None, f"format must be one of: {allowed}."
+    try:
+        offset = max(int(data.get("offset", 0)), 0)
+        # Streams are unbounded unless a limit is given; pages never are
+        limit = data.get("limit", None if stream else QUERY_PAGE_SIZE)
+        if limit is not None:
+            limit = max(int(limit), 1)
+            if not stream:
+                limit = min(limit, QUERY_MAX_PAGE_SIZE)
+    except (TypeError, ValueError):
+        return None, "limit and offset must be integers."
+    params = {"sql": sql, "engine": engine, "ds": ds, "fmt": fmt}
+    return {**params, "offset": offset, "limit": limit}, None
+
+
+def _cache_key(params: dict) -> str | None:
+    if not QUERY_CACHE:
+        return None
+    fingerprint = query_cache.db_fingerprint(DATASETS[params["ds"]]["path"])
+    return QUERY_CACHE.key(
+        params["ds"], fingerprint, params["sql"],
+        params["offset"], params["limit"], params["fmt"],
     )
 
 
+def _precomputed(ds: str, sql: str, offset: int, limit: int) -> dict | None:
+    """Rows offset..offset + limit (plus one lookahead row) of a precomputed
+    example result, or None if sql is not an example."""
+    result = PRECOMPUTED[ds].get("by_sql", {}).get(query_cache.normalise_sql(sql))
+    if result is None:
+        return None
+    return {**result, "rows": result["rows"][offset:offset + limit + 1]}
+
+
 @app.route("/api/query", methods=["POST"])
 def run_query():
     data = request.get_json()
-    sql = data.get("sql", "").strip()
-    dataset = data.get("dataset", DEFAULT_DATASET)
-    if not sql:
-        return jsonify({"error": "No SQL query provided."}), 400
+    if not isinstance(data, dict):
+        return jsonify({"error": "Expected a JSON object."}), 400
+    stream = bool(data.get("stream")) or (
+        request.accept_mimetypes.best == "application/x-ndjson"
+    )
+    params, error = _parse_query(data, stream)
+    if error:
+        return jsonify({"error": error}), 400
+    sql, engine, ds, fmt = params["sql"], params["engine"], params["ds"], params["fmt"]
+    offset, limit = params["offset"], params["limit"]
+
+    if stream:
+        try:
+            lines = _stream(engine, sql, offset, limit, fmt)
+        except Exception as e:
+            return jsonify({"error": str(e)}), 400
+        return _streamed_response(lines, "application/x-ndjson")
+
+    precomputed = _precomputed(ds, sql, offset, limit)
+    if precomputed is not None:
+        response = jsonify(_page(precomputed, offset, limit, fmt))
+        response.headers["X-Cache"] = "PRECOMPUTED"
+        return response
+
+    cache_key = _cache_key(params)
+    if cache_key:
+        payload = QUERY_CACHE.get(cache_key)
+        if payload is not None:
+            response = app.response_class(payload, mimetype="application/json")
+            response.headers["X-Cache"] = "HIT"
+            return response
 
-    error = validate_sql(sql)
+    try:
+        result = _execute(engine, sql, offset, limit)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+    response = jsonify(_page(result, offset, limit, fmt))
+    if cache_key:
+        QUERY_CACHE.put(cache_key, ds, response.get_data())
+        response.headers["X-Cache"] = "MISS"
+    return response
+
+
+# --- Cross-dataset comparison ---
+# POST /api/compare runs one query against several datasets at once. SQLite
+# releases the GIL while it works, so with a thread per dataset the request
+# takes as long as the slowest dataset rather than the sum of all of them.
+COMPARE_POOL = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("COMPARE_WORKERS", max(len(DATASETS), 1) * 2)),
+    thread_name_prefix="compare",
+)
+
+
+def _compare_one(params: dict) -> dict:
+    result = _precomputed(params["ds"], params["sql"], params["offset"], params["limit"])
+    if result is None:
+        result = _execute(params["engine"], params["sql"], params["offset"], params["limit"])
+    return result
+
+
+@app.route("/api/compare", methods=["POST"])
+def compare_query():
+    """Run a query on several datasets and merge the pages, tagged by dataset.
+
+    sql is either one query for every dataset (or for those listed in
+    "datasets") or an object mapping each dataset to its own query. The
+    merged columns are "dataset" followed by the union of the datasets'
+    columns; a dataset lacking a column gets nulls. A dataset whose query
+    fails is reported under "datasets" and left out of the rows.
+    """
+    data = request.get_json()
+    if not isinstance(data, dict):
+        return jsonify({"error": "Expected a JSON object."}), 400
+    sql = data.get("sql", "")
+    names = data.get("datasets")
+    if names is not None and (
+        not isinstance(names, list) or not all(isinstance(ds, str) for ds in names)
+    ):
+        return jsonify({"error": "datasets must be a list of dataset names."}), 400
+    if isinstance(sql, dict):
+        if names is not None:
+            return jsonify({"error": "Give datasets or per-dataset sql, not both."}), 400
+        queries = sql
+    else:
+        queries = {ds: sql for ds in (names if names is not None else DATASETS)}
+    if not queries:
+        return jsonify({"error": "No datasets to compare."}), 400
+
+    all_params = {}
+    for ds, ds_sql in queries.items():
+        if ds not in DATASETS:
+            return jsonify({"error": f"Unknown dataset: {ds}"}), 400
+        params, error = _parse_query({**data, "sql": ds_sql, "dataset": ds})
+        if error:
+            return jsonify({"error": f"{ds}: {error}"}), 400
+        all_params[ds] = params
+    first = next(iter(all_params.values()))
+    offset, limit, fmt = first["offset"], first["limit"], first["fmt"]
+
+    cache_key = None
+    if QUERY_CACHE:
+        fingerprint = "+".join(
+            f"{ds}:{query_cache.db_fingerprint(DATASETS[ds]['path'])}" for ds in all_params
+        )
+        cache_key = QUERY_CACHE.key(
+            "compare", fingerprint, json.dumps(queries, sort_keys=True), offset, limit, fmt
+        )
+        payload = QUERY_CACHE.get(cache_key)
+        if payload is not None:
+            response = app.response_class(payload, mimetype="application/json")
+            response.headers["X-Cache"] = "HIT"
+            return response
+
+    futures = {ds: COMPARE_POOL.submit(_compare_one, p) for ds, p in all_params.items()}
+    columns, rows, datasets = [], [], {}
+    for ds, future in futures.items():
+        try:
+            result = future.result()
+        except Exception as e:
+            datasets[ds] = {"error": str(e)}
+            continue
+        page = _page(result, offset, limit, "arrays")
+        datasets[ds] = {"count": page["count"], "has_more": page["has_more"]}
+        columns += [c for c in page["columns"] if c not in columns]
+        rows += [(ds, dict(zip(page["columns"], row))) for row in page["rows"]]
+    if not rows and all("error" in entry for entry in datasets.values()):
+        return jsonify({"error": "; ".join(f"{ds}: {e['error']}" for ds, e in datasets.items())}), 400
+
+    columns = ["dataset", *columns]
+    merged = [[ds, *(row.get(c) for c in columns[1:])] for ds, row in rows]
+    response = jsonify({
+        "columns": columns,
+        **_shape(columns, merged, fmt),
+        "count": len(merged),
+        "offset": offset,
+        "limit": limit,
+        "datasets": datasets,
+    })
+    if cache_key and not any("error" in entry for entry in datasets.values()):
+        QUERY_CACHE.put(cache_key, "compare", response.get_data())
+        response.headers["X-Cache"] = "MISS"
+    return response
+
+
+# --- Background jobs ---
+# POST /api/jobs runs a query on a small thread pool instead of the request
+# worker and returns a job id at once; clients poll GET /api/jobs/<id> for
+# progress and the result. There is deliberately no push channel: an open
+# event stream would hold one of gunicorn's few sync workers for the whole
+# job. Jobs get a longer time budget than interactive queries.
+JOB_TIMEOUT_S = float(os.environ.get("JOB_TIMEOUT_S", 600))
+JOBS = jobs.from_env()
+
+
+@app.route("/api/jobs", methods=["POST"])
+def submit_job():
+    params, error = _parse_query(request.get_json())
+    if error:
+        return jsonify({"error": error}), 400
+    cache_key = _cache_key(params)
+
+    def run(job):
+        result = _execute(
+            params["engine"], params["sql"], params["offset"], params["limit"],
+            progress=job.progress,
+            timeout=JOB_TIMEOUT_S,
+            timeout_name="JOB_TIMEOUT_S",
+            should_stop=job.cancelled,
+        )
+        page = _page(result, params["offset"], params["limit"], params["fmt"])
+        # A later /api/query for the same page is then a cache hit
+        if cache_key:
+            QUERY_CACHE.put(cache_key, params["ds"], app.json.response(page).get_data())
+        return page
+
+    job_id = JOBS.submit(params["ds"], params["sql"], run)
+    if job_id is None:
+        return jsonify({"error": "Too many queries are running; try again shortly."}), 429
+    response = jsonify(JOBS.get(job_id))
+    response.status_code = 202
+    response.headers["Location"] = f"/api/jobs/{job_id}"
+    return response
+
+
+@app.route("/api/jobs/<job_id>")
+def get_job(job_id):
+    job = JOBS.get(job_id)
+    if job is None:
+        return jsonify({"error": f"Unknown job: {job_id}"}), 404
+    return jsonify(job)
+
+
+@app.route("/api/jobs/<job_id>", methods=["DELETE"])
+def cancel_job(job_id):
+    if not JOBS.cancel(job_id):
+        if JOBS.get(job_id, with_result=False) is None:
+            return jsonify({"error": f"Unknown job: {job_id}"}), 404
+        return jsonify({"error": "Job has already finished."}), 409
+    return jsonify(JOBS.get(job_id, with_result=False)), 202
+
+
+# --- Response compression ---
+# JSON responses are compressed when the client accepts it, preferring
+# brotli (if the optional brotli package is installed) over gzip. Bodies
+# smaller than COMPRESS_MIN_BYTES are sent as they are.
+COMPRESS_MIN_BYTES = int(os.environ.get("COMPRESS_MIN_BYTES", 1024))
+COMPRESS_MIMETYPES = ("application/json", "application/x-ndjson")
+
+
+def _encoding() -> str | None:
+    offered = ["br", "gzip"] if brotli else ["gzip"]
+    return request.accept_encodings.best_match(offered)
+
+
+def _streamed_response(chunks, mimetype: str):
+    """Stream text chunks, gzip-compressing them on the fly if accepted.
+
+    Each chunk is flushed through the compressor so the client receives rows
+    as they are produced rather than when the stream ends.
+    """
+    if request.accept_encodings.best_match(["gzip"]) is None:
+        return app.response_class(chunks, mimetype=mimetype)
+
+    def compressed():
+        z = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31: gzip framing
+        try:
+            for chunk in chunks:
+                yield z.compress(chunk.encode("utf-8")) + z.flush(zlib.Z_SYNC_FLUSH)
+            yield z.flush()
+        finally:
+            chunks.close()
+
+    response = app.response_class(compressed(), mimetype=mimetype)
+    response.headers["Content-Encoding"] = "gzip"
+    response.vary.add("Accept-Encoding")
+    return response
+
+
+@app.after_request
+def compress_response(response):
+    if (
+        response.is_streamed
+        or response.direct_passthrough
+        or response.mimetype not in COMPRESS_MIMETYPES
+        or "Content-Encoding" in response.headers
+    ):
+        return response
+    response.vary.add("Accept-Encoding")
+    encoding = _encoding()
+    body = response.get_data()
+    if not encoding or len(body) < COMPRESS_MIN_BYTES:
+        return response
+    response.set_data(_compress(body, encoding))
+    response.headers["Content-Encoding"] = encoding
+    return response
+
+
+def _compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=6)
+
+
+# --- Immutable metadata ---
+# Schema and example listings cannot change while the app runs, so each
+# response body is built once, compressed once per encoding and served with
+# a strong ETag. Cache-Control: no-cache makes browsers revalidate every
+# time, which costs a bodiless 304 when nothing changed.
+_IMMUTABLE_JSON: dict[tuple, tuple[bytes, str]] = {}
+
+
+def _immutable_json(key: tuple, build):
+    """Serve build()'s JSON under key, built on first use and then reused."""
+    if key not in _IMMUTABLE_JSON:
+        body = app.json.response(build()).get_data()
+        _IMMUTABLE_JSON[key] = (body, hashlib.sha256(body).hexdigest()[:32])
+    body, etag = _IMMUTABLE_JSON[key]
+    encoding = _encoding()
+    if encoding and len(body) >= COMPRESS_MIN_BYTES:
+        if (key, encoding) not in _IMMUTABLE_JSON:
+            _IMMUTABLE_JSON[key, encoding] = (_compress(body, encoding), etag)
+        body = _IMMUTABLE_JSON[key, encoding][0]
+        # Each encoding is a different representation, so it gets its own tag
+        etag = f"{etag}-{encoding}"
+    else:
+        encoding = None
+
+    response = app.response_class(body, mimetype="application/json")
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    response.vary.add("Accept-Encoding")
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    return response.make_conditional(request)
+
+
+# Planner statistics per dataset, read on first use; the databases are
+# immutable while served
+_PLAN_STATS: dict[str, dict] = {}
+
+
+@app.route("/api/explain", methods=["POST"])
+def explain_query():
+    """Show the query plan, flag slow access paths and estimate the cost."""
+    source, error = _parse_sql(request.get_json())
     if error:
         return jsonify({"error": error}), 400
+    sql, engine, ds = source
+
+    try:
+        with engine.connect() as conn:
+            if ds not in _PLAN_STATS:
+                _PLAN_STATS[ds] = explain.table_stats(conn)
+            result = explain.explain(conn, sql.rstrip(";"), _PLAN_STATS[ds])
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(result)
+
+
+# --- Column store ---
+# Hot columns kept in memory as NumPy arrays per dataset (see column_store).
+# With COLUMN_STORE_PRELOAD=1 they are loaded at import, so that under
+# gunicorn --preload the workers share them copy-on-write. With
+# COLUMN_STORE=0 every aggregate reads its columns afresh.
+COLUMN_STORE = os.environ.get("COLUMN_STORE", "1") == "1"
+COLUMN_STORES = (
+    {ds: column_store.ColumnStore(entry["path"]) for ds, entry in DATASETS.items()}
+    if COLUMN_STORE else {}
+)
+if COLUMN_STORE and os.environ.get("COLUMN_STORE_PRELOAD") == "1":
+    for _store in COLUMN_STORES.values():
+        aggregate.load(_store)
+
+
+def _column_store(ds: str) -> column_store.ColumnStore:
+    return COLUMN_STORES.get(ds) or column_store.ColumnStore(DATASETS[ds]["path"])
+
+
+def _names(value) -> list | None:
+    """value as a list of strings (a lone string is a list of one), or None
+    when it is anything else."""
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, list) and all(isinstance(v, str) for v in value):
+        return value
+    return None
 
-    engine, _ = _get_engine(dataset)
+
+def _is_fraction(value) -> bool:
+    return (
+        isinstance(value, (int, float)) and not isinstance(value, bool)
+        and 0 <= value <= 1
+    )
+
+
+@app.route("/api/aggregate", methods=["POST"])
+def aggregate_query():
+    """Survey-weighted mean, total, median, quantiles and Gini by group."""
+    data = request.get_json()
+    if not isinstance(data, dict):
+        return jsonify({"error": "Expected a JSON object."}), 400
+    dataset = data.get("dataset", DEFAULT_DATASET)
+    engine, ds = _get_engine(dataset) if isinstance(dataset, str) else (None, None)
     if not engine:
         return jsonify({"error": f"Unknown dataset: {dataset}"}), 400
 
+    measure = data.get("measure")
+    if measure not in aggregate.MEASURES:
+        return jsonify({"error": f"measure must be one of: {', '.join(aggregate.MEASURES)}."}), 400
+    by = _names(data.get("by") or [])
+    if by is None or any(name not in aggregate.DIMENSIONS for name in by) or (
+        len(set(by)) != len(by)
+    ):
+        allowed = ", ".join(aggregate.DIMENSIONS)
+        return jsonify({"error": f"by must be distinct dimensions from: {allowed}."}), 400
+    weight = data.get("weight", "weight")
+    if weight is not None and weight not in aggregate.WEIGHTS:
+        allowed = ", ".join(aggregate.WEIGHTS)
+        return jsonify({"error": f"weight must be null or one of: {allowed}."}), 400
+    stats = _names(data.get("stats") or list(aggregate.STATS))
+    if stats is None or any(name not in aggregate.STATS for name in stats):
+        return jsonify({"error": f"stats must be from: {', '.join(aggregate.STATS)}."}), 400
+    fmt = data.get("format", "objects")
+    if fmt not in QUERY_FORMATS:
+        return jsonify({"error": f"format must be one of: {', '.join(QUERY_FORMATS)}."}), 400
+    quantiles = data.get("quantiles") or []
+    if not isinstance(quantiles, list) or not all(_is_fraction(q) for q in quantiles):
+        return jsonify({"error": "quantiles must be a list of numbers between 0 and 1."}), 400
+    quantiles = tuple(float(q) for q in quantiles)
+
     try:
-        with engine.connect() as conn:
-            result = conn.execute(text(sql))
-            columns = list(result.keys())
-            rows = [dict(zip(columns, row)) for row in result.fetchall()]
-        return jsonify({"columns": columns, "rows": rows, "count": len(rows)})
+        columns, rows = aggregate.aggregate(
+            aggregate.load(_column_store(ds)), measure, by, weight, tuple(stats), quantiles
+        )
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({
+        "measure": measure,
+        "by": by,
+        "weight": weight,
+        "columns": columns,
+        **_shape(columns, rows, fmt),
+        "count": len(rows),
+    })
+
+
+@app.route("/api/export", methods=["GET", "POST"])
+def export_query():
+    """Download a query result as CSV, Arrow IPC or Parquet.
+
+    Takes sql, dataset and format (csv by default) as JSON, form fields or
+    query parameters, and streams every row straight off the cursor. The
+    first batch is encoded before the response starts, so an error there
+    (such as the row cap) is still a 400. A later error can only abort the
+    transfer, which the client sees as a truncated download.
+    """
+    params = request.get_json(silent=True) or request.values
+    source, error = _parse_sql(params)
+    if error:
+        return jsonify({"error": error}), 400
+    sql, engine, ds = source
+    fmt = params.get("format", "csv")
+    if fmt not in export.FORMATS:
+        allowed = ", ".join(export.FORMATS)
+        return jsonify({"error": f"format must be one of: {allowed}."}), 400
+    if not export.available(fmt):
+        return jsonify({"error": f"{fmt} export needs pyarrow installed."}), 400
+
+    try:
+        query, close = _open_query(engine, sql, per_fetch=True)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+    chunks = export.ENCODERS[fmt](query.keys(), query)
+    try:
+        first = next(chunks, None)
     except Exception as e:
+        close()
         return jsonify({"error": str(e)}), 400
 
+    def generate():
+        try:
+            if first is not None:
+                yield first
+            yield from chunks
+        finally:
+            close()
+
+    mimetype, extension, binary = export.FORMATS[fmt]
+    if binary:
+        response = app.response_class(generate(), mimetype=mimetype)
+    else:
+        response = _streamed_response(generate(), mimetype)
+    response.headers["Content-Disposition"] = (
+        f'attachment; filename="{ds}-query.{extension}"'
+    )
+    return response
+
+
+@app.route("/api/cache")
+def cache_stats():
+    stores = {ds: store.stats() for ds, store in COLUMN_STORES.items()}
+    if not QUERY_CACHE:
+        return jsonify({"enabled": False, "column_store": stores})
+    return jsonify({"enabled": True, **QUERY_CACHE.stats(), "column_store": stores})
+
+
+def _describe_schema(engine) -> dict:
+    """Tables (columns, row count, indexes) and views (columns) of a dataset."""
+    tables, views = {}, {}
+    with engine.connect() as conn:
+        objects = conn.execute(
+            text(
+                "SELECT type, name FROM sqlite_master WHERE type IN ('table', 'view')"
+                " AND name NOT LIKE 'sqlite_%' AND name NOT LIKE '\\_%' ESCAPE '\\'"
+                " ORDER BY name"
+            )
+        ).fetchall()
+        for kind, name in objects:
+            cols = conn.execute(text(f"PRAGMA table_info('{name}')")).fetchall()
+            columns = [{"name": c[1], "type": c[2]} for c in cols]
+            if kind == "view":
+                views[name] = {"columns": columns}
+                continue
+            indexes = []
+            for _, index, unique, *_ in conn.execute(
+                text(f"PRAGMA index_list('{name}')")
+            ):
+                info = conn.execute(text(f"PRAGMA index_info('{index}')")).fetchall()
+                indexes.append({
+                    "name": index,
+                    "columns": [c[2] for c in info],
+                    "unique": bool(unique),
+                })
+            tables[name] = {
+                "columns": columns,
+                "rows": conn.execute(text(f'SELECT COUNT(*) FROM "{name}"')).scalar(),
+                "indexes": sorted(indexes, key=lambda i: i["name"]),
+            }
+    return {"tables": tables, "views": views}
+
+
+# Computed once at startup; the databases are immutable while served
+SCHEMAS = {ds: _describe_schema(entry["engine"]) for ds, entry in DATASETS.items()}
+
+# Everything read at import time (schemas, preloaded columns) has been read.
+# Close the pooled connections now, so that under gunicorn --preload no
+# SQLite connection is open in the master when it forks the workers.
+for _entry in DATASETS.values():
+    _entry["engine"].dispose()
+
 
 @app.route("/api/tables")
 def list_tables():
     dataset = request.args.get("dataset", DEFAULT_DATASET)
-    engine, _ = _get_engine(dataset)
-    if not engine:
+    if dataset not in SCHEMAS:
         return jsonify({"error": f"Unknown dataset: {dataset}"}), 400
-
-    with engine.connect() as conn:
-        tables = conn.execute(
-            text("SELECT name FROM sqlite_master WHERE type='table' ORDER BY name")
-        ).fetchall()
-        result = {}
-        for (table_name,) in tables:
-            cols = conn.execute(text(f"PRAGMA table_info('{table_name}')")).fetchall()
-            result[table_name] = [{"name": c[1], "type": c[2]} for c in cols]
-    return jsonify(result)
+    return _immutable_json(("tables", dataset), lambda: SCHEMAS[dataset])
 
 
 @app.route("/api/examples")
 def get_examples():
     dataset = request.args.get("dataset", DEFAULT_DATASET)
-    return jsonify(EXAMPLES_BY_DATASET.get(dataset, []))
+    if dataset not in EXAMPLES_BY_DATASET:
+        return jsonify([])
+    examples = EXAMPLES_BY_DATASET[dataset]
+    # ?results=1 inlines the precomputed result of each example that has
+    # one, in the row layout given by ?format= (objects by default)
+    if request.args.get("results") != "1":
+        return _immutable_json(("examples", dataset), lambda: examples)
+    fmt = request.args.get("format", "objects")
+    if fmt not in QUERY_FORMATS:
+        allowed = ", ".join(QUERY_FORMATS)
+        return jsonify({"error": f"format must be one of: {allowed}."}), 400
+    results = PRECOMPUTED.get(dataset, {}).get("results", {})
+    return _immutable_json(("examples", dataset, fmt), lambda: [
+        {**ex, "result": _page(results[ex["id"]], 0, results[ex["id"]]["count"], fmt)}
+        if ex["id"] in results
+        else ex
+        for ex in examples
+    ])
 
 
 if __name__ == "__main__":
@@ -0,0 +1,166 @@
+"""In-process columnar cache of hot dataset columns.
+
+A ColumnStore keeps single columns of a dataset's tables as NumPy arrays.
+Numeric columns are float64 with NaN for NULL. Every other column is
+dictionary-encoded: an int32 code per row (-1 for NULL) plus the array of
+distinct values. Each column is read once, on first use, from the table's
+Arrow copy when there is one and from SQLite otherwise. After that,
+aggregations over it never touch SQLite.
+
+Under gunicorn --preload the app is imported in the master process. With
+COLUMN_STORE_PRELOAD=1 the hot columns are loaded there, before the fork,
+so the workers share their pages copy-on-write instead of each holding a
+copy. Dictionary encoding is what keeps those pages shared. Code arrays
+are plain buffers that reference counting never writes to, unlike a
+Python string per row.
+"""
+import sqlite3
+import threading
+from dataclasses import dataclass
+
+import numpy as np
+
+import columnar
+
+NUMERIC_TYPES = ("INTEGER", "INT", "REAL")
+
+
+@dataclass(frozen=True)
+class Column:
+    """One cached column: values (numeric) or codes into categories."""
+
+    values: np.ndarray | None = None
+    codes: np.ndarray | None = None
+    categories: np.ndarray | None = None
+
+    @property
+    def numeric(self) -> bool:
+        return self.values is not None
+
+    @property
+    def nbytes(self) -> int:
+        if self.numeric:
+            return self.values.nbytes
+        return self.codes.nbytes + self.categories.nbytes
+
+    def missing(self) -> np.ndarray:
+        return np.isnan(self.values) if self.numeric else self.codes < 0
+
+    def decode(self) -> np.ndarray:
+        """The column as one Python value per row (None for NULL)."""
+        if self.numeric:
+            return np.where(np.isnan(self.values), None, self.values.astype(object))
+        lookup = np.append(self.categories, None)
+        return lookup[self.codes]
+
+    def isin(self, values) -> np.ndarray:
+        """Row mask of values equal to any of values."""
+        if self.numeric:
+            return np.isin(self.values, np.asarray(values, dtype=np.float64))
+        wanted = np.flatnonzero(np.isin(self.categories, np.asarray(values, dtype=object)))
+        return np.isin(self.codes, wanted)
+
+
+def _encode(values: np.ndarray) -> Column:
+    """Dictionary-encode an object array (None is NULL)."""
+    missing = np.equal(values, None)
+    categories, inverse = np.unique(values[~missing].astype(str), return_inverse=True)
+    codes = np.full(len(values), -1, dtype=np.int32)
+    codes[~missing] = inverse
+    return Column(codes=codes, categories=categories.astype(object))
+
+
+def _from_arrow(array) -> Column:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    if pa.types.is_integer(array.type) or pa.types.is_floating(array.type):
+        values = pc.cast(array, pa.float64()).to_numpy(zero_copy_only=False)
+        return Column(values=np.asarray(values, dtype=np.float64))
+    if not pa.types.is_dictionary(array.type):
+        array = pc.dictionary_encode(pc.cast(array, pa.string()))
+    codes = pc.fill_null(array.indices, -1).to_numpy(zero_copy_only=False)
+    categories = pc.cast(array.dictionary, pa.string()).to_numpy(zero_copy_only=False)
+    # Arrow's dictionary is in first-seen order; re-sort it so categories are
+    # ordered the same way whichever source a column came from
+    order = np.argsort(categories.astype(str))
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    codes = np.where(codes < 0, -1, rank[np.maximum(codes, 0)]).astype(np.int32)
+    return Column(codes=codes, categories=categories[order].astype(object))
+
+
+class ColumnStore:
+    """Lazily loaded columns of one database, safe to share between threads."""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._columns: dict[tuple[str, str], Column] = {}
+        self._types: dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True)
+
+    def _declared_types(self, table: str) -> dict:
+        if table not in self._types:
+            conn = self._connect()
+            try:
+                info = conn.execute(f"PRAGMA table_info({table})").fetchall()
+            finally:
+                conn.close()
+            if not info:
+                raise KeyError(f"no such table: {table}")
+            self._types[table] = {name: decl.upper() for _, name, decl, *_ in info}
+        return self._types[table]
+
+    def _load(self, table: str, names: list) -> dict:
+        types = self._declared_types(table)
+        unknown = [name for name in names if name not in types]
+        if unknown:
+            raise KeyError(f"no such column in {table}: {', '.join(unknown)}")
+        if columnar.available(self.db_path, table):
+            data = columnar.read_table(self.db_path, table, names)
+            return {name: _from_arrow(data.column(name).combine_chunks()) for name in names}
+        conn = self._connect()
+        try:
+            quoted = ", ".join(f'"{name}"' for name in names)
+            # Columns loaded by separate calls must line up row for row; a
+            # bare SELECT may come back in the order of a covering index
+            rows = conn.execute(
+                f"SELECT {quoted} FROM {table} ORDER BY rowid"
+            ).fetchall()
+        finally:
+            conn.close()
+        loaded = {}
+        for i, name in enumerate(names):
+            values = np.array([row[i] for row in rows], dtype=object)
+            if types[name] in NUMERIC_TYPES:
+                try:
+                    loaded[name] = Column(values=np.where(
+                        np.equal(values, None), np.nan, values
+                    ).astype(np.float64))
+                    continue
+                except (TypeError, ValueError):
+                    pass  # a value the importer kept as text
+            loaded[name] = _encode(values)
+        return loaded
+
+    def columns(self, table: str, names) -> dict[str, Column]:
+        """Return {name: Column} for table, loading any not yet cached."""
+        names = list(dict.fromkeys(names))
+        with self._lock:
+            missing = [name for name in names if (table, name) not in self._columns]
+            if missing:
+                for name, column in self._load(table, missing).items():
+                    self._columns[table, name] = column
+            return {name: self._columns[table, name] for name in names}
+
+    def column(self, table: str, name: str) -> Column:
+        return self.columns(table, [name])[name]
+
+    def stats(self) -> dict:
+        return {
+            "columns": sorted(f"{table}.{name}" for table, name in self._columns),
+            "bytes": sum(column.nbytes for column in self._columns.values()),
+        }
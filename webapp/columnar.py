@@ -0,0 +1,36 @@
+"""Memory-mapped readers for the Arrow IPC copies of the dataset tables.
+
+``python -m ies_import --columnar`` writes ``<db stem>.arrow/<table>.arrow``
+next to each database. Reading one memory-maps the file, so selecting a few
+columns only pages in those columns instead of whole 300-column rows.
+pyarrow is optional: without it, or without the export, callers fall back
+to SQLite.
+"""
+import os
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+
+def arrow_path(db_path: str, table: str) -> str:
+    return os.path.join(os.path.splitext(db_path)[0] + ".arrow", f"{table}.arrow")
+
+
+def available(db_path: str, *tables: str) -> bool:
+    """True when pyarrow is installed and every table has an Arrow copy."""
+    return pa is not None and all(
+        os.path.exists(arrow_path(db_path, t)) for t in tables
+    )
+
+
+def read_table(db_path: str, table: str, columns: list[str] | None = None):
+    """Memory-map a table's Arrow copy and return the selected columns.
+
+    The returned pyarrow.Table references the mapped file directly; pages
+    are read from disk only when a column's buffers are touched.
+    """
+    with pa.memory_map(arrow_path(db_path, table)) as source:
+        data = pa.ipc.open_file(source).read_all()
+    return data.select(columns) if columns else data
@@ -0,0 +1,193 @@
+"""Query plan inspection and cost estimation for /api/explain.
+
+Runs EXPLAIN QUERY PLAN for a query and reads the plan against the
+planner statistics the importer leaves in sqlite_stat1 (row counts per
+table, average rows per index key). The result flags full scans of large
+tables, joins that have no usable index, and predicates such as
+CAST(division AS INTEGER) that stop an index being used, and estimates how
+many rows the query will visit.
+"""
+import os
+import re
+
+# Tables with at least this many rows are worth warning about when scanned
+LARGE_TABLE_ROWS = int(os.environ.get("EXPLAIN_LARGE_TABLE_ROWS", 100_000))
+# Estimated rows visited at which a query is rated medium / high cost
+COST_LEVELS = ((10_000_000, "high"), (100_000, "medium"), (0, "low"))
+# SQLite's own guess for rows per lookup in an automatic index
+AUTOMATIC_INDEX_ROWS = 10
+
+_LOOP = re.compile(r"^(SCAN|SEARCH) (\S+)")
+_INDEX = re.compile(r"INDEX (\S+)")
+_CONSTRAINT = re.compile(r"\((.*)\)")
+# Words that can follow a table name without being its alias
+_KEYWORDS = (
+    "WHERE|JOIN|ON|USING|LEFT|RIGHT|INNER|OUTER|CROSS|NATURAL|GROUP|ORDER"
+    "|LIMIT|UNION|EXCEPT|INTERSECT|HAVING|WINDOW|FROM"
+)
+# FROM/JOIN <table> [AS] <alias>, in user SQL and view definitions
+_FROM = re.compile(
+    rf"\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(?!(?:{_KEYWORDS})\b)(\w+))?",
+    re.IGNORECASE,
+)
+# Further tables of a comma-separated FROM list; only kept for known tables
+_COMMA = re.compile(
+    rf",\s*(\w+)(?:\s+(?:AS\s+)?(?!(?:{_KEYWORDS})\b)(\w+))?", re.IGNORECASE
+)
+_CAST = re.compile(r"\bCAST\s*\(\s*(?:(\w+)\.)?\"?(\w+)\"?\s+AS\b", re.IGNORECASE)
+
+
+def table_stats(conn) -> dict:
+    """Collect row counts, index statistics and view aliases for a database.
+
+    The databases are immutable while served, so callers cache the result.
+    """
+    rows, index_stats = {}, {}
+    try:
+        stat1 = conn.exec_driver_sql("SELECT tbl, idx, stat FROM sqlite_stat1").fetchall()
+    except Exception:
+        stat1 = []  # not analysed
+    for table, index, stat in stat1:
+        numbers = [int(n) for n in stat.split() if n.isdigit()]
+        if numbers:
+            rows[table] = numbers[0]
+            if index:
+                index_stats[index] = numbers
+    # Leading column of every index, to tell which predicates could use one
+    leading = {}
+    aliases = {}
+    for kind, name, table, sql in conn.exec_driver_sql(
+        "SELECT type, name, tbl_name, sql FROM sqlite_master"
+        " WHERE type IN ('index', 'view')"
+    ):
+        if kind == "index":
+            info = conn.exec_driver_sql(f"PRAGMA index_info('{name}')").fetchall()
+            if info:
+                leading.setdefault(table, {}).setdefault(info[0][2], name)
+        elif sql:
+            for source, alias in _aliases(sql, set(rows)):
+                aliases.setdefault(alias, source)
+    return {"rows": rows, "indexes": index_stats, "leading": leading, "aliases": aliases}
+
+
+def _aliases(sql: str, tables: set):
+    """Yield (table, alias) for every table a query reads from."""
+    for source, alias in _FROM.findall(sql):
+        yield source, alias or source
+    for source, alias in _COMMA.findall(sql):
+        if source in tables:
+            yield source, alias or source
+
+
+def _loop_rows(detail: str, table: str | None, stats: dict) -> int | None:
+    """Estimate the rows one SCAN/SEARCH loop visits per execution."""
+    total = stats["rows"].get(table)
+    if detail.startswith("SCAN"):
+        return total
+    if "AUTOMATIC" in detail:
+        return AUTOMATIC_INDEX_ROWS
+    match = _CONSTRAINT.search(detail)
+    terms = match.group(1).split(" AND ") if match else []
+    equal = sum(1 for t in terms if t.endswith("=?"))
+    ranged = len(terms) > equal
+    if "PRIMARY KEY" in detail:
+        estimate = 1 if equal else total
+    else:
+        index = _INDEX.search(detail)
+        numbers = stats["indexes"].get(index.group(1)) if index else None
+        if numbers and equal:
+            estimate = numbers[min(equal, len(numbers) - 1)]
+        else:
+            estimate = total
+    if ranged and estimate:
+        estimate = max(estimate // 4, 1)
+    return estimate
+
+
+def explain(conn, sql: str, stats: dict) -> dict:
+    """Return the query plan, warnings and a rough cost for sql."""
+    plan = [
+        {"id": node_id, "parent": parent, "detail": detail}
+        for node_id, parent, _, detail in conn.exec_driver_sql(
+            f"EXPLAIN QUERY PLAN {sql}"
+        )
+    ]
+    aliases = dict(stats["aliases"])
+    for source, alias in _aliases(sql, set(stats["rows"])):
+        aliases[alias] = source
+        aliases[source] = source
+
+    children = {}
+    for node in plan:
+        children.setdefault(node["parent"], []).append(node)
+
+    warnings = []
+    scanned = set()  # large tables read in full
+
+    def warn(level, message):
+        if {"level": level, "message": message} not in warnings:
+            warnings.append({"level": level, "message": message})
+
+    def cost(parent_id) -> int:
+        """Rows visited by the loops under parent_id, nesting siblings."""
+        visited, outer = 0, 1
+        first_loop = True
+        for node in children.get(parent_id, []):
+            detail = node["detail"]
+            loop = _LOOP.match(detail)
+            if not loop:
+                if detail.startswith("USE TEMP B-TREE"):
+                    warn("info", f"Needs a temporary sort: {detail[len('USE '):].lower()}.")
+                visited += cost(node["id"])
+                continue
+            table = aliases.get(loop.group(2), loop.group(2))
+            total = stats["rows"].get(table)
+            rows = _loop_rows(detail, table, stats)
+            large = total is not None and total >= LARGE_TABLE_ROWS
+            if "AUTOMATIC" in detail:
+                # The temporary index is built once by reading the table
+                visited += total or 0
+                warn(
+                    "warning",
+                    f"No index on {table} for this join: SQLite builds a"
+                    f" temporary one on every run ({detail}).",
+                )
+            elif loop.group(1) == "SCAN" and table in stats["rows"]:
+                if large:
+                    scanned.add(table)
+                if large and not first_loop:
+                    warn(
+                        "warning",
+                        f"Join scans all of {table} ({total:,} rows) for every"
+                        " outer row: no usable index on the join columns.",
+                    )
+                elif large and " INDEX " in detail:
+                    warn("info", f"Reads every entry of an index on {table} ({total:,} rows).")
+                elif large:
+                    warn("warning", f"Full scan of {table} ({total:,} rows).")
+            outer *= max(rows or 1, 1)
+            visited += outer + cost(node["id"])
+            first_loop = False
+        return visited
+
+    estimated_rows = cost(0)
+
+    for alias, column in _CAST.findall(sql):
+        tables = [aliases.get(alias, alias)] if alias else sorted(scanned)
+        for table in tables:
+            index = stats["leading"].get(table, {}).get(column)
+            if index and table in scanned:
+                warn(
+                    "warning",
+                    f"CAST({column} ...) stops SQLite using {index} on {table};"
+                    f" compare {column} with a value of its stored type instead"
+                    f" (e.g. {column} = '06' for a text code).",
+                )
+
+    level = next(name for threshold, name in COST_LEVELS if estimated_rows >= threshold)
+    return {
+        "plan": plan,
+        "warnings": warnings,
+        "estimated_rows": estimated_rows,
+        "cost": level,
+    }
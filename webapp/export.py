@@ -0,0 +1,147 @@
+"""Streaming CSV / Arrow IPC / Parquet export of query results.
+
+Rows are read off the SQLite cursor EXPORT_BATCH_ROWS at a time and each
+batch is encoded and handed to the client before the next one is fetched,
+so memory use stays flat however large the result is. Arrow and Parquet
+need pyarrow, which is optional; CSV does not.
+"""
+import csv
+import io
+import itertools
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+EXPORT_BATCH_ROWS = 65536
+
+# format -> (mimetype, file extension, binary; binary formats need pyarrow)
+FORMATS = {
+    "csv": ("text/csv", "csv", False),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrow", True),
+    "parquet": ("application/vnd.apache.parquet", "parquet", True),
+}
+
+
+def available(fmt: str) -> bool:
+    return fmt in FORMATS and (pa is not None or not FORMATS[fmt][2])
+
+
+def _batches(result):
+    while True:
+        rows = result.fetchmany(EXPORT_BATCH_ROWS)
+        if not rows:
+            return
+        yield rows
+
+
+def csv_chunks(columns: list, result):
+    """Yield the result as CSV text, one chunk per batch of rows."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(columns)
+    for rows in _batches(result):
+        writer.writerows(rows)
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue()
+
+
+class _Sink:
+    """Write-only file object that buffers bytes until they are drained."""
+
+    closed = False
+
+    def __init__(self):
+        self._chunks = []
+        self._pos = 0
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _schema(columns: list, rows: list):
+    """Infer an Arrow schema from the first batch of rows.
+
+    SQLite has no result column types, so each column takes the type of the
+    values in the first batch. Columns that are all NULL there, or that mix
+    types, are exported as strings.
+    """
+    fields = []
+    for i, name in enumerate(columns):
+        try:
+            arrow_type = pa.array([row[i] for row in rows]).type
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            arrow_type = pa.string()
+        if pa.types.is_null(arrow_type):
+            arrow_type = pa.string()
+        fields.append(pa.field(name, arrow_type))
+    return pa.schema(fields)
+
+
+def _record_batch(schema, rows: list):
+    arrays = []
+    for i, field in enumerate(schema):
+        values = [row[i] for row in rows]
+        try:
+            arrays.append(pa.array(values, type=field.type))
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            if field.type != pa.string():
+                raise ValueError(
+                    f"column {field.name!r} changes type part-way through the "
+                    "result; CAST it in the query to export it"
+                ) from None
+            arrays.append(pa.array(
+                [None if v is None else str(v) for v in values], type=pa.string()
+            ))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def _arrow_chunks(columns: list, result, open_writer):
+    batches = _batches(result)
+    first = next(batches, [])
+    schema = _schema(columns, first)
+    sink = _Sink()
+    writer = open_writer(sink, schema)
+    for rows in itertools.chain([first] if first else [], batches):
+        writer.write_batch(_record_batch(schema, rows))
+        # Parquet only emits bytes once a row group is complete; never send
+        # an empty chunk, which would end a chunked response early
+        data = sink.drain()
+        if data:
+            yield data
+    writer.close()
+    yield sink.drain()
+
+
+def arrow_chunks(columns: list, result):
+    """Yield the result as an Arrow IPC stream, one record batch per chunk."""
+    return _arrow_chunks(columns, result, pa.ipc.new_stream)
+
+
+def parquet_chunks(columns: list, result):
+    """Yield the result as a Parquet file, one row group per chunk."""
+    return _arrow_chunks(columns, result, pq.ParquetWriter)
+
+
+ENCODERS = {"csv": csv_chunks, "arrow": arrow_chunks, "parquet": parquet_chunks}
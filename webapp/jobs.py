@@ -0,0 +1,195 @@
+"""Background query jobs, shared by all gunicorn workers.
+
+A job is submitted by one worker and runs on that worker's bounded thread
+pool, so the request returns at once and the worker stays free to serve
+other requests while SQLite does the work (it releases the GIL). Job state,
+progress and the finished result live in a small SQLite file, so any
+worker can answer a poll for any job. Cancellation is a flag in the same
+file that the running job checks between SQLite progress callbacks.
+
+Finished jobs are deleted JOB_TTL_S after they finish. A job whose worker
+process has died is reported as failed the next time it is looked at, and
+no longer counts towards JOB_MAX_ACTIVE.
+"""
+import json
+import os
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from shared_sqlite import LocalConnection
+
+ACTIVE = ("queued", "running")
+WORKER_EXITED = "The worker running this job exited."
+
+
+class JobStore:
+    def __init__(self, path: str, workers: int, max_active: int, ttl: float):
+        self.path = path
+        self.max_active = max_active
+        self.ttl = ttl
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self._conn = LocalConnection(path)
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id TEXT PRIMARY KEY, dataset TEXT, sql TEXT, status TEXT,"
+                " pid INTEGER, rows INTEGER DEFAULT 0, cancel INTEGER DEFAULT 0,"
+                " error TEXT, result BLOB,"
+                " created REAL, started REAL, finished REAL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, finished)"
+            )
+
+    def submit(self, dataset: str, sql: str, run) -> str | None:
+        """Queue run(job) on the pool; None when too many jobs are active.
+
+        run receives a Job handle and returns the JSON-serialisable result.
+        """
+        job_id = uuid.uuid4().hex
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "DELETE FROM jobs WHERE status NOT IN (?, ?) AND finished < ?",
+                (*ACTIVE, time.time() - self.ttl),
+            )
+            # Jobs of workers that died (e.g. killed by gunicorn's timeout)
+            # would otherwise hold their slots forever
+            dead = [
+                (WORKER_EXITED, time.time(), other_id)
+                for other_id, pid in conn.execute(
+                    "SELECT id, pid FROM jobs WHERE status IN (?, ?)", ACTIVE
+                )
+                if not _alive(pid)
+            ]
+            conn.executemany(
+                "UPDATE jobs SET status = 'error', error = ?, finished = ?"
+                " WHERE id = ?",
+                dead,
+            )
+            active = conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)", ACTIVE
+            ).fetchone()[0]
+            if active >= self.max_active:
+                return None
+            conn.execute(
+                "INSERT INTO jobs (id, dataset, sql, status, pid, created)"
+                " VALUES (?, ?, ?, 'queued', ?, ?)",
+                (job_id, dataset, sql, os.getpid(), time.time()),
+            )
+        self.pool.submit(self._run, Job(self, job_id), run)
+        return job_id
+
+    def _run(self, job: "Job", run) -> None:
+        if job.cancelled():
+            self._finish(job.id, "cancelled", error="Job cancelled.")
+            return
+        with self._conn() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'running', started = ? WHERE id = ?",
+                (time.time(), job.id),
+            )
+        try:
+            result = run(job)
+        except Exception as e:
+            status = "cancelled" if job.cancelled() else "error"
+            self._finish(job.id, status, error=str(e))
+            return
+        self._finish(job.id, "done", result=json.dumps(result).encode("utf-8"))
+
+    def _finish(self, job_id: str, status: str, error=None, result=None) -> None:
+        with self._conn() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, result = ?, finished = ?"
+                " WHERE id = ?",
+                (status, error, result, time.time(), job_id),
+            )
+
+    def get(self, job_id: str, with_result: bool = True) -> dict | None:
+        """Return the job's state (and its result once done), or None."""
+        row = self._conn().execute(
+            "SELECT dataset, status, pid, rows, error, created, started, finished"
+            f"{', result' if with_result else ''} FROM jobs WHERE id = ?",
+            (job_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        dataset, status, pid, rows, error, created, started, finished = row[:8]
+        if status in ACTIVE and not _alive(pid):
+            error = WORKER_EXITED
+            self._finish(job_id, "error", error=error)
+            status, finished = "error", time.time()
+        job = {
+            "id": job_id,
+            "dataset": dataset,
+            "status": status,
+            "rows": rows,
+            "elapsed": round((finished or time.time()) - (started or created), 2),
+        }
+        if error:
+            job["error"] = error
+        if with_result and status == "done":
+            job["result"] = json.loads(row[8])
+        return job
+
+    def cancel(self, job_id: str) -> bool:
+        with self._conn() as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET cancel = 1 WHERE id = ? AND status IN (?, ?)",
+                (job_id, *ACTIVE),
+            )
+        return cur.rowcount > 0
+
+
+class Job:
+    """Handle a running job uses to report progress and notice cancellation."""
+
+    # Seconds between checks of the shared cancel flag
+    CANCEL_CHECK_INTERVAL = 0.5
+
+    def __init__(self, store: JobStore, job_id: str):
+        self.store = store
+        self.id = job_id
+        self._checked = 0.0
+        self._cancelled = False
+
+    def progress(self, rows: int) -> None:
+        with self.store._conn() as conn:
+            conn.execute("UPDATE jobs SET rows = ? WHERE id = ?", (rows, self.id))
+
+    def cancelled(self) -> bool:
+        """True once cancellation was requested; cheap to call often."""
+        now = time.monotonic()
+        if not self._cancelled and now - self._checked >= self.CANCEL_CHECK_INTERVAL:
+            self._checked = now
+            row = self.store._conn().execute(
+                "SELECT cancel FROM jobs WHERE id = ?", (self.id,)
+            ).fetchone()
+            self._cancelled = bool(row and row[0])
+        return self._cancelled
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def from_env() -> JobStore:
+    """Build the job store from JOB_* settings."""
+    path = os.environ.get(
+        "JOB_STORE_PATH", os.path.join(tempfile.gettempdir(), "ies_jobs.db")
+    )
+    return JobStore(
+        path,
+        workers=int(os.environ.get("JOB_WORKERS", 2)),
+        max_active=int(os.environ.get("JOB_MAX_ACTIVE", 8)),
+        ttl=float(os.environ.get("JOB_TTL_S", 3600)),
+    )
@@ -0,0 +1,102 @@
+"""Per-query time and row limits.
+
+User SQL runs on the shared gunicorn workers, so a runaway query (a
+cartesian join of total with persons, say) must not hold a worker until
+gunicorn's timeout kills it. A QueryBudget installs a SQLite progress
+handler that aborts the running statement once its deadline passes, and
+counts the rows fetched against a cap. Either way the query fails with a
+QueryLimitError saying which limit it hit.
+"""
+import sqlite3
+import time
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+# SQLite virtual machine instructions between two deadline checks
+PROGRESS_INTERVAL = 10000
+
+
+class QueryLimitError(Exception):
+    """A query was cancelled for exceeding its time or row limit, or on request."""
+
+
+class QueryBudget:
+    """Run one statement on conn under a time budget and a row cap.
+
+    The progress handler stays on the connection until close(). With
+    per_fetch, the deadline restarts for every fetch, so a long stream that
+    keeps producing rows is bounded by the row cap rather than the clock.
+    A timeout or max_rows of 0 disables that limit. should_stop, if given, is
+    polled alongside the deadline and cancels the statement once it returns
+    True. timeout_name is the setting named in the timeout error.
+    """
+
+    def __init__(
+        self,
+        conn,
+        timeout: float,
+        max_rows: int,
+        per_fetch: bool = False,
+        should_stop=None,
+        timeout_name: str = "QUERY_TIMEOUT_S",
+    ):
+        self.conn = conn
+        self.timeout = timeout
+        self.max_rows = max_rows
+        self.per_fetch = per_fetch
+        self.should_stop = should_stop
+        self.timeout_name = timeout_name
+        self.rows = 0
+        self._deadline = None
+        self._result = None
+        self._dbapi = conn.connection.driver_connection
+        if timeout > 0 or should_stop:
+            self._dbapi.set_progress_handler(self._interrupt, PROGRESS_INTERVAL)
+
+    def close(self):
+        # The connection goes back to the pool; do not leave the handler on it
+        self._dbapi.set_progress_handler(None, 0)
+
+    def _expired(self) -> bool:
+        return (
+            self.timeout > 0
+            and self._deadline is not None
+            and time.monotonic() > self._deadline
+        )
+
+    def _interrupt(self) -> bool:
+        return self._expired() or bool(self.should_stop and self.should_stop())
+
+    def _run(self, fn, *args):
+        try:
+            return fn(*args)
+        except (OperationalError, sqlite3.OperationalError) as e:
+            if self._expired():
+                raise QueryLimitError(
+                    f"Query cancelled: it ran longer than {self.timeout:g} s "
+                    f"({self.timeout_name})."
+                ) from e
+            if self.should_stop and self.should_stop():
+                raise QueryLimitError("Query cancelled on request.") from e
+            raise
+
+    def execute(self, sql: str) -> "QueryBudget":
+        self._deadline = time.monotonic() + self.timeout
+        self._result = self._run(self.conn.execute, text(sql))
+        return self
+
+    def keys(self) -> list:
+        return list(self._result.keys())
+
+    def fetchmany(self, size: int) -> list:
+        if self.per_fetch:
+            self._deadline = time.monotonic() + self.timeout
+        rows = self._run(self._result.fetchmany, size)
+        self.rows += len(rows)
+        if self.max_rows and self.rows > self.max_rows:
+            raise QueryLimitError(
+                f"Query cancelled: it returned more than {self.max_rows:,} rows "
+                "(QUERY_MAX_ROWS)."
+            )
+        return rows
@@ -0,0 +1,149 @@
+"""On-disk LRU cache for /api/query results, shared by all gunicorn workers.
+
+The datasets never change at runtime, so a query's JSON response can be
+reused until the database file itself is replaced. Entries live in a small
+SQLite file keyed by (dataset, database fingerprint, normalised SQL, page); the
+least recently used entries are evicted once the cache exceeds its size
+budget. Hit/miss counters are stored alongside so they cover every worker.
+
+Any error talking to the cache is treated as a miss: the cache can only
+make queries faster, never make them fail.
+"""
+import hashlib
+import os
+import re
+import sqlite3
+import tempfile
+import time
+
+from shared_sqlite import LocalConnection
+
+# Quoted literals and identifiers are kept verbatim; whitespace elsewhere is
+# collapsed so reformatted copies of a query share one entry.
+_QUOTED = re.compile(r"""('(?:[^']|'')*'|"(?:[^"]|"")*")""")
+_SPACE = re.compile(r"\s+")
+
+
+def normalise_sql(sql: str) -> str:
+    parts = _QUOTED.split(sql.strip().rstrip(";").strip())
+    return "".join(
+        part if i % 2 else _SPACE.sub(" ", part) for i, part in enumerate(parts)
+    )
+
+
+def db_fingerprint(path: str) -> str:
+    """Identify a database file version by its size and modification time."""
+    st = os.stat(path)
+    return f"{st.st_size}:{st.st_mtime_ns}"
+
+
+class QueryCache:
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._conn = LocalConnection(path)
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " key TEXT PRIMARY KEY, dataset TEXT, payload BLOB,"
+                " size INTEGER, last_used REAL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_entries_last_used"
+                " ON entries(last_used)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS counters ("
+                " name TEXT PRIMARY KEY, value INTEGER NOT NULL)"
+            )
+            conn.execute(
+                "INSERT OR IGNORE INTO counters VALUES ('hits', 0), ('misses', 0)"
+            )
+
+    @staticmethod
+    def key(dataset: str, fingerprint: str, sql: str, *params) -> str:
+        """Key a result by dataset, database version, SQL and any paging
+        parameters that select part of it."""
+        raw = "\0".join((dataset, fingerprint, normalise_sql(sql), *map(str, params)))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> bytes | None:
+        try:
+            conn = self._conn()
+            with conn:
+                row = conn.execute(
+                    "SELECT payload FROM entries WHERE key = ?", (key,)
+                ).fetchone()
+                if row:
+                    conn.execute(
+                        "UPDATE entries SET last_used = ? WHERE key = ?",
+                        (time.time(), key),
+                    )
+                conn.execute(
+                    "UPDATE counters SET value = value + 1 WHERE name = ?",
+                    ("hits" if row else "misses",),
+                )
+            return row[0] if row else None
+        except sqlite3.Error:
+            return None
+
+    def put(self, key: str, dataset: str, payload: bytes) -> None:
+        if len(payload) > self.max_bytes:
+            return
+        try:
+            conn = self._conn()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)",
+                    (key, dataset, payload, len(payload), time.time()),
+                )
+                self._evict(conn)
+        except sqlite3.Error:
+            pass
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        """Drop least recently used entries until the cache fits its budget."""
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        freed = 0
+        victims = []
+        for key, size in conn.execute(
+            "SELECT key, size FROM entries ORDER BY last_used"
+        ):
+            victims.append((key,))
+            freed += size
+            if total - freed <= self.max_bytes:
+                break
+        conn.executemany("DELETE FROM entries WHERE key = ?", victims)
+
+    def stats(self) -> dict:
+        try:
+            conn = self._conn()
+            counters = dict(conn.execute("SELECT name, value FROM counters"))
+            entries, size = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+        except sqlite3.Error as e:
+            return {"error": str(e)}
+        lookups = counters["hits"] + counters["misses"]
+        return {
+            "hits": counters["hits"],
+            "misses": counters["misses"],
+            "hit_rate": round(counters["hits"] / lookups, 3) if lookups else None,
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+        }
+
+
+def from_env() -> "QueryCache | None":
+    """Build the cache from QUERY_CACHE* settings; None when disabled."""
+    if os.environ.get("QUERY_CACHE", "1") != "1":
+        return None
+    path = os.environ.get(
+        "QUERY_CACHE_PATH", os.path.join(tempfile.gettempdir(), "ies_query_cache.db")
+    )
+    max_mb = int(os.environ.get("QUERY_CACHE_MAX_MB", 256))
+    return QueryCache(path, max_mb * 1024 * 1024)
@@ -0,0 +1,32 @@
+"""Connections to the small SQLite files shared by all gunicorn workers.
+
+The query cache and the job store each keep their state in one SQLite file
+that every worker process reads and writes. WAL mode lets readers carry on
+while another worker writes, and synchronous=NORMAL keeps those writes
+cheap; a lost write only costs a cache entry or a job's late status.
+"""
+import os
+import sqlite3
+import threading
+
+
+class LocalConnection:
+    """Call to get a connection to path, one per thread and per process.
+
+    A connection opened before a fork is never reused in the child.
+    """
+
+    def __init__(self, path: str, timeout: float = 5):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def __call__(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.timeout)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn